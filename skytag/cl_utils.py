@@ -5,16 +5,33 @@ Documentation for skytag can be found here: http://skytag.readthedocs.org
 
 Usage:
     skytag init
+    skytag [--chunk <chunkRows>] index <mapPath>
+    skytag [-dp] [--batch <batchSize>] [--wait <maxWait>] [--socket <socketPath>] stream [<mapPath>]
+    skytag [--cold <coldRepeats>] [--warm <warmRepeats>] latency <ra> <dec> <mapPath>
+    skytag [--levels <credibleLevels>] moc <mapPath> [<outputDir>]
     skytag [-d] <ra> <dec> <mapPath>
     skytag [-d] <ra> <dec> <mjd> <mapPath>
 
 Options:
     init                                   setup the skytag settings file for the first time
+    index                                  write a precomputed sidecar index next to the skymap so later lookups skip map preparation
+    stream                                 annotate a stream of JSON-lines detections (`{"ra": .., "dec": .., "mjd": .., "mapPath": ..}`) from stdin in micro-batches
+    latency                                measure the p50/p95/p99 latency of annotating one location in a cold process and in a warm process
+    moc                                    write the credible regions of the skymap as FITS MOCs (Multi-Order Coverage maps)
     <ra>                                   sky location right-ascension (decimal degrees or sexegesimal)
     <dec>                                  sky location declination (decimal degrees or sexegesimal)
     <mjd>                                  a transient event MJD. If supplied, a time delta from the map event is returned alongside probability.
     <mapPath>                              path to a HealPix skymap
+    <outputDir>                            the directory to write the MOCs to (moc only; default the current directory)
     -d, --distance                         also return a distance (and error) at the sky location
+    -p, --probdensity                      also return the probability density at the sky location (stream only)
+    --batch <batchSize>                    the maximum number of records annotated together [default: 1000]
+    --wait <maxWait>                       the maximum time (seconds) a record waits for its batch to fill [default: 0.1]
+    --socket <socketPath>                  read the stream from (and reply down) a local socket instead of stdin/stdout
+    --cold <coldRepeats>                   the number of new processes to time (latency only) [default: 20]
+    --warm <warmRepeats>                   the number of in-process calls to time (latency only) [default: 100]
+    --levels <credibleLevels>              comma-separated credible levels (%) to write MOCs for (moc only) [default: 50,90,95]
+    --chunk <chunkRows>                    index the map out-of-core, reading this many map rows at a time (index only; for maps larger than memory)
     -h, --help                             show this help message
     -v, --version                          show version
     -s, --settings <pathToSettingsFile>    the settings file
@@ -90,6 +107,61 @@ def main(arguments=None):
             pass
         return
 
+    if a["index"]:
+        from skytag.commonutils import index_skymap
+        sidecarPath = index_skymap(
+            log=log,
+            mapPath=a["mapPath"],
+            chunkRows=a["chunkFlag"] and int(a["chunkFlag"])
+        )
+        print(f"The skymap index has been written to {sidecarPath}")
+        return
+
+    if a["stream"]:
+        from skytag.commonutils import annotate_stream
+        stream = annotate_stream(
+            log=log,
+            mapPath=a["mapPath"],
+            batchSize=int(a["batchFlag"]),
+            maxWait=float(a["waitFlag"]),
+            distance=a["distanceFlag"],
+            probdensity=a["probdensityFlag"],
+            socketPath=a["socketFlag"] or False,
+            statsStream=sys.stderr
+        )
+        try:
+            stream.run()
+        except KeyboardInterrupt:
+            stream.stop()
+        return
+
+    if a["latency"]:
+        from skytag.commonutils import measure_latency
+        from skytag.commonutils.measure_latency import latency_report
+        latency = measure_latency(
+            log=log,
+            ra=float(a["ra"]),
+            dec=float(a["dec"]),
+            mapPath=a["mapPath"],
+            coldRepeats=int(a["coldFlag"]),
+            warmRepeats=int(a["warmFlag"])
+        )
+        print(latency_report(latency))
+        return
+
+    if a["moc"]:
+        from skytag.commonutils import credible_moc
+        mocs = credible_moc(
+            log=log,
+            mapPath=a["mapPath"],
+            credible=[float(l) for l in a["levelsFlag"].split(",")]
+        )
+        basename = os.path.basename(a["mapPath"]).split(".")[0]
+        for level, moc in mocs.items():
+            mocPath = moc.write(os.path.join(a["outputDir"] or ".", f"{basename}.{level:g}.moc.fits"))
+            print(f"The {level:g}% credible region MOC ({moc.area:0.2f} square degrees) has been written to {mocPath}")
+        return
+
     if a["mjd"]:
         mjd = float(a["mjd"])
     else:
@@ -107,25 +179,23 @@ def main(arguments=None):
         dec=float(a["dec"]),
         mjd=mjd,
         mapPath=a["mapPath"],
-        distance=distance
+        lazy=True
     )
 
-    prob = results[0]
+    prob = results.prob
     reportText = f"This transient is found in the {prob[0]}% credibility region"
 
     if a["mjd"]:
-        deltas = results[1]
+        deltas = results.mjdDelta
         if deltas[0] < 0.:
             preposition = "before"
         else:
             preposition = "after"
         reportText += f" and occurred {deltas[0]} days {preposition} the map event."
-    if a["distanceFlag"]:
+    if distance:
         if not a["mjd"]:
-            distance = results[1]
             reportText += "."
-        else:
-            distance = results[2]
+        distance = results.distance
         if not distance[0][0]:
             reportText += f" Burst events have no distance localisation."
         else:
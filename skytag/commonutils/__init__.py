@@ -2,3 +2,24 @@
 *common tools used throughout package*
 """
 from .prob_at_location import prob_at_location
+from .prepare_skymap import prepare_skymap
+from .shared_skymap import shared_skymap
+from .coarse_skymap import coarse_skymap
+from .index_skymap import index_skymap
+from .aprob_at_location import aprob_at_location
+from .annotate_stream import annotate_stream
+from .measure_latency import measure_latency
+from .fov_probability import fov_probability
+from .prob_in_error_region import prob_in_error_region
+from .result_cache import result_cache
+from .coordinate_set import coordinate_set, credible_level_changes
+from .synthetic_skymap import synthetic_skymap, synthetic_catalogue
+from .annotate_dataframe import annotate_dataframe
+from .skymap_archive import skymap_archive
+from .skymap_overlap import skymap_overlap
+from .location_result import location_result
+from .skymap_store import skymap_store
+from .credible_volume import credible_volume
+from .sky_moc import sky_moc
+from .credible_moc import credible_moc
+from .plan_tiles import plan_tiles
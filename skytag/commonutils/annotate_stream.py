@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Annotate a continuous stream of JSON-lines transient detections in micro-batches, with one vectorized lookup per active map*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+# QUEUE MARKERS FOR THE END OF THE INPUT STREAM AND A REQUEST TO STOP
+_EOF = "EOF"
+_STOP = "STOP"
+
+
+class annotate_stream(object):
+    """
+    *annotate a continuous stream of JSON-lines transient detections in micro-batches, with one vectorized lookup per active map*
+
+    **Key Arguments:**
+        - ``log`` -- logger
+        - ``mapPath`` -- path to the skymap used for records without their own ``mapPath`` key. Default *False*
+        - ``batchSize`` -- the maximum number of records in a batch. Default *1000*
+        - ``maxWait`` -- the maximum time (seconds) the first record of a batch waits for the batch to fill before it is annotated. Default *0.1*
+        - ``distance`` -- also add the distance and distance sigma at each location. Default *False*
+        - ``probdensity`` -- also add the probability density at each location. Default *False*
+        - ``socketPath`` -- read records from a local (Unix domain) socket at this path instead of stdin. Annotated records are sent back down the connection they arrived on. Default *False*
+        - ``statsStream`` -- a file-like object to write the latency statistics of each batch to (as JSON lines). Default *None*
+        - ``maxMaps`` -- the number of prepared skymaps to keep in memory. Default *8*
+
+    **Usage:**
+
+    Each input line is a JSON object with ``ra`` and ``dec`` keys (decimal degrees), plus optional ``mjd`` and ``mapPath`` keys. The record is emitted with ``prob`` (the credible level, %) added, plus ``mjdDelta``, ``distance``, ``distanceSigma`` and ``probdensity`` where requested. Lines that cannot be annotated are emitted as ``{"error": ..., "line": ...}``.
+
+    ```python
+    from skytag.commonutils import annotate_stream
+    stream = annotate_stream(
+        log=log,
+        mapPath="/path/to/bayestar.multiorder.fits",
+        batchSize=500,
+        maxWait=0.05
+    )
+    stream.run(inputStream=sys.stdin, outputStream=sys.stdout)
+    print(stream.stats[-1])
+    ```
+
+    A record never waits more than ``maxWait`` (plus the annotation time of its batch) before it is emitted. ``stream.stats`` holds, for every batch, its size, the number of maps it touched, the number of records that could not be annotated (``errors``), the time its first record waited (``waitSec``), the annotation time (``annotateSec``) and the median and maximum latency of its records from arrival to emission (``latencyP50Sec``, ``latencyMaxSec``).
+
+    From the command-line:
+
+    ```bash
+    cat alerts.jsonl | skytag --batch 500 --wait 0.05 stream bayestar.multiorder.fits
+    ```
+    """
+
+    def __init__(
+            self,
+            log,
+            mapPath=False,
+            batchSize=1000,
+            maxWait=0.1,
+            distance=False,
+            probdensity=False,
+            socketPath=False,
+            statsStream=None,
+            maxMaps=8
+    ):
+        self.log = log
+        log.debug("instansiating a new 'annotate_stream' object")
+
+        import queue
+        import threading
+        from collections import OrderedDict
+
+        if int(batchSize) < 1:
+            raise AttributeError("The batch size must be at least 1")
+        if float(maxWait) < 0:
+            raise AttributeError("The maximum wait must not be negative")
+
+        self.mapPath = mapPath
+        self.batchSize = int(batchSize)
+        self.maxWait = float(maxWait)
+        self.distance = distance
+        self.probdensity = probdensity
+        self.socketPath = socketPath
+        self.statsStream = statsStream
+        self.maxMaps = maxMaps
+
+        self.stats = []
+        self.skymaps = OrderedDict()
+        self.queue = queue.Queue()
+        self.stopped = threading.Event()
+
+        return None
+
+    def run(
+            self,
+            inputStream=None,
+            outputStream=None):
+        """*annotate records until the input stream ends (or, when reading from a socket, until `stop()` is called)*
+
+        **Key Arguments:**
+            - ``inputStream`` -- a file-like object to read JSON lines from. Default *None* (stdin). Ignored when reading from a socket
+            - ``outputStream`` -- a file-like object to write the annotated JSON lines to. Default *None* (stdout). Ignored when reading from a socket
+        """
+        self.log.debug('starting the ``run`` method')
+
+        import threading
+        import queue
+        import time
+
+        if self.socketPath:
+            server = threading.Thread(target=self._serve_socket, daemon=True)
+            server.start()
+        else:
+            inputStream = inputStream or sys.stdin
+            outputStream = outputStream or sys.stdout
+            reader = threading.Thread(target=self._read_lines, args=(inputStream, outputStream, True), daemon=True)
+            reader.start()
+
+        finished = False
+        while not finished:
+            item = self.queue.get()
+            if item in (_EOF, _STOP):
+                break
+
+            # FILL THE BATCH UNTIL IT IS FULL OR ITS FIRST RECORD HAS WAITED maxWait
+            batch = [item]
+            deadline = item[0] + self.maxWait
+            while len(batch) < self.batchSize:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item in (_EOF, _STOP):
+                    finished = True
+                    break
+                batch.append(item)
+
+            self._emit(batch)
+
+        self.log.debug('completed the ``run`` method')
+        return None
+
+    def stop(
+            self):
+        """*stop the stream (after annotating the batch in progress)*
+        """
+        self.stopped.set()
+        self.queue.put(_STOP)
+        return None
+
+    def annotate_batch(
+            self,
+            lines):
+        """*annotate a batch of JSON lines with one vectorized lookup per map*
+
+        **Key Arguments:**
+            - ``lines`` -- list of JSON strings (or already decoded dictionaries)
+
+        **Return:**
+            - ``records`` -- list of annotated record dictionaries, in the order given
+        """
+        self.log.debug('starting the ``annotate_batch`` method')
+
+        import json
+        import numpy as np
+        from skytag.commonutils.prob_at_location import prob_at_location
+
+        records = [None] * len(lines)
+        groups = {}
+        for i, line in enumerate(lines):
+            try:
+                record = json.loads(line) if isinstance(line, (str, bytes)) else dict(line)
+                mapPath = record.get("mapPath", self.mapPath)
+                if not mapPath:
+                    raise AttributeError("no mapPath given for the record")
+                # A PATH STRING (ALSO THE KEY THE RECORDS ARE GROUPED BY)
+                mapPath = os.fspath(mapPath)
+                ra, dec = float(record["ra"]), float(record["dec"])
+                mjd = None if record.get("mjd") is None else float(record["mjd"])
+            except Exception as e:
+                records[i] = {"error": "%s: %s" % (type(e).__name__, e), "line": line if isinstance(line, str) else str(line)}
+                continue
+            records[i] = record
+            groups.setdefault(mapPath, []).append((i, ra, dec, mjd))
+
+        for mapPath, rows in groups.items():
+            index = [r[0] for r in rows]
+            try:
+                skymap = self._skymap(mapPath)
+                results = prob_at_location(log=self.log, ra=np.array([r[1] for r in rows]), dec=np.array([r[2] for r in rows]), mapPath=mapPath, distance=self.distance, probdensity=self.probdensity, skymap=skymap)
+            except Exception as e:
+                for i in index:
+                    records[i] = {"error": "%s: %s" % (type(e).__name__, e), "line": json.dumps(records[i])}
+                continue
+
+            probs = results[0]
+            mjdObs = skymap['meta']["MJD-OBS"]
+            for n, i in enumerate(index):
+                record = records[i]
+                record["prob"] = _json_number(probs[n])
+                if rows[n][3] is not None:
+                    record["mjdDelta"] = round(rows[n][3] - mjdObs, 5)
+                if self.distance:
+                    record["distance"], record["distanceSigma"] = [_json_number(d) for d in results[1][n]]
+                if self.probdensity:
+                    record["probdensity"] = _json_number(results[-1][n])
+
+        self.log.debug('completed the ``annotate_batch`` method')
+        return records
+
+    def _skymap(
+            self,
+            mapPath):
+        """*return the prepared skymap, keeping the most recently used maps in memory*
+        """
+        from skytag.commonutils.prepare_skymap import prepare_skymap
+
+        if mapPath in self.skymaps:
+            self.skymaps.move_to_end(mapPath)
+        else:
+            self.skymaps[mapPath] = prepare_skymap(mapPath=mapPath, log=self.log)
+            while len(self.skymaps) > self.maxMaps:
+                self.skymaps.popitem(last=False)
+        return self.skymaps[mapPath]
+
+    def _emit(
+            self,
+            batch):
+        """*annotate a batch of queued records, send each back to where it came from and record the batch statistics*
+        """
+        import json
+        import time
+        import numpy as np
+
+        start = time.monotonic()
+        records = self.annotate_batch([b[1] for b in batch])
+        annotated = time.monotonic()
+
+        writers = []
+        for (arrival, line, writer), record in zip(batch, records):
+            try:
+                writer.write(json.dumps(record) + "\n")
+            except (OSError, ValueError):
+                # THE CLIENT HAS GONE AWAY
+                continue
+            if writer not in writers:
+                writers.append(writer)
+        for writer in writers:
+            try:
+                writer.flush()
+            except (OSError, ValueError):
+                pass
+        emitted = time.monotonic()
+
+        latency = emitted - np.array([b[0] for b in batch])
+        stats = {
+            "batch": len(self.stats) + 1,
+            "size": len(batch),
+            "maps": len(set(r.get("mapPath", self.mapPath) for r in records if "error" not in r)),
+            "errors": sum(1 for r in records if "error" in r),
+            "waitSec": round(start - batch[0][0], 6),
+            "annotateSec": round(annotated - start, 6),
+            "latencyP50Sec": round(float(np.median(latency)), 6),
+            "latencyMaxSec": round(float(latency.max()), 6)
+        }
+        self.stats.append(stats)
+        self.log.info('batch statistics: %(stats)s' % locals())
+        if self.statsStream:
+            self.statsStream.write(json.dumps(stats) + "\n")
+            self.statsStream.flush()
+        return None
+
+    def _read_lines(
+            self,
+            stream,
+            writer,
+            endOfInput=False):
+        """*queue each non-empty line of a stream with its arrival time and where its annotation should be written*
+        """
+        import time
+
+        for line in stream:
+            if self.stopped.is_set():
+                break
+            line = line.strip()
+            if line:
+                self.queue.put((time.monotonic(), line, writer))
+        if endOfInput:
+            self.queue.put(_EOF)
+        return None
+
+    def _serve_socket(
+            self):
+        """*accept connections on the local socket, queueing the records of each connection*
+        """
+        import socket
+        import threading
+
+        if os.path.exists(self.socketPath):
+            os.remove(self.socketPath)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socketPath)
+        server.listen()
+        server.settimeout(0.2)
+        try:
+            while not self.stopped.is_set():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                conn.settimeout(None)
+                reader = threading.Thread(target=self._read_lines, args=(conn.makefile("r"), conn.makefile("w")), daemon=True)
+                reader.start()
+        finally:
+            server.close()
+            if os.path.exists(self.socketPath):
+                os.remove(self.socketPath)
+        return None
+
+
+def _json_number(
+        value):
+    """*convert a result to a JSON-safe number (`null` for missing or non-finite values)*
+    """
+    import math
+
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*asyncio versions of `prob_at_location` and `prepare_skymap` that keep the event loop free while maps are read and locations are looked up*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+# MAP LOADS CURRENTLY IN FLIGHT, KEYED BY (EVENT LOOP, REAL MAP PATH)
+_inflightLoads = {}
+
+
+async def aload_skymap(
+        mapPath,
+        log=False,
+        executor=None):
+    """*Prepare a skymap in an executor without blocking the event loop, sharing one load between all concurrent callers of the same map*
+
+    **Key Arguments:**
+        - ``mapPath`` -- path the the multi-order HealPix map
+        - ``log`` -- logger
+        - ``executor`` -- the `concurrent.futures` executor to read and prepare the map in. Default *None* (the event loop's default thread pool)
+
+    **Return:**
+        - ``skymap`` -- the prepared skymap (see `prepare_skymap`). Concurrent callers receive the same object, so treat it as read-only.
+
+    ```python
+    from skytag.commonutils.aprob_at_location import aload_skymap
+    skymap = await aload_skymap(
+        log=log,
+        mapPath="/path/to/bayestar.multiorder.fits"
+    )
+    ```
+
+    Requests for a map that is already being loaded wait for that load rather than starting another. Once the load completes the next request reads the map afresh (so an updated map is picked up), which is cheap if the map has a sidecar index (see `index_skymap`). Different maps are loaded concurrently. Cancelling one waiter does not cancel a load other callers are waiting on.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``aload_skymap`` function')
+
+    import asyncio
+    import functools
+    from skytag.commonutils.prepare_skymap import prepare_skymap
+
+    loop = asyncio.get_running_loop()
+    # MAPS HELD IN MEMORY ARE COALESCED BY IDENTITY
+    key = (loop, os.path.realpath(mapPath) if isinstance(mapPath, (str, os.PathLike)) else id(mapPath))
+    load = _inflightLoads.get(key)
+    if load is None:
+        load = loop.run_in_executor(executor, functools.partial(prepare_skymap, mapPath=mapPath, log=log))
+        _inflightLoads[key] = load
+        load.add_done_callback(lambda f: _inflightLoads.pop(key, None))
+    else:
+        log.debug('joining the in-flight load of `%(mapPath)s`' % locals())
+
+    skymap = await asyncio.shield(load)
+
+    log.debug('completed the ``aload_skymap`` function')
+    return skymap
+
+
+async def aprob_at_location(
+        ra,
+        dec,
+        mapPath,
+        mjd=False,
+        log=False,
+        distance=False,
+        probdensity=False,
+        executor=None):
+    """*Return the probability contour a given sky-location resides within in a heaplix skymap, without blocking the event loop*
+
+    **Key Arguments:**
+        - ``ra`` -- right ascension in decimal degrees (float or list)
+        - ``dec`` -- declination in decimal degrees (float or list)
+        - ``mapPath`` -- path the the HealPix map
+        - ``mjd`` -- MJD of transient event (e.g. discovery date). If supplied, a time-delta from the map event is returned (float or list)
+        - ``log`` -- logger
+        - ``distance`` -- return also a distance (if present). Default False
+        - ``probdensity`` -- return also the probability density. Default False
+        - ``executor`` -- the `concurrent.futures` executor to run the blocking map reads and lookups in. Default *None* (the event loop's default thread pool)
+
+    **Return:**
+        - the same results as `prob_at_location`
+
+    ```python
+    import asyncio
+    from skytag.commonutils import aprob_at_location
+
+    async def annotate(alerts):
+        return await asyncio.gather(*[aprob_at_location(
+            log=log,
+            ra=alert["ra"],
+            dec=alert["dec"],
+            mapPath=alert["mapPath"]
+        ) for alert in alerts])
+    ```
+
+    Alerts awaiting the same map share a single map load (see `aload_skymap`); alerts for different maps load them concurrently.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``aprob_at_location`` function')
+
+    import asyncio
+    import functools
+    from skytag.commonutils.prob_at_location import prob_at_location
+
+    skymap = await aload_skymap(mapPath=mapPath, log=log, executor=executor)
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(executor, functools.partial(prob_at_location, ra=ra, dec=dec, mapPath=mapPath, mjd=mjd, log=log, distance=distance, probdensity=probdensity, skymap=skymap))
+
+    log.debug('completed the ``aprob_at_location`` function')
+    return results
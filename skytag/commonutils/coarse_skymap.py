@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*A coarse-resolution, approximate version of a skymap for fast credible-level triage*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class coarse_skymap(object):
+    """
+    *a coarse-resolution, approximate version of a skymap for fast credible-level triage*
+
+    **Key Arguments:**
+        - ``log`` -- logger
+        - ``mapPath`` -- path the the multi-order HealPix map
+        - ``level`` -- the HealPix level to degrade the map to (0-29, 6-8 recommended). Default *7*
+        - ``skymap`` -- an already prepared skymap (see `prepare_skymap`), covering the whole sky (not prepared for a ``region``). Used in place of ``mapPath`` if given. Default *False*
+
+    **Usage:**
+
+    Each coarse pixel is assigned the mid-point of the credible levels of all the map pixels it overlaps. Lookups only touch a small array (196,608 values at level 7), so they stay in the CPU cache.
+
+    The coarse array holds ``12 * 4^level`` values and grows four-fold with every level: ~0.2 MB at level 6, ~0.8 MB at level 7 and ~3 MB at level 8, but ~50 MB at level 10. Beyond level 8 the array no longer fits in the CPU cache and lookups are no faster than the exact `prob_at_location` path, so use that instead if you need the accuracy of a finer level.
+
+    ```python
+    from skytag.commonutils import coarse_skymap
+    coarse = coarse_skymap(
+        log=log,
+        mapPath="/path/to/bayestar.multiorder.fits",
+        level=7
+    )
+    probs = coarse.get(
+        ra=[10.343234, 170.343532],
+        dec=[14.345532, -40.532255]
+    )
+    print(coarse.maxError)
+    ```
+
+    ``coarse.maxError`` is the largest error (in % credibility) that the coarsening can introduce anywhere on the sky (excluding the 0.01% rounding of the reported values). If it is too large for your use case, use a higher ``level`` or fall back to `prob_at_location`. ``coarse.error`` gives the error bound for each coarse pixel.
+    """
+
+    def __init__(
+            self,
+            log,
+            mapPath=False,
+            level=7,
+            skymap=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'coarse_skymap' object")
+
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import prepare_skymap, MAX_LEVEL
+
+        self.level = int(level)
+        if not 0 <= self.level <= MAX_LEVEL:
+            raise AttributeError("The coarse level must be between 0 and %(MAX_LEVEL)s (6-8 recommended)" % locals())
+
+        if skymap is False:
+            skymap = prepare_skymap(mapPath=mapPath, log=log)
+        if skymap.get('region'):
+            raise AttributeError("coarse_skymap needs the whole map, not a region-restricted skymap")
+
+        self.meta = skymap['meta']
+
+        # THE FIRST MAP ROW OVERLAPPING EACH COARSE PIXEL. MAP ROWS ARE ORDERED BY INDEX29, SO THE ROWS
+        # OVERLAPPING COARSE PIXEL c RUN FROM first[c] UP TO first[c+1] (OR JUST first[c] WHEN ONE LARGE
+        # MAP PIXEL COVERS SEVERAL COARSE PIXELS)
+        self.shift = 2 * (MAX_LEVEL - self.level)
+        coarseStarts = np.arange(12 * 4**self.level, dtype=np.int64) << self.shift
+        first = np.searchsorted(skymap['INDEX29'], coarseStarts, side='right') - 1
+        low = np.minimum.reduceat(skymap['CUMPROB'], first)
+        high = np.maximum.reduceat(skymap['CUMPROB'], first)
+
+        self.cumprob = ((low + high) / 2.).astype(np.float32)
+        # HALF THE RANGE OF CREDIBLE LEVELS WITHIN EACH COARSE PIXEL (%), ROUNDED UP
+        self.error = (np.ceil((high - low) * 5000.) / 100.).astype(np.float32)
+        self.maxError = float(self.error.max())
+
+        return None
+
+    def get(
+            self,
+            ra,
+            dec):
+        """*get the approximate credible level at the given sky-locations*
+
+        **Key Arguments:**
+            - ``ra`` -- right ascension in decimal degrees (float or list)
+            - ``dec`` -- declination in decimal degrees (float or list)
+
+        **Return:**
+            - ``probs`` -- a list of approximate probabilities (%), one per location. Each is within ``maxError`` of the exact value.
+        """
+        self.log.debug('starting the ``get`` method')
+
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import coordinate_arrays, lonlat_to_index29
+
+        ra, dec = coordinate_arrays(ra, dec)
+        ipix = lonlat_to_index29(ra, dec) >> self.shift
+        probs = np.around(self.cumprob[ipix].astype(np.float64) * 100., 2).tolist()
+
+        self.log.debug('completed the ``get`` method')
+        return probs
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*A reusable set of sky-locations with their level-29 HealPix indices precomputed, for annotating against many maps and map revisions*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class coordinate_set(object):
+    """
+    *a reusable set of sky-locations with their level-29 HealPix indices precomputed, for annotating against many maps and map revisions*
+
+    **Key Arguments:**
+        - ``log`` -- logger
+        - ``ra`` -- right ascension in decimal degrees (float, list or numpy array)
+        - ``dec`` -- declination in decimal degrees (float, list or numpy array)
+        - ``sort`` -- also keep the indices sorted (with the permutation back to the input order), so catalogues larger than the maps are matched with a sort-merge join. Default *True*
+        - ``frame`` -- the frame of the input locations: ``icrs``, ``galactic`` or ``ecliptic`` (``ra`` and ``dec`` then hold longitudes and latitudes). Converted to equatorial coordinates once, so ``ra`` and ``dec`` attributes are always equatorial. Default *icrs*
+
+    **Usage:**
+
+    Convert a catalogue once and pass it to `prob_at_location` in place of ``ra`` (``dec`` is then ignored) for every map and revision of an event:
+
+    ```python
+    from skytag.commonutils import coordinate_set, prob_at_location
+    coords = coordinate_set(
+        log=log,
+        ra=raArray,
+        dec=decArray
+    )
+    for mapPath in ["preliminary.multiorder.fits", "initial.multiorder.fits", "update.multiorder.fits"]:
+        probs = prob_at_location(
+            log=log,
+            ra=coords,
+            dec=None,
+            mapPath=mapPath
+        )
+    ```
+
+    Results are always returned in the order of the input sky-locations.
+    """
+
+    def __init__(
+            self,
+            log,
+            ra,
+            dec,
+            sort=True,
+            frame="icrs"
+    ):
+        self.log = log
+        log.debug("instansiating a new 'coordinate_set' object")
+
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import coordinate_arrays, lonlat_to_index29, frame_to_icrs
+
+        self.ra, self.dec = frame_to_icrs(*coordinate_arrays(ra, dec), frame=frame)
+        self.ipix = np.asarray(lonlat_to_index29(self.ra, self.dec), dtype=np.int64)
+
+        self.order = None
+        self.sortedIpix = None
+        if sort:
+            self.order = np.argsort(self.ipix, kind='stable')
+            self.sortedIpix = self.ipix[self.order]
+
+        return None
+
+    def __len__(
+            self):
+        return len(self.ipix)
+
+    def match(
+            self,
+            skymap,
+            partial=None):
+        """*match the sky-locations to the rows of a prepared skymap*
+
+        **Key Arguments:**
+            - ``skymap`` -- the prepared skymap (see `prepare_skymap`)
+            - ``partial`` -- the map only covers part of the sky (see `match_skymap_pixels`). Default *None*
+
+        **Return:**
+            - ``rows`` -- the skymap row of each sky-location, in the input order (-1 for locations outside a region-restricted map)
+        """
+        self.log.debug('starting the ``match`` method')
+
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import match_skymap_pixels
+
+        if self.order is None:
+            rows = match_skymap_pixels(skymap, self.ipix, partial=partial)
+        else:
+            sortedRows = match_skymap_pixels(skymap, self.sortedIpix, partial=partial)
+            rows = np.empty_like(sortedRows)
+            rows[self.order] = sortedRows
+
+        self.log.debug('completed the ``match`` method')
+        return rows
+
+
+def credible_level_changes(
+        ra,
+        dec,
+        oldMapPath=False,
+        newMapPath=False,
+        log=False,
+        oldSkymap=False,
+        newSkymap=False):
+    """*Report the change in credible level of every sky-location between two revisions of an event's skymap*
+
+    **Key Arguments:**
+        - ``ra`` -- right ascension in decimal degrees (float or list), or a `coordinate_set` (``dec`` is then ignored)
+        - ``dec`` -- declination in decimal degrees (float or list)
+        - ``oldMapPath`` -- path the the earlier map revision
+        - ``newMapPath`` -- path the the later map revision
+        - ``log`` -- logger
+        - ``oldSkymap`` -- an already prepared earlier revision (see `prepare_skymap`), used in place of ``oldMapPath``. Default *False*
+        - ``newSkymap`` -- an already prepared later revision, used in place of ``newMapPath``. Default *False*
+
+    **Return:**
+        - ``oldProbs`` -- the credible level (%) of each location in the earlier revision
+        - ``newProbs`` -- the credible level (%) of each location in the later revision
+        - ``changes`` -- the change in credible level (%) of each location (negative where the location has become more probable)
+
+    ```python
+    from skytag.commonutils import credible_level_changes
+    oldProbs, newProbs, changes = credible_level_changes(
+        log=log,
+        ra=[10.343234, 170.343532],
+        dec=[14.345532, -40.532255],
+        oldMapPath="/path/to/initial.multiorder.fits",
+        newMapPath="/path/to/update.multiorder.fits"
+    )
+    ```
+
+    The sky-locations are converted to HealPix indices once and matched to both revisions.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``credible_level_changes`` function')
+
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import prepare_skymap, take_rows
+
+    coords = ra if isinstance(ra, coordinate_set) else coordinate_set(log=log, ra=ra, dec=dec)
+    if oldSkymap is False:
+        oldSkymap = prepare_skymap(mapPath=oldMapPath, log=log)
+    if newSkymap is False:
+        newSkymap = prepare_skymap(mapPath=newMapPath, log=log)
+
+    oldProbs = np.around(take_rows(oldSkymap['CUMPROB'], coords.match(oldSkymap)) * 100., 2)
+    newProbs = np.around(take_rows(newSkymap['CUMPROB'], coords.match(newSkymap)) * 100., 2)
+    changes = np.around(newProbs - oldProbs, 2)
+
+    log.debug('completed the ``credible_level_changes`` function')
+    return oldProbs.tolist(), newProbs.tolist(), changes.tolist()
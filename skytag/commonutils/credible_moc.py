@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*The credible regions of a skymap as Multi-Order Coverage maps (MOCs), several levels in one pass*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+
+def credible_moc(
+        mapPath=False,
+        log=False,
+        credible=[50., 90., 95.],
+        skymap=False):
+    """*The credible regions of a skymap as Multi-Order Coverage maps (MOCs), several levels in one pass*
+
+    **Key Arguments:**
+        - ``mapPath`` -- path the the multi-order HealPix map
+        - ``log`` -- logger
+        - ``credible`` -- the credible level (%), or list of levels, to build MOCs for. Default *[50, 90, 95]*
+        - ``skymap`` -- an already prepared (whole-sky) skymap (see `prepare_skymap`), used in place of reading ``mapPath``. Default *False*
+
+    **Return:**
+        - ``mocs`` -- a dictionary of `sky_moc` objects keyed by credible level
+
+    ```python
+    from skytag.commonutils import credible_moc
+    mocs = credible_moc(
+        log=log,
+        mapPath="/path/to/bayestar.multiorder.fits",
+        credible=[50., 90., 95.]
+    )
+    for level, moc in mocs.items():
+        moc.write(f"/path/to/S230518h.{level:g}.moc.fits")
+    inside = mocs[90.].contains(ra=catalogue["ra"], dec=catalogue["dec"])
+    ```
+
+    A pixel lies within a credible region when its cumulative probability (``CUMPROB``, ranked by probability density when the map was prepared) is at most the level, as for `skymap_overlap`. One binary search places every pixel at the tightest requested level containing it, so no map is re-sorted. The pixels of each region are then turned into level-29 index ranges in ``INDEX29`` order, with neighbouring pixels merged. A location is inside the 90% MOC exactly when its unrounded `prob_at_location` level is at most 90.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``credible_moc`` function')
+
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import prepare_skymap, MAX_LEVEL
+    from skytag.commonutils.sky_moc import sky_moc
+
+    if not isinstance(credible, (list, tuple, np.ndarray)):
+        credible = [credible]
+    levels = sorted(set(float(c) for c in credible))
+    if not levels or levels[0] <= 0. or levels[-1] > 100.:
+        raise AttributeError("The credible levels must be percentages above 0 and at most 100")
+
+    if skymap is False:
+        skymap = prepare_skymap(mapPath=mapPath, log=log)
+    if skymap.get('region'):
+        raise AttributeError("Credible region MOCs need a whole-sky prepared skymap")
+
+    # THE TIGHTEST REQUESTED LEVEL HOLDING EACH PIXEL (len(levels) FOR PIXELS OUTSIDE THEM ALL). THE 100% REGION
+    # IS THE WHOLE MAP, WHATEVER ROUNDING THE CUMULATIVE SUM PICKED UP
+    limits = np.where(np.array(levels) < 100., np.array(levels) / 100., np.inf)
+    tightest = np.searchsorted(limits, np.asarray(skymap['CUMPROB']), side='left')
+    starts = np.asarray(skymap['INDEX29'])
+    stops = starts + np.left_shift(np.int64(1), 2 * (MAX_LEVEL - np.asarray(skymap['LEVEL']).astype(np.int64)))
+
+    mocs = {}
+    for i, level in enumerate(levels):
+        inside = tightest <= i
+        mocs[level] = sky_moc(log=log, ranges=np.stack([starts[inside], stops[inside]], axis=1))
+
+    log.debug('completed the ``credible_moc`` function')
+    return mocs
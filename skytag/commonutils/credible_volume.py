@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*The 3D credible volume level of sky-locations at given distances, from a skymap's distance layers*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+# THE NUMBER OF DENSITY SHELLS EACH PIXEL'S DISTANCE ANSATZ IS SPLIT INTO WHEN BUILDING THE VOLUME TABLE
+VOLUME_SHELLS = 128
+# THE SHELLS COVER THE ANSATZ OUT TO THIS MANY SIGMA EITHER SIDE OF DISTMU
+VOLUME_SIGMAS = 5.
+# PIXELS PROCESSED TOGETHER WHEN BUILDING THE VOLUME TABLE (BOUNDS THE MEMORY USED)
+VOLUME_CHUNK_PIXELS = 2048
+
+
+def credible_volume(
+        ra,
+        dec,
+        distance,
+        mapPath=False,
+        log=False,
+        skymap=False,
+        frame="icrs"):
+    """*The 3D credible volume level of sky-locations at given distances, from a skymap's distance layers*
+
+    **Key Arguments:**
+        - ``ra`` -- right ascension in decimal degrees (float or list)
+        - ``dec`` -- declination in decimal degrees (float or list)
+        - ``distance`` -- luminosity distance in Mpc, one per location (float or list)
+        - ``mapPath`` -- path the the multi-order HealPix map (with distance layers)
+        - ``log`` -- logger
+        - ``skymap`` -- an already prepared (whole-sky) skymap (see `prepare_skymap`), used in place of reading ``mapPath``. Default *False*
+        - ``frame`` -- the frame of ``ra`` and ``dec``: ``icrs``, ``galactic`` or ``ecliptic``. Default *icrs*
+
+    **Return:**
+        - ``volumeLevels`` -- the credible volume level (%) of each location: the probability held by the part of the 3D posterior denser than the location
+
+    ```python
+    from skytag.commonutils import credible_volume
+    volumeLevels = credible_volume(
+        log=log,
+        ra=galaxies["ra"],
+        dec=galaxies["dec"],
+        distance=galaxies["distance"],
+        mapPath="/path/to/bayestar.multiorder.fits"
+    )
+    ```
+
+    This is the 3D counterpart of the credible level returned by `prob_at_location`, ranking volume density (per Mpc^3) rather than sky density. A galaxy in the 90% credible volume has a level of at most 90. The density at distance ``r`` in a pixel is ``PROBDENSITY x DISTNORM x N(r; DISTMU, DISTSIGMA)``.
+
+    The map is ranked once, then every location is a pixel match and an interpolation. To rank the map, each pixel's distance ansatz is split into ``VOLUME_SHELLS`` shells bounded by a global grid of log-density levels, and the probability of every shell is integrated in closed form. Summing the shells level by level gives a table of the probability denser than each level. The table is cached on the prepared skymap, so pass the same ``skymap`` to rank the map only once across calls. A location's level is interpolated in this table at its density. Locations in pixels without a distance estimate have zero volume density and a level of 100.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``credible_volume`` function')
+
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import prepare_skymap, coordinate_arrays, frame_to_icrs, lonlat_to_index29, match_skymap_pixels
+
+    ra, dec = coordinate_arrays(ra, dec)
+    ra, dec = frame_to_icrs(ra, dec, frame)
+    distance = np.atleast_1d(np.asarray(distance, dtype=np.float64))
+    if distance.shape != ra.shape:
+        raise AttributeError("The distance list must be of equal length to RA and Dec lists")
+
+    if skymap is False:
+        skymap = prepare_skymap(mapPath=mapPath, log=log)
+    if 'DISTMU' not in skymap:
+        raise AttributeError("The skymap has no distance layers, so has no credible volume")
+    if skymap.get('region'):
+        raise AttributeError("Credible volumes need a whole-sky prepared skymap")
+
+    edges, above = _volume_table(skymap)
+    rows = match_skymap_pixels(skymap, lonlat_to_index29(ra, dec))
+    density = volume_density(skymap, rows, distance)
+
+    # np.interp NEEDS NO SPECIAL CASES ABOVE THE TABLE (LEVEL 0); ZERO DENSITIES LIE BELOW ALL OF IT (LEVEL 1)
+    with np.errstate(divide='ignore'):
+        logDensity = np.log(density)
+    levels = np.interp(logDensity, edges, above)
+    levels[density <= 0.] = 1.
+    levels[np.isnan(density)] = np.nan
+
+    log.debug('completed the ``credible_volume`` function')
+    return np.around(levels * 100., 2).tolist()
+
+
+def volume_density(
+        skymap,
+        rows,
+        distance):
+    """*the posterior volume density (per Mpc^3) at matched skymap rows and distances*
+
+    **Key Arguments:**
+        - ``skymap`` -- the prepared skymap (with distance layers)
+        - ``rows`` -- the matched skymap rows (see `match_skymap_pixels`)
+        - ``distance`` -- numpy array of distances (Mpc)
+
+    **Return:**
+        - ``density`` -- numpy array of volume densities (zero in pixels without a distance estimate, and at negative distances)
+    """
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import take_rows
+
+    probdensity = np.asarray(take_rows(skymap['PROBDENSITY'], rows), dtype=np.float64)
+    distmu = np.asarray(take_rows(skymap['DISTMU'], rows), dtype=np.float64)
+    distsigma = np.asarray(take_rows(skymap['DISTSIGMA'], rows), dtype=np.float64)
+    distnorm = np.asarray(take_rows(skymap['DISTNORM'], rows), dtype=np.float64)
+
+    valid = _valid_ansatz(distmu, distsigma, distnorm)
+    density = np.zeros(len(rows))
+    z = (distance[valid] - distmu[valid]) / distsigma[valid]
+    density[valid] = probdensity[valid] * distnorm[valid] * np.exp(-0.5 * z**2) / (np.sqrt(2. * np.pi) * distsigma[valid])
+    density[distance < 0.] = 0.
+    density[np.isnan(distance) | np.isnan(probdensity)] = np.nan
+    return density
+
+
+def _volume_table(
+        skymap):
+    """*the (cached) table of log volume density levels and the probability denser than each level*
+
+    Each pixel's ansatz is cut at the global log-density level grid (spacing ``VOLUME_SIGMAS^2 / 2 / VOLUME_SHELLS``) below its peak density, so every shell falls in exactly one level bin. The probability of each shell is integrated in closed form and added to its bin; the tail beyond the last shell goes to the next bin down.
+    """
+    import numpy as np
+    from scipy.special import ndtr
+
+    cached = skymap.get('volumeTable')
+    if cached is not None and cached[0] is skymap['INDEX29']:
+        return cached[1:]
+
+    prob = np.asarray(skymap['PROB'], dtype=np.float64)
+    distmu = np.asarray(skymap['DISTMU'], dtype=np.float64)
+    distsigma = np.asarray(skymap['DISTSIGMA'], dtype=np.float64)
+    distnorm = np.asarray(skymap['DISTNORM'], dtype=np.float64)
+    valid = _valid_ansatz(distmu, distsigma, distnorm) & (prob > 0.)
+    prob, distmu, distsigma, distnorm = prob[valid], distmu[valid], distsigma[valid], distnorm[valid]
+    probdensity = np.asarray(skymap['PROBDENSITY'], dtype=np.float64)[valid]
+
+    # THE GLOBAL LEVEL GRID IN LOG DENSITY, REACHING FROM THE HIGHEST PEAK TO BELOW THE LAST SHELL OF THE LOWEST
+    step = VOLUME_SIGMAS**2 / 2. / VOLUME_SHELLS
+    logPeak = np.log(probdensity * distnorm / (np.sqrt(2. * np.pi) * distsigma))
+    bottom = logPeak.min() - (VOLUME_SHELLS + 1) * step
+    bins = int(np.floor((logPeak.max() - bottom) / step)) + 1
+    mass = np.zeros(bins)
+
+    steps = np.arange(VOLUME_SHELLS + 1)
+    for start in range(0, len(prob), VOLUME_CHUNK_PIXELS):
+        chunk = slice(start, start + VOLUME_CHUNK_PIXELS)
+        mu, sigma = distmu[chunk, None], distsigma[chunk, None]
+        top = np.floor((logPeak[chunk] - bottom) / step).astype(np.int64)
+        # LEVEL m SITS m - 1 GRID STEPS BELOW THE TOP BIN'S LOWER EDGE (m = 0 IS THE PEAK ITSELF)
+        drop = np.maximum(logPeak[chunk, None] - (bottom + (top[:, None] - steps + 1) * step), 0.)
+        drop[:, 0] = 0.
+        z = np.sqrt(2. * drop)
+        cdf = ndtr(z)
+        phi = np.exp(-drop) / np.sqrt(2. * np.pi)
+        # THE PROBABILITY DENSER THAN EACH LEVEL IS THE INTEGRAL OF (mu + sigma t)^2 phi(t) dt FROM -z TO z ...
+        inner = (mu**2 + sigma**2) * (2. * cdf - 1.) - 2. * sigma**2 * z * phi
+        # ... OR FROM r = 0 TO z FOR THE LEVELS REACHING PAST r = 0
+        zero = -mu / sigma
+        zeroPhi = np.exp(-0.5 * zero**2) / np.sqrt(2. * np.pi)
+        belowZero = (mu**2 + sigma**2) * ndtr(zero) - 2. * mu * sigma * zeroPhi - sigma**2 * zero * zeroPhi
+        inner = np.where(z > -zero, (mu**2 + sigma**2) * cdf - 2. * mu * sigma * phi - sigma**2 * z * phi - belowZero, inner)
+        inner = np.maximum(inner, 0.) * (distnorm[chunk, None] * prob[chunk, None])
+        shells = np.diff(inner, axis=1)
+        tail = np.maximum(prob[chunk] - inner[:, -1], 0.)
+        binIds = top[:, None] - steps[:-1]
+        mass += np.bincount(binIds.ravel(), weights=shells.ravel(), minlength=bins)
+        mass += np.bincount(top - VOLUME_SHELLS, weights=tail, minlength=bins)
+
+    edges = bottom + np.arange(bins + 1) * step
+    above = np.append(np.cumsum(mass[::-1])[::-1], 0.)
+
+    # THE TABLE IS NOT AN ARRAY COLUMN OF THE SKYMAP (SO IS NOT SHARED OR WRITTEN TO A SIDECAR INDEX)
+    skymap['volumeTable'] = (skymap['INDEX29'], edges, above)
+    return edges, above
+
+
+def _valid_ansatz(
+        distmu,
+        distsigma,
+        distnorm):
+    """*the pixels with a usable distance ansatz (maps mark pixels without a distance estimate with infinite DISTMU or zero DISTNORM)*
+    """
+    import numpy as np
+    return np.isfinite(distmu) & np.isfinite(distsigma) & (distsigma > 0.) & np.isfinite(distnorm) & (distnorm > 0.)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Register a ``skytag`` accessor on pandas (and, if installed, Dask) DataFrames*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+
+Importing this module registers the accessor. It is not imported by `skytag.commonutils` itself, so pandas is only loaded by those who use it:
+
+```python
+import skytag.commonutils.dataframe_accessor
+annotated = df.skytag.annotate("/path/to/bayestar.multiorder.fits", ra="ra", dec="dec", mjd="mjd", distance=True)
+```
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+import pandas as pd
+os.environ['TERM'] = 'vt100'
+
+
+class skytag_accessor(object):
+    """
+    *the ``skytag`` DataFrame accessor*
+
+    **Key Arguments:**
+        - ``df`` -- the pandas or Dask DataFrame the accessor is attached to
+
+    **Usage:**
+
+    ```python
+    import skytag.commonutils.dataframe_accessor
+    annotated = df.skytag.annotate(
+        "/path/to/bayestar.multiorder.fits",
+        ra="ra",
+        dec="dec",
+        mjd="mjd",
+        distance=True
+    )
+    ```
+    """
+
+    def __init__(
+            self,
+            df
+    ):
+        self._df = df
+
+        return None
+
+    def annotate(
+            self,
+            mapPath=False,
+            log=False,
+            ra="ra",
+            dec="dec",
+            mjd=False,
+            distance=False,
+            probdensity=False,
+            prefix="",
+            skymap=False,
+            frame="icrs"):
+        """*return a copy of the DataFrame with skymap credible level (and optional) columns appended (see `annotate_dataframe`)*
+        """
+        from skytag.commonutils.annotate_dataframe import annotate_dataframe
+        return annotate_dataframe(df=self._df, mapPath=mapPath, log=log, ra=ra, dec=dec, mjd=mjd, distance=distance, probdensity=probdensity, prefix=prefix, skymap=skymap, frame=frame)
+
+
+pd.api.extensions.register_dataframe_accessor("skytag")(skytag_accessor)
+try:
+    import dask.dataframe as dd
+    dd.extensions.register_dataframe_accessor("skytag")(skytag_accessor)
+except ImportError:
+    pass
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Integrate the map probability contained within telescope fields of view, vectorized over many pointings*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+# THE NUMBER OF SAMPLE POSITIONS HANDLED TOGETHER (BOUNDS THE MEMORY OF THE VECTORIZED INTEGRATION)
+SAMPLE_CHUNK = 2000000
+
+
+def fov_probability(
+        ra,
+        dec,
+        footprint,
+        mapPath=False,
+        log=False,
+        pa=0.,
+        samples=256,
+        skymap=False):
+    """*Integrate the map probability contained within telescope fields of view, vectorized over many pointings*
+
+    **Key Arguments:**
+        - ``ra`` -- right ascension of the pointing centres in decimal degrees (float or list)
+        - ``dec`` -- declination of the pointing centres in decimal degrees (float or list)
+        - ``footprint`` -- the field of view (see below), or a list with one footprint per pointing
+        - ``mapPath`` -- path the the multi-order HealPix map
+        - ``log`` -- logger
+        - ``pa`` -- position angle of each footprint in decimal degrees, east of north (float or list). Default *0*
+        - ``samples`` -- the number of sample positions used to integrate each footprint. Default *256*
+        - ``skymap`` -- an already prepared skymap (see `prepare_skymap`), used in place of ``mapPath``. Default *False*
+
+    **Return:**
+        - ``probs`` -- the map probability (%) contained within each footprint, one per pointing
+
+    A footprint can be:
+
+    - a circle: ``{"radius": 1.2}`` (decimal degrees)
+    - a rectangle: ``{"width": 2.0, "height": 1.5}`` (decimal degrees; ``width`` runs east-west and ``height`` north-south at a position angle of 0)
+    - a polygon: ``{"vertices": [[-1., -1.], [1., -1.], [0., 1.]]}`` (offsets from the pointing centre in decimal degrees, east and north at a position angle of 0)
+
+    Rectangles and polygons are defined on the plane tangent to the sky at the pointing centre, like a detector footprint.
+
+    ```python
+    from skytag.commonutils import fov_probability
+    probs = fov_probability(
+        log=log,
+        ra=[10.3, 170.3],
+        dec=[14.3, -40.5],
+        footprint={"width": 2.0, "height": 2.0},
+        pa=[0., 45.],
+        mapPath="/path/to/bayestar.multiorder.fits"
+    )
+    ```
+
+    The probability density is integrated over a fixed template of ``samples`` positions per footprint, each weighted by the solid angle it represents. The template is rotated onto every pointing at once and matched to the multi-order map pixels with the pixel join (see `match_skymap_pixels`). Evaluating 10,000 pointings at the default 256 samples takes about 2 seconds on a single core, most of it spent converting the 2.56 million samples to HealPix indices, so the time grows with ``samples``. Use more ``samples`` for footprints much larger than the map pixels they cover.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``fov_probability`` function')
+
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import prepare_skymap, coordinate_arrays
+
+    ra, dec = coordinate_arrays(ra, dec)
+    pa = np.broadcast_to(np.asarray(pa, dtype=np.float64), ra.shape)
+    if int(samples) < 1:
+        raise AttributeError("At least one sample per footprint is needed")
+
+    if isinstance(footprint, dict):
+        footprints = [footprint]
+        which = np.zeros(len(ra), dtype=np.int64)
+    else:
+        if len(footprint) != len(ra):
+            raise AttributeError("Give one footprint, or a list of footprints of equal length to the RA and Dec lists")
+        # GROUP THE POINTINGS SHARING A FOOTPRINT SO EACH TEMPLATE IS BUILT ONCE
+        keys = [repr(sorted(f.items())) if isinstance(f, dict) else repr(f) for f in footprint]
+        uniqueKeys = list(dict.fromkeys(keys))
+        footprints = [footprint[keys.index(k)] for k in uniqueKeys]
+        which = np.array([uniqueKeys.index(k) for k in keys], dtype=np.int64)
+
+    if skymap is False:
+        skymap = prepare_skymap(mapPath=mapPath, log=log)
+
+    probs = np.zeros(len(ra))
+    for i, f in enumerate(footprints):
+        x, y, weight = footprint_template(f, samples=samples)
+        selected = which == i
+        probs[selected], _ = integrate_templates(skymap=skymap, ra=ra[selected], dec=dec[selected], pa=pa[selected], x=x, y=y, weight=weight)
+
+    log.debug('completed the ``fov_probability`` function')
+    return np.around(probs * 100., 4).tolist()
+
+
+def footprint_template(
+        footprint,
+        samples=256):
+    """*Sample positions and solid-angle weights covering a footprint, on the plane tangent to the sky at its centre*
+
+    **Key Arguments:**
+        - ``footprint`` -- a circle, rectangle or polygon footprint dictionary (see `fov_probability`)
+        - ``samples`` -- the (approximate) number of sample positions. Default *256*
+
+    **Return:**
+        - ``x`` -- gnomonic (tangent-plane) east offsets of the samples
+        - ``y`` -- gnomonic (tangent-plane) north offsets of the samples
+        - ``weight`` -- the solid angle (sr) each sample represents
+    """
+    import numpy as np
+
+    if not isinstance(footprint, dict):
+        raise AttributeError("A footprint must be a dictionary describing a circle, rectangle or polygon (see `fov_probability`)")
+    samples = int(samples)
+
+    if "radius" in footprint:
+        radius = np.radians(float(footprint["radius"]))
+        if not 0. < radius < np.pi / 2.:
+            raise AttributeError("A circular footprint radius must be between 0 and 90 degrees")
+        # EQUAL-AREA SAMPLES OF THE SPHERICAL CAP ON A SUNFLOWER SPIRAL
+        i = np.arange(samples) + 0.5
+        rho = np.arccos(1. - i / samples * (1. - np.cos(radius)))
+        theta = i * np.pi * (3. - np.sqrt(5.))
+        x = np.tan(rho) * np.sin(theta)
+        y = np.tan(rho) * np.cos(theta)
+        weight = np.full(samples, 2. * np.pi * (1. - np.cos(radius)) / samples)
+        return x, y, weight
+
+    vx, vy = _footprint_vertices(footprint)
+
+    # A GRID OF CELL CENTRES OVER THE BOUNDING BOX, SIZED SO ~samples CELLS FALL INSIDE THE POLYGON
+    boxWidth, boxHeight = vx.max() - vx.min(), vy.max() - vy.min()
+    area = 0.5 * abs(np.dot(vx, np.roll(vy, -1)) - np.dot(vy, np.roll(vx, -1)))
+    if area <= 0.:
+        raise AttributeError("A footprint must enclose a non-zero area")
+    cells = samples * boxWidth * boxHeight / area
+    nx = max(1, int(round(np.sqrt(cells * boxWidth / boxHeight))))
+    ny = max(1, int(round(cells / nx)))
+    dx, dy = boxWidth / nx, boxHeight / ny
+    x, y = np.meshgrid(vx.min() + (np.arange(nx) + 0.5) * dx, vy.min() + (np.arange(ny) + 0.5) * dy)
+    x, y = x.ravel(), y.ravel()
+
+    inside = _inside_polygon(vx, vy, x, y)
+    x, y = x[inside], y[inside]
+
+    # SOLID ANGLE OF A GNOMONIC PLANE ELEMENT
+    weight = dx * dy / (1. + x**2 + y**2)**1.5
+    return x, y, weight
+
+
+def integrate_templates(
+        skymap,
+        ra,
+        dec,
+        pa,
+        x,
+        y,
+        weight):
+    """*Integrate the map probability over sample templates placed at many sky positions*
+
+    **Key Arguments:**
+        - ``skymap`` -- the prepared skymap (see `prepare_skymap`)
+        - ``ra`` -- right ascension of the template centres in decimal degrees (numpy array)
+        - ``dec`` -- declination of the template centres in decimal degrees (numpy array)
+        - ``pa`` -- position angle of each template in decimal degrees, east of north (numpy array)
+        - ``x`` -- gnomonic east offsets of the samples. Shape ``(samples,)`` for one template shared by every centre, or ``(centres, samples)``
+        - ``y`` -- gnomonic north offsets of the samples (same shape as ``x``)
+        - ``weight`` -- the solid angle (sr) of each sample (same shape as ``x``)
+
+    **Return:**
+        - ``probs`` -- the probability (fraction) within each template
+        - ``bestCumprob`` -- the lowest cumulative probability (best credible level, fraction) of any sample within each template
+    """
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import lonlat_to_index29, match_skymap_pixels, take_rows
+
+    count = len(ra)
+    x, y, weight = np.atleast_1d(x), np.atleast_1d(y), np.atleast_1d(weight)
+    shared = x.ndim == 1
+    sampleCount = x.shape[-1]
+
+    centre, xAxis, yAxis = _tangent_axes(ra, dec, pa)
+
+    probs = np.zeros(count)
+    bestCumprob = np.full(count, np.nan)
+    step = max(1, SAMPLE_CHUNK // max(sampleCount, 1))
+    for start in range(0, count, step):
+        stop = min(start + step, count)
+        cx = x if shared else x[start:stop]
+        cy = y if shared else y[start:stop]
+        cw = weight if shared else weight[start:stop]
+        v = centre[start:stop, None, :] + cx[..., None] * xAxis[start:stop, None, :] + cy[..., None] * yAxis[start:stop, None, :]
+        lon = np.degrees(np.arctan2(v[..., 1], v[..., 0])) % 360.
+        lat = np.degrees(np.arctan2(v[..., 2], np.hypot(v[..., 0], v[..., 1])))
+        del v
+
+        rows = match_skymap_pixels(skymap, lonlat_to_index29(lon.ravel(), lat.ravel()))
+        # SAMPLES OUTSIDE A REGION-RESTRICTED MAP CONTRIBUTE NOTHING
+        density = np.nan_to_num(take_rows(skymap['PROBDENSITY'], rows).reshape(lon.shape))
+        probs[start:stop] = (density * cw).sum(axis=-1)
+        cumprob = take_rows(skymap['CUMPROB'], rows).reshape(lon.shape)
+        if not np.isnan(cumprob).all():
+            bestCumprob[start:stop] = np.nanmin(np.where(np.isnan(cumprob), np.inf, cumprob), axis=-1)
+
+    bestCumprob[np.isinf(bestCumprob)] = np.nan
+    return probs, bestCumprob
+
+
+def _footprint_vertices(
+        footprint):
+    """*the gnomonic (tangent-plane) vertices of a rectangle or polygon footprint*
+    """
+    import numpy as np
+
+    if "width" in footprint or "height" in footprint:
+        if "width" not in footprint or "height" not in footprint:
+            raise AttributeError("A rectangular footprint needs width and height keys")
+        width, height = float(footprint["width"]), float(footprint["height"])
+        vertices = [[-width / 2., -height / 2.], [width / 2., -height / 2.], [width / 2., height / 2.], [-width / 2., height / 2.]]
+    elif "vertices" in footprint:
+        vertices = footprint["vertices"]
+    else:
+        raise AttributeError("A footprint needs a radius (circle), width and height (rectangle) or vertices (polygon)")
+
+    vertices = np.asarray(vertices, dtype=np.float64)
+    if vertices.ndim != 2 or vertices.shape[1] != 2 or len(vertices) < 3:
+        raise AttributeError("A polygon footprint needs at least 3 [east, north] vertices")
+    if np.abs(vertices).max() >= 90.:
+        raise AttributeError("Footprint vertices must lie within 90 degrees of the pointing centre")
+    return np.tan(np.radians(vertices[:, 0])), np.tan(np.radians(vertices[:, 1]))
+
+
+def _inside_polygon(
+        vx,
+        vy,
+        x,
+        y):
+    """*even-odd point-in-polygon test of tangent-plane positions against every polygon edge*
+    """
+    import numpy as np
+
+    inside = np.zeros(np.shape(x), dtype=bool)
+    for x0, y0, x1, y1 in zip(vx, vy, np.roll(vx, -1), np.roll(vy, -1)):
+        crosses = (y0 > y) != (y1 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossX = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= crosses & (x < crossX)
+    return inside
+
+
+def _tangent_axes(
+        ra,
+        dec,
+        pa):
+    """*the unit vectors of footprint centres and of their tangent-plane axes: x along PA+90 (east at PA=0), y along PA (north at PA=0)*
+    """
+    import numpy as np
+
+    a, d, p = np.radians(ra), np.radians(dec), np.radians(pa)
+    centre = np.stack([np.cos(d) * np.cos(a), np.cos(d) * np.sin(a), np.sin(d)], axis=-1)
+    east = np.stack([-np.sin(a), np.cos(a), np.zeros(len(a))], axis=-1)
+    north = np.stack([-np.sin(d) * np.cos(a), -np.sin(d) * np.sin(a), np.cos(d)], axis=-1)
+    xAxis = east * np.cos(p)[:, None] - north * np.sin(p)[:, None]
+    yAxis = north * np.cos(p)[:, None] + east * np.sin(p)[:, None]
+    return centre, xAxis, yAxis
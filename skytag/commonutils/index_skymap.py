@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Write (and read back) a precomputed sidecar index next to a skymap so new processes can skip map preparation*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+SIDECAR_SUFFIX = ".skytag"
+SIDECAR_VERSION = 1
+# THE NUMBER OF KEYS SAMPLED TO CHOOSE THE BUCKETS OF AN OUT-OF-CORE SORT
+SORT_SAMPLE = 100000
+
+
+def index_skymap(
+        mapPath,
+        log=False,
+        skymap=False,
+        chunkRows=False):
+    """*Write a precomputed sidecar index next to a skymap so new processes can skip map preparation*
+
+    **Key Arguments:**
+        - ``mapPath`` -- path the the multi-order HealPix map
+        - ``log`` -- logger
+        - ``skymap`` -- the already prepared (whole) skymap. Default *False* (prepare it from ``mapPath``)
+        - ``chunkRows`` -- prepare the map out-of-core, holding no more than about this many map rows in memory at once (see below). Default *False* (prepare the map in memory)
+
+    **Return:**
+        - ``sidecarPath`` -- path to the sidecar index (``<mapPath>.skytag``)
+
+    The sidecar is a directory holding one memory-mappable `.npy` file per prepared array (ordered by ``INDEX29``, with the global ``CUMPROB`` of every pixel giving its credible-level ordering) and a ``meta.json`` file with the map header and a sha256 checksum of the source map.
+
+    ```python
+    from skytag.commonutils import index_skymap
+    sidecarPath = index_skymap(
+        log=log,
+        mapPath="/path/to/bayestar.multiorder.fits"
+    )
+    ```
+
+    Once written, `prepare_skymap` (and so `prob_at_location`) picks the sidecar up automatically while it matches the map. If the map changes the sidecar is ignored until it is rewritten.
+
+    Maps larger than the memory available can be indexed out-of-core by giving a ``chunkRows``:
+
+    ```python
+    sidecarPath = index_skymap(
+        log=log,
+        mapPath="/path/to/huge.multiorder.fits",
+        chunkRows=10000000
+    )
+    ```
+
+    The map columns are then memory-mapped and read in chunks, the probability ranking (for ``CUMPROB``) and the ``INDEX29`` ordering are found with external bucket sorts spilled to scratch files inside the sidecar, and the prepared arrays are written straight to the sidecar files. The sidecar is identical to one prepared in memory (bar the ordering of pixels with exactly equal probability densities). Lookups then memory-map the sidecar, so only the pages of the map they touch become resident. Memory use scales with ``chunkRows`` rather than with the map, but the scratch files need roughly twice the map's size in free disk space.
+
+    From the command-line:
+
+    ```bash
+    skytag index /path/to/bayestar.multiorder.fits
+    skytag --chunk 10000000 index /path/to/huge.multiorder.fits
+    ```
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``index_skymap`` function')
+
+    import json
+    import shutil
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import prepare_skymap
+
+    if chunkRows is not False and int(chunkRows) < 1:
+        raise AttributeError("The out-of-core chunk size must be at least 1 row")
+    if chunkRows and skymap is not False:
+        raise AttributeError("An already prepared skymap cannot be indexed out-of-core")
+    if skymap is False and not chunkRows:
+        skymap = prepare_skymap(mapPath=mapPath, log=log, useIndex=False)
+    if skymap is not False and skymap.get('region'):
+        raise AttributeError("Only a whole-sky prepared skymap can be written to a sidecar index")
+
+    sidecarPath = os.fspath(mapPath) + SIDECAR_SUFFIX
+    stat = os.stat(mapPath)
+    meta = {
+        "version": SIDECAR_VERSION,
+        "sha256": _checksum(mapPath),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "arrays": [],
+        "header": {}
+    }
+
+    # WRITE TO A TEMPORARY DIRECTORY FIRST SO READERS NEVER SEE A HALF-WRITTEN INDEX
+    tmpPath = sidecarPath + ".tmp%s" % (os.getpid(),)
+    if os.path.exists(tmpPath):
+        shutil.rmtree(tmpPath)
+    os.makedirs(tmpPath)
+    try:
+        if chunkRows:
+            header, meta["arrays"] = _write_arrays_out_of_core(mapPath=mapPath, sidecarPath=tmpPath, chunkRows=int(chunkRows), log=log)
+        else:
+            header = skymap['meta']
+            for k, v in skymap.items():
+                if isinstance(v, np.ndarray):
+                    np.save(os.path.join(tmpPath, k + ".npy"), np.ascontiguousarray(v))
+                    meta["arrays"].append(k)
+    except Exception:
+        shutil.rmtree(tmpPath, ignore_errors=True)
+        raise
+    for k, v in header.items():
+        try:
+            json.dumps(v)
+            meta["header"][k] = v
+        except TypeError:
+            meta["header"][k] = str(v)
+    with open(os.path.join(tmpPath, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    if os.path.exists(sidecarPath):
+        shutil.rmtree(sidecarPath)
+    os.rename(tmpPath, sidecarPath)
+
+    log.debug('completed the ``index_skymap`` function')
+    return sidecarPath
+
+
+def read_skymap_index(
+        mapPath,
+        log=False,
+        region=False):
+    """*Read the prepared skymap from its sidecar index, if one exists and matches the map*
+
+    **Key Arguments:**
+        - ``mapPath`` -- path the the multi-order HealPix map
+        - ``log`` -- logger
+        - ``region`` -- only read the rows overlapping this region of the sky (see `prepare_skymap`). Default *False*
+
+    **Return:**
+        - ``skymap`` -- the prepared skymap (arrays are read-only memory-maps of the sidecar files), or None if there is no valid sidecar
+
+    The sidecar is trusted if the map's size and modification time are unchanged since indexing. Otherwise the map checksum is recomputed and compared.
+
+    Because the arrays are ordered by ``INDEX29`` and store the global ``CUMPROB`` of every pixel, a ``region`` is resolved with a binary search and only the matching rows are read from disk.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``read_skymap_index`` function')
+
+    import json
+    import numpy as np
+
+    try:
+        sidecarPath = os.fspath(mapPath) + SIDECAR_SUFFIX
+        metaPath = os.path.join(sidecarPath, "meta.json")
+        if not os.path.exists(metaPath):
+            return None
+        with open(metaPath) as f:
+            meta = json.load(f)
+        stat = os.stat(mapPath)
+        if meta.get("version") != SIDECAR_VERSION or meta["size"] != stat.st_size:
+            raise ValueError("sidecar version or map size mismatch")
+        if meta["mtime_ns"] != stat.st_mtime_ns and meta["sha256"] != _checksum(mapPath):
+            raise ValueError("map checksum mismatch")
+        arrays = {k: np.load(os.path.join(sidecarPath, k + ".npy"), mmap_mode='r') for k in meta["arrays"]}
+    except Exception as e:
+        log.warning('ignoring the sidecar index of `%(mapPath)s` (%(e)s)' % locals())
+        return None
+
+    if region:
+        rows = _region_rows(region=region, index29=arrays['INDEX29'])
+        skymap = {k: np.asarray(v[rows]) for k, v in arrays.items()}
+    else:
+        skymap = arrays
+    skymap['meta'] = meta["header"]
+    skymap['region'] = region
+
+    log.debug('completed the ``read_skymap_index`` function')
+    return skymap
+
+
+def _region_rows(
+        region,
+        index29):
+    """*find the rows of an INDEX29-ordered skymap overlapping a region, touching only the parts of INDEX29 the binary search visits*
+
+    **Key Arguments:**
+        - ``region`` -- the region dictionary (see `prepare_skymap`)
+        - ``index29`` -- the sorted INDEX29 array of the whole map (may be memory-mapped)
+
+    **Return:**
+        - ``rows`` -- sorted, unique row indices
+    """
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import _region_pixels, MAX_LEVEL
+
+    regionLevel, regionPixels = _region_pixels(region)
+    shift = 2 * (MAX_LEVEL - regionLevel)
+    regionPixels = regionPixels.astype(np.int64)
+
+    # EACH REGION PIXEL SPANS THE MAP ROWS FROM THE ONE CONTAINING ITS FIRST LEVEL-29 SUB-PIXEL TO THE ONE CONTAINING ITS LAST
+    first = np.maximum(np.searchsorted(index29, regionPixels << shift, side='right') - 1, 0)
+    last = np.searchsorted(index29, (regionPixels + 1) << shift, side='left') - 1
+    last = np.maximum(last, first)
+    counts = last - first + 1
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.unique(np.repeat(first, counts) + offsets)
+
+
+def _write_arrays_out_of_core(
+        mapPath,
+        sidecarPath,
+        chunkRows,
+        log):
+    """*prepare a skymap chunk by chunk, writing the prepared arrays straight to the sidecar files*
+
+    **Key Arguments:**
+        - ``mapPath`` -- path the the multi-order HealPix map
+        - ``sidecarPath`` -- the directory to write the prepared arrays to
+        - ``chunkRows`` -- the number of map rows handled at once
+        - ``log`` -- logger
+
+    **Return:**
+        - ``header`` -- the map header
+        - ``arrays`` -- the names of the arrays written
+    """
+    import shutil
+    import numpy as np
+    import astropy_healpix as ah
+    from astropy import units as u
+    from numpy.lib.format import open_memmap
+    from skytag.commonutils.prepare_skymap import read_skymap_table, MAX_LEVEL, DISTANCE_COLUMNS
+
+    table = read_skymap_table(mapPath, memmap=True)
+    count = len(table)
+    columns = ['UNIQ', 'PROBDENSITY'] + [c for c in DISTANCE_COLUMNS if c in table.colnames]
+    workPath = os.path.join(sidecarPath, "scratch")
+    os.makedirs(workPath)
+    log.info('preparing the %(count)s pixels of `%(mapPath)s` out-of-core, %(chunkRows)s rows at a time' % locals())
+
+    # THE INDEX29 AND PROBABILITY OF EVERY PIXEL, IN FILE ORDER
+    index29 = open_memmap(os.path.join(workPath, "index29.npy"), mode='w+', dtype=np.int64, shape=(count,))
+    prob = open_memmap(os.path.join(workPath, "prob.npy"), mode='w+', dtype=np.float64, shape=(count,))
+    for start in range(0, count, chunkRows):
+        stop = min(start + chunkRows, count)
+        level, ipix = ah.uniq_to_level_ipix(np.asarray(table['UNIQ'][start:stop], dtype=np.int64))
+        index29[start:stop] = ipix * (2**(MAX_LEVEL - level))**2
+        area = ah.nside_to_pixel_area(ah.level_to_nside(level)).to_value(u.steradian)
+        prob[start:stop] = area * np.asarray(table['PROBDENSITY'][start:stop], dtype=np.float64)
+
+    # CUMULATIVE PROBABILITY IN ORDER OF DECREASING PROBDENSITY (THE RUNNING TOTAL IS CARRIED INTO EACH RUN SO THE SUMS MATCH A SINGLE CUMSUM)
+    cumprob = open_memmap(os.path.join(workPath, "cumprob.npy"), mode='w+', dtype=np.float64, shape=(count,))
+    total = 0.
+    for rows, keys in _external_argsort(table['PROBDENSITY'], chunkRows=chunkRows, workPath=workPath, descending=True):
+        runningSum = np.cumsum(np.concatenate([[total], _gather(prob, rows)]))[1:]
+        cumprob[np.sort(rows)] = runningSum[np.argsort(rows)]
+        total = runningSum[-1]
+
+    # GATHER EVERY ARRAY IN INDEX29 ORDER STRAIGHT INTO THE SIDECAR FILES
+    dtypes = {'UNIQ': np.int64, 'LEVEL': np.int8, 'INDEX29': np.int64, 'PROBDENSITY': np.float64, 'PROB': np.float64, 'CUMPROB': np.float64}
+    dtypes.update({c: np.float64 for c in columns[2:]})
+    outputs = {k: open_memmap(os.path.join(sidecarPath, k + ".npy"), mode='w+', dtype=v, shape=(count,)) for k, v in dtypes.items()}
+    position = 0
+    for rows, keys in _external_argsort(index29, chunkRows=chunkRows, workPath=workPath):
+        section = slice(position, position + len(rows))
+        uniq = _gather(table['UNIQ'], rows).astype(np.int64)
+        outputs['UNIQ'][section] = uniq
+        outputs['LEVEL'][section] = ah.uniq_to_level_ipix(uniq)[0]
+        outputs['INDEX29'][section] = keys
+        outputs['PROB'][section] = _gather(prob, rows)
+        outputs['CUMPROB'][section] = _gather(cumprob, rows)
+        for c in columns[1:]:
+            outputs[c][section] = _gather(table[c], rows)
+        position += len(rows)
+    for v in outputs.values():
+        v.flush()
+
+    header = dict(table.meta)
+    del table, index29, prob, cumprob, outputs
+    shutil.rmtree(workPath)
+    return header, list(dtypes)
+
+
+def _external_argsort(
+        keys,
+        chunkRows,
+        workPath,
+        descending=False):
+    """*argsort an array too large to sort in memory, yielding consecutive runs of the sorted order*
+
+    **Key Arguments:**
+        - ``keys`` -- the (memory-mapped) array to sort
+        - ``chunkRows`` -- the number of keys handled at once
+        - ``workPath`` -- a directory for the scratch files
+        - ``descending`` -- yield the largest keys first. Default *False*
+
+    **Return:**
+        - yields ``(rows, sortedKeys)`` tuples. Concatenated, the ``rows`` are the argsort of ``keys``
+
+    The keys are split into buckets by splitters drawn from a sample of the keys, scattered bucket by bucket into scratch files, and each bucket is then sorted in memory. Buckets hold about half a chunk each, unless many keys are equal.
+    """
+    import numpy as np
+    from numpy.lib.format import open_memmap
+
+    count = len(keys)
+    dtype = np.dtype(keys.dtype).newbyteorder('=')
+
+    def chunk(start):
+        return np.asarray(keys[start:start + chunkRows]).astype(dtype)
+
+    # BUCKET SPLITTERS AT EVENLY SPACED QUANTILES OF A SAMPLE OF THE KEYS
+    sampleRows = np.sort(np.random.default_rng(0).choice(count, size=min(count, SORT_SAMPLE), replace=False))
+    sample = np.sort(np.asarray(keys[sampleRows]).astype(dtype))
+    buckets = 2 * -(-count // chunkRows)
+    splitters = np.unique(sample[(np.arange(1, buckets) * len(sample)) // buckets])
+
+    counts = np.zeros(len(splitters) + 1, dtype=np.int64)
+    for start in range(0, count, chunkRows):
+        counts += np.bincount(np.searchsorted(splitters, chunk(start), side='right'), minlength=len(counts))
+    starts = np.cumsum(counts) - counts
+
+    # SCATTER THE (ROW, KEY) PAIRS INTO CONTIGUOUS BUCKETS ON DISK, ROWS ASCENDING WITHIN EACH BUCKET
+    sortRows = open_memmap(os.path.join(workPath, "sort_rows.npy"), mode='w+', dtype=np.int64, shape=(count,))
+    sortKeys = open_memmap(os.path.join(workPath, "sort_keys.npy"), mode='w+', dtype=dtype, shape=(count,))
+    filled = starts.copy()
+    for start in range(0, count, chunkRows):
+        values = chunk(start)
+        bucket = np.searchsorted(splitters, values, side='right')
+        order = np.argsort(bucket, kind='stable')
+        values, rows, bucketCounts = values[order], start + order, np.bincount(bucket, minlength=len(counts))
+        offset = 0
+        for b in np.flatnonzero(bucketCounts):
+            n = bucketCounts[b]
+            sortRows[filled[b]:filled[b] + n] = rows[offset:offset + n]
+            sortKeys[filled[b]:filled[b] + n] = values[offset:offset + n]
+            filled[b] += n
+            offset += n
+
+    for b in (range(len(counts) - 1, -1, -1) if descending else range(len(counts))):
+        rows = np.asarray(sortRows[starts[b]:starts[b] + counts[b]])
+        values = np.asarray(sortKeys[starts[b]:starts[b] + counts[b]])
+        order = np.argsort(values, kind='stable')
+        if descending:
+            order = order[::-1]
+        yield rows[order], values[order]
+
+    del sortRows, sortKeys
+
+
+def _gather(
+        column,
+        rows):
+    """*gather values of a (memory-mapped) column at arbitrary rows, reading the column in ascending row order*
+    """
+    import numpy as np
+
+    order = np.argsort(rows)
+    values = np.asarray(column[rows[order]])
+    gathered = np.empty(len(rows), dtype=values.dtype.newbyteorder('='))
+    gathered[order] = values
+    return gathered
+
+
+def _checksum(
+        mapPath):
+    """*sha256 checksum of a file*
+    """
+    import hashlib
+
+    h = hashlib.sha256()
+    with open(mapPath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*The lazily computed results of looking up sky-locations in a skymap, with named attributes*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+from functools import cached_property
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class location_result(object):
+    """
+    *the lazily computed results of looking up sky-locations in a skymap, with named attributes*
+
+    **Key Arguments:**
+        - ``log`` -- logger
+        - ``skymap`` -- the prepared skymap the locations were matched to (see `prepare_skymap`)
+        - ``rows`` -- the matched skymap row of each location (see `match_skymap_pixels`)
+        - ``mjd`` -- MJDs of the transient events, one per location (float or list). Default *False*
+
+    **Usage:**
+
+    Returned by `prob_at_location` with ``lazy=True``. The locations are matched to the map up front, but each output is only computed the first time it is read (and then kept):
+
+    ```python
+    from skytag.commonutils import prob_at_location
+    results = prob_at_location(
+        log=log,
+        ra=[10.343234, 170.343532],
+        dec=[14.345532, -40.532255],
+        mjd=[60034.257381, 60063.257381],
+        mapPath="/path/to/bayestar.multiorder.fits",
+        lazy=True
+    )
+    print(results.prob, results.mjdDelta)
+    if results.prob[0] < 90.:
+        print(results.distance[0])
+    ```
+
+    The attributes hold exactly what `prob_at_location` returns for the same request:
+
+    - ``prob`` -- the credible level (%) of each location
+    - ``mjdDelta`` -- the days between each transient MJD and the map event (None if no MJDs were given)
+    - ``distance`` -- (distance, distance sigma) tuples in Mpc (``(None, None)`` for maps without distance layers)
+    - ``probdensity`` -- the probability density (per steradian) at each location
+
+    The distances, which integrate the distance ansatz of every matched pixel, are by far the most expensive output. They cost nothing unless ``distance`` is read.
+    """
+
+    def __init__(
+            self,
+            log,
+            skymap,
+            rows,
+            mjd=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'location_result' object")
+
+        import numpy as np
+
+        self.skymap = skymap
+        self.rows = rows
+        self.mjd = None
+        if mjd is not False and mjd is not None:
+            if not isinstance(mjd, list) and not isinstance(mjd, np.ndarray):
+                mjd = [mjd]
+            self.mjd = np.array(mjd, dtype=np.float64)
+            if self.mjd.shape != rows.shape:
+                raise AttributeError("MJD list must be of equal length to RA and Dec lists")
+
+        return None
+
+    def __len__(
+            self):
+        return len(self.rows)
+
+    @cached_property
+    def prob(
+            self):
+        """*the credible level (%) of each location*
+        """
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import take_rows
+
+        return np.around(take_rows(self.skymap['CUMPROB'], self.rows) * 100., 2).tolist()
+
+    @cached_property
+    def mjdDelta(
+            self):
+        """*the days between each transient MJD and the map event, or None if no MJDs were given*
+        """
+        import numpy as np
+
+        if self.mjd is None:
+            return None
+        return np.around(self.mjd - self.skymap['meta']["MJD-OBS"], 5).tolist()
+
+    @cached_property
+    def distance(
+            self):
+        """*the (distance, distance sigma) tuples (Mpc) at each location*
+        """
+        import numpy as np
+        from skytag.commonutils.prob_at_location import _location_distances
+
+        self.log.debug('computing the distances of %s locations' % (len(self.rows),))
+        if 'DISTMU' not in self.skymap:
+            return [(None, None) for r in self.rows]
+        distMean, distStd = _location_distances(self.skymap, self.rows)
+        return [(d, s) for d, s in zip(np.round(distMean, 2), np.round(distStd, 2))]
+
+    @cached_property
+    def probdensity(
+            self):
+        """*the probability density (per steradian) at each location*
+        """
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import take_rows
+
+        return np.around(take_rows(self.skymap['PROBDENSITY'], self.rows), 5).tolist()
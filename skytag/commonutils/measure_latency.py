@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Measure the latency of annotating a single source, in a cold (new) process and in a warm (running) process*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+PERCENTILES = [50, 95, 99]
+
+# RUN IN A NEW INTERPRETER FOR EACH COLD MEASUREMENT: THE SAME STEPS AS `skytag <ra> <dec> <mapPath>`, TIMED PHASE BY PHASE
+_COLD_SCRIPT = """
+import sys, time, json
+t0 = time.perf_counter()
+from fundamentals import tools
+from skytag import cl_utils
+from skytag.commonutils.prepare_skymap import prepare_skymap
+from skytag.commonutils.prob_at_location import prob_at_location
+t1 = time.perf_counter()
+ra, dec, mapPath = sys.argv[1:4]
+sys.argv = ["skytag", ra, dec, mapPath]
+arguments, settings, log, dbConn = tools(arguments=None, docString=cl_utils.__doc__, logLevel="WARNING", options_first=True, projectName="skytag", defaultSettingsFile=True).setup()
+t2 = time.perf_counter()
+skymap = prepare_skymap(mapPath=mapPath, log=log)
+t3 = time.perf_counter()
+prob_at_location(log=log, ra=float(ra), dec=float(dec), mapPath=mapPath, skymap=skymap)
+t4 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "settings": t2 - t1, "load": t3 - t2, "lookup": t4 - t3}))
+"""
+
+
+def measure_latency(
+        ra,
+        dec,
+        mapPath,
+        log=False,
+        coldRepeats=20,
+        warmRepeats=100):
+    """*Measure the latency of annotating a single source, in a cold (new) process and in a warm (running) process*
+
+    **Key Arguments:**
+        - ``ra`` -- right ascension of the test location in decimal degrees
+        - ``dec`` -- declination of the test location in decimal degrees
+        - ``mapPath`` -- path the the HealPix map
+        - ``log`` -- logger
+        - ``coldRepeats`` -- number of new processes to time. Default *20*
+        - ``warmRepeats`` -- number of in-process calls to time. Default *100*
+
+    **Return:**
+        - ``latency`` -- dictionary of ``cold`` and ``warm`` latencies (seconds). Each holds the p50, p95 and p99 (``{"p50": .., "p95": .., "p99": ..}``) of every phase.
+
+    Cold phases are ``startup`` (interpreter start and exit), ``import`` (importing skytag and its dependencies), ``settings`` (the command-line settings and logging bootstrap), ``load`` (reading and preparing the map), ``lookup`` and ``total`` (the wall-time of the instrumented process). ``cli`` is the wall-time of real, uninstrumented `skytag <ra> <dec> <mapPath>` invocations.
+
+    Warm phases are ``load``, ``lookup`` and ``total`` (a complete `prob_at_location` call, map read included).
+
+    ```python
+    from skytag.commonutils import measure_latency
+    latency = measure_latency(
+        log=log,
+        ra=170.343532,
+        dec=-40.532255,
+        mapPath="/path/to/bayestar.multiorder.fits"
+    )
+    print(latency["cold"]["total"]["p99"], latency["warm"]["total"]["p99"])
+    ```
+
+    From the command-line:
+
+    ```bash
+    skytag --cold 20 --warm 100 latency 170.343532 -40.532255 bayestar.multiorder.fits
+    ```
+
+    Note that a sidecar index next to the map (see `index_skymap`) shortens the ``load`` phase.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``measure_latency`` function')
+
+    import json
+    import subprocess
+    import time
+    from skytag.commonutils.prepare_skymap import prepare_skymap
+    from skytag.commonutils.prob_at_location import prob_at_location
+
+    if int(coldRepeats) < 1 or int(warmRepeats) < 1:
+        raise AttributeError("At least one cold and one warm repeat are needed")
+
+    ra, dec = float(ra), float(dec)
+    args = [repr(ra), repr(dec), mapPath]
+
+    # COLD: A NEW INTERPRETER PER MEASUREMENT
+    cold = {k: [] for k in ["startup", "import", "settings", "load", "lookup", "total", "cli"]}
+    for i in range(int(coldRepeats)):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", _COLD_SCRIPT] + args, check=True, capture_output=True, text=True).stdout
+        total = time.perf_counter() - start
+        phases = json.loads(output.strip().splitlines()[-1])
+        for k, v in phases.items():
+            cold[k].append(v)
+        cold["total"].append(total)
+        cold["startup"].append(total - sum(phases.values()))
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "skytag.cl_utils"] + args, check=True, capture_output=True)
+        cold["cli"].append(time.perf_counter() - start)
+
+    # WARM: REPEATED CALLS IN THIS PROCESS
+    warm = {k: [] for k in ["load", "lookup", "total"]}
+    for i in range(int(warmRepeats)):
+        start = time.perf_counter()
+        skymap = prepare_skymap(mapPath=mapPath, log=log)
+        loaded = time.perf_counter()
+        prob_at_location(log=log, ra=ra, dec=dec, mapPath=mapPath, skymap=skymap)
+        looked = time.perf_counter()
+        prob_at_location(log=log, ra=ra, dec=dec, mapPath=mapPath)
+        warm["load"].append(loaded - start)
+        warm["lookup"].append(looked - loaded)
+        warm["total"].append(time.perf_counter() - looked)
+
+    latency = {
+        "cold": {k: _percentiles(v) for k, v in cold.items()},
+        "warm": {k: _percentiles(v) for k, v in warm.items()}
+    }
+
+    log.debug('completed the ``measure_latency`` function')
+    return latency
+
+
+def latency_report(
+        latency):
+    """*Format the results of `measure_latency` as a plain-text table (milliseconds)*
+
+    **Key Arguments:**
+        - ``latency`` -- the dictionary returned by `measure_latency`
+
+    **Return:**
+        - ``report`` -- the table as a string
+    """
+    header = ["mode", "phase"] + ["p%s (ms)" % p for p in PERCENTILES]
+    rows = [header]
+    for mode in ["cold", "warm"]:
+        for phase, stats in latency[mode].items():
+            rows.append([mode, phase] + ["%.2f" % (stats["p%s" % p] * 1000.,) for p in PERCENTILES])
+    widths = [max(len(r[i]) for r in rows) for i in range(len(header))]
+    return "\n".join("  ".join(c.ljust(w) for c, w in zip(r, widths)).rstrip() for r in rows)
+
+
+def _percentiles(
+        values):
+    """*the p50, p95 and p99 of a list of timings*
+    """
+    import numpy as np
+
+    return {"p%s" % p: float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Plan an ordered list of telescope pointings maximising the map probability covered, with a greedy max-coverage solver*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+# THE FINEST HEALPIX LEVEL OF THE COVERAGE CELLS (AND OF THE CANDIDATE GRID)
+MAX_PLAN_LEVEL = 20
+# THE NUMBER OF CANDIDATE SAMPLE POSITIONS HANDLED TOGETHER (BOUNDS THE MEMORY OF FINDING EACH TILE'S CELLS)
+PLAN_CHUNK_SAMPLES = 4000000
+
+
+def plan_tiles(
+        footprint,
+        mapPath=False,
+        log=False,
+        budget=10,
+        ra=False,
+        dec=False,
+        pa=0.,
+        credible=95.,
+        level=False,
+        skymap=False):
+    """*Plan an ordered list of telescope pointings maximising the map probability covered, with a greedy max-coverage solver*
+
+    **Key Arguments:**
+        - ``footprint`` -- the telescope field of view: a circle, rectangle or polygon dictionary (see `fov_probability`)
+        - ``mapPath`` -- path the the multi-order HealPix map
+        - ``log`` -- logger
+        - ``budget`` -- the maximum number of pointings to plan. Default *10*
+        - ``ra`` -- right ascension of a fixed list of candidate tile centres in decimal degrees (e.g. a survey's tiling). Default *False* (use a candidate grid)
+        - ``dec`` -- declination of the candidate tile centres in decimal degrees. Default *False*
+        - ``pa`` -- position angle of the footprint in decimal degrees, east of north (float, or a list with one per candidate tile). Default *0*
+        - ``credible`` -- without a tile list, candidates are placed on a grid covering this credible region (%) of the map. Default *95*
+        - ``level`` -- the HealPix level of the cells used to measure coverage. Default *False* (chosen so roughly 64 cells span a footprint)
+        - ``skymap`` -- an already prepared (whole-sky) skymap (see `prepare_skymap`), used in place of ``mapPath``. Default *False*
+
+    **Return:**
+        - ``plan`` -- the chosen pointings, in the order chosen, as a list of dictionaries with keys ``tile`` (index of the candidate), ``ra``, ``dec``, ``pa``, ``prob`` (the probability (%) the pointing adds to the pointings before it) and ``cumprob`` (the total probability (%) covered so far)
+
+    ```python
+    from skytag.commonutils import plan_tiles
+    plan = plan_tiles(
+        log=log,
+        mapPath="/path/to/bayestar.multiorder.fits",
+        footprint={"width": 5.46, "height": 5.46},
+        ra=atlasTiles["ra"],
+        dec=atlasTiles["dec"],
+        budget=20
+    )
+    ```
+
+    Without ``ra`` and ``dec``, the candidates are the centres of a HealPix grid spaced at about half the footprint size, over the ``credible`` region of the map.
+
+    Coverage is measured on nested HealPix cells at ``level``: a pointing covers the cells whose centres fall within its footprint, so overlapping pointings never count a cell twice. The probability of every cell is integrated exactly from the multi-order map pixels (cells finer than a map pixel take their share of the pixel's probability, cells coarser than map pixels sum them). The cells of all candidates are found at once, from a template rotated onto every candidate as in `fov_probability`.
+
+    The solver is the greedy max-coverage algorithm, which covers at least 63% of the best achievable probability for the budget. Each round picks the candidate adding the most uncovered probability. Only the candidates sharing its newly covered cells then have their gains reduced, so no candidate is re-integrated. Planning over 10^4 candidates takes seconds. Planning stops early once no candidate adds probability.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``plan_tiles`` function')
+
+    import numpy as np
+    import astropy_healpix as ah
+    from skytag.commonutils.prepare_skymap import prepare_skymap, coordinate_arrays, MAX_LEVEL
+    from skytag.commonutils.fov_probability import footprint_template, _footprint_vertices
+
+    if int(budget) < 1:
+        raise AttributeError("The tile budget must be at least 1")
+    if not isinstance(footprint, dict):
+        raise AttributeError("A footprint must be a dictionary describing a circle, rectangle or polygon (see `fov_probability`)")
+
+    if skymap is False:
+        skymap = prepare_skymap(mapPath=mapPath, log=log)
+    if skymap.get('region'):
+        raise AttributeError("Tiles can only be planned over a whole-sky prepared skymap")
+
+    # THE FOOTPRINT'S SIZE AND THE RADIUS OF THE CIRCLE ENCLOSING IT (DEGREES)
+    footprintArea = footprint_template(footprint, samples=1024)[2].sum()
+    footprintSize = np.degrees(np.sqrt(footprintArea))
+    if "radius" in footprint:
+        vertices = None
+        enclosingRadius = float(footprint["radius"])
+    else:
+        vertices = _footprint_vertices(footprint)
+        enclosingRadius = np.degrees(np.arctan(np.hypot(*vertices).max()))
+
+    # THE BASE (LEVEL 0) HEALPIX PIXEL SIZE IS ~58.6 DEGREES
+    baseSize = np.degrees(np.sqrt(np.pi / 3.))
+    if level is False:
+        level = int(np.clip(np.ceil(np.log2(8. * baseSize / footprintSize)), 0, MAX_PLAN_LEVEL))
+    elif not 0 <= int(level) <= MAX_PLAN_LEVEL:
+        raise AttributeError("The coverage level must be between 0 and %s" % (MAX_PLAN_LEVEL,))
+    level = int(level)
+
+    # THE CANDIDATE TILES
+    if ra is False or ra is None:
+        if not 0. < float(credible) <= 100.:
+            raise AttributeError("The credible region must be a percentage above 0 and at most 100")
+        from skytag.commonutils.credible_moc import credible_moc
+        gridLevel = int(np.clip(np.ceil(np.log2(2. * baseSize / footprintSize)), 0, MAX_PLAN_LEVEL))
+        ranges = credible_moc(log=log, skymap=skymap, credible=float(credible))[float(credible)].ranges
+        shift = 2 * (MAX_LEVEL - gridLevel)
+        first, last = ranges[:, 0] >> shift, (ranges[:, 1] - 1) >> shift
+        counts = last - first + 1
+        gridCells = np.repeat(first, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+        gridCells = gridCells[np.concatenate([[True], gridCells[1:] != gridCells[:-1]])]
+        lon, lat = ah.healpix_to_lonlat(gridCells, 2**gridLevel, order='nested')
+        ra, dec = lon.deg, lat.deg
+    else:
+        ra, dec = coordinate_arrays(ra, dec)
+    pa = np.broadcast_to(np.asarray(pa, dtype=np.float64), ra.shape).copy()
+    log.info('planning up to %s of %s candidate tiles on level-%s coverage cells' % (budget, len(ra), level))
+
+    pairTiles, pairCells = _tile_cells(ra=ra, dec=dec, pa=pa, level=level, footprint=footprint, vertices=vertices, enclosingRadius=enclosingRadius)
+
+    # THE COVERAGE CELLS (ELEMENTS) AND THE PROBABILITY OF EACH
+    order = np.argsort(pairCells, kind='stable')
+    sortedCells = pairCells[order]
+    newCell = np.concatenate([[True], sortedCells[1:] != sortedCells[:-1]]) if len(sortedCells) else np.zeros(0, dtype=bool)
+    cells = sortedCells[newCell]
+    pairElements = np.empty(len(pairCells), dtype=np.int64)
+    pairElements[order] = np.cumsum(newCell) - 1
+    shift = 2 * (MAX_LEVEL - level)
+    cellProb = _cumulative_prob(skymap, (cells + 1) << shift) - _cumulative_prob(skymap, cells << shift)
+
+    # TILE -> ELEMENTS (PAIRS ARE ALREADY ORDERED BY TILE) AND ELEMENT -> TILES
+    tileCount = len(ra)
+    tileStarts = np.searchsorted(pairTiles, np.arange(tileCount + 1))
+    elementTiles = pairTiles[order]
+    elementStarts = np.searchsorted(pairElements[order], np.arange(len(cells) + 1))
+
+    gains = np.bincount(pairTiles, weights=cellProb[pairElements], minlength=tileCount)
+    covered = np.zeros(len(cells), dtype=bool)
+    total = 0.
+    plan = []
+    for i in range(int(budget)):
+        best = int(np.argmax(gains)) if tileCount else 0
+        if not tileCount or gains[best] <= 1e-12:
+            break
+        elements = pairElements[tileStarts[best]:tileStarts[best + 1]]
+        newlyCovered = elements[~covered[elements]]
+        covered[newlyCovered] = True
+        gain = cellProb[newlyCovered].sum()
+        total += gain
+        plan.append({"tile": best, "ra": float(ra[best]), "dec": float(dec[best]), "pa": float(pa[best]), "prob": round(float(gain) * 100., 4), "cumprob": round(float(total) * 100., 4)})
+
+        # ONLY THE TILES SHARING THE NEWLY COVERED CELLS LOSE GAIN
+        counts = elementStarts[newlyCovered + 1] - elementStarts[newlyCovered]
+        touched = elementTiles[np.repeat(elementStarts[newlyCovered], counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))]
+        gains -= np.bincount(touched, weights=np.repeat(cellProb[newlyCovered], counts), minlength=tileCount)
+        gains[best] = 0.
+
+    log.debug('completed the ``plan_tiles`` function')
+    return plan
+
+
+def _tile_cells(
+        ra,
+        dec,
+        pa,
+        level,
+        footprint,
+        vertices,
+        enclosingRadius):
+    """*the (tile, cell) pairs of every candidate tile and the level-``level`` cells whose centres fall within its footprint, ordered by tile then cell*
+
+    Candidate cells are those hit by a dense sample template of the circle enclosing the footprint, widened by a cell, so every cell with its centre inside the footprint is hit. Each candidate cell centre is then projected onto the tile's tangent plane and tested against the footprint.
+    """
+    import numpy as np
+    import astropy_healpix as ah
+    from skytag.commonutils.prepare_skymap import lonlat_to_index29, MAX_LEVEL
+    from skytag.commonutils.fov_probability import footprint_template, _inside_polygon, _tangent_axes
+
+    cellSize = np.degrees(np.sqrt(np.pi / 3.)) / 2**level
+    capRadius = min(enclosingRadius + 1.5 * cellSize, 89.)
+    capArea = 2. * np.pi * (1. - np.cos(np.radians(capRadius)))
+    # ~4 SAMPLES PER CELL AREA, SO THE SAMPLES ARE SPACED AT ABOUT HALF A CELL
+    samples = int(np.ceil(4. * capArea / np.radians(cellSize)**2))
+    x, y, _ = footprint_template({"radius": capRadius}, samples=samples)
+
+    cellCount = 12 * 4**level
+    shift = 2 * (MAX_LEVEL - level)
+    centre, xAxis, yAxis = _tangent_axes(ra, dec, pa)
+    tiles, cells = [], []
+    step = max(1, PLAN_CHUNK_SAMPLES // samples)
+    for start in range(0, len(ra), step):
+        stop = min(start + step, len(ra))
+        v = centre[start:stop, None, :] + x[:, None] * xAxis[start:stop, None, :] + y[:, None] * yAxis[start:stop, None, :]
+        lon = np.degrees(np.arctan2(v[..., 1], v[..., 0])) % 360.
+        lat = np.degrees(np.arctan2(v[..., 2], np.hypot(v[..., 0], v[..., 1])))
+        del v
+
+        # THE DISTINCT (TILE, CELL) PAIRS THE SAMPLES HIT
+        keys = (np.arange(start, stop)[:, None] * cellCount + (lonlat_to_index29(lon.ravel(), lat.ravel()) >> shift).reshape(lon.shape)).ravel()
+        keys.sort()
+        keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])]
+        chunkTiles, chunkCells = np.divmod(keys, cellCount)
+
+        # KEEP THE CELLS WHOSE CENTRES FALL WITHIN THE FOOTPRINT, ON EACH TILE'S TANGENT PLANE
+        cellLon, cellLat = ah.healpix_to_lonlat(chunkCells, 2**level, order='nested')
+        cellLon, cellLat = cellLon.rad, cellLat.rad
+        u = np.stack([np.cos(cellLat) * np.cos(cellLon), np.cos(cellLat) * np.sin(cellLon), np.sin(cellLat)], axis=-1)
+        towards = np.einsum('ij,ij->i', u, centre[chunkTiles])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gx = np.einsum('ij,ij->i', u, xAxis[chunkTiles]) / towards
+            gy = np.einsum('ij,ij->i', u, yAxis[chunkTiles]) / towards
+        if vertices is None:
+            inside = gx**2 + gy**2 <= np.tan(np.radians(float(footprint["radius"])))**2
+        else:
+            inside = _inside_polygon(vertices[0], vertices[1], gx, gy)
+        inside &= towards > 0.
+        tiles.append(chunkTiles[inside])
+        cells.append(chunkCells[inside])
+
+    return np.concatenate(tiles), np.concatenate(cells)
+
+
+def _cumulative_prob(
+        skymap,
+        index29):
+    """*the map probability held by the sky before each level-29 nested index (pixels spread uniformly over their index ranges)*
+    """
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import MAX_LEVEL
+
+    starts = skymap['INDEX29']
+    prob = np.asarray(skymap['PROB'], dtype=np.float64)
+    span = np.left_shift(np.int64(1), 2 * (MAX_LEVEL - np.asarray(skymap['LEVEL']).astype(np.int64)))
+    before = np.concatenate([[0.], np.cumsum(prob)[:-1]])
+    rows = np.searchsorted(starts, index29, side='right') - 1
+    return before[rows] + prob[rows] * np.minimum(index29 - starts[rows], span[rows]) / span[rows]
@@ -0,0 +1,703 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Read a multi-order HealPix skymap and prepare the arrays needed to look up the credible level of sky-locations*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+MAX_LEVEL = 29
+# UPPER LIMIT ON THE NUMBER OF PIXELS USED TO DESCRIBE A REGION OF THE SKY
+MAX_REGION_PIXELS = 100000
+DISTANCE_COLUMNS = ['DISTMU', 'DISTSIGMA', 'DISTNORM']
+# THE FINEST LEVEL OF THE DENSE PIXEL-TO-ROW TABLE USED BY THE `levels` JOIN (12 * 4^9 INT32 CELLS, ~12.6 MB)
+LEVEL_TABLE_MAX_LEVEL = 9
+# BUILDING A LEVEL TABLE ONLY PAYS OFF FOR AT LEAST ONE LOCATION PER THIS MANY TABLE CELLS
+LEVEL_TABLE_CELLS_PER_LOCATION = 16
+JOIN_STRATEGIES = ['auto', 'search', 'levels', 'merge']
+# ROTATION MATRICES TAKING UNIT VECTORS IN EACH INPUT FRAME TO ICRS (DERIVED FROM ASTROPY'S `Galactic` FRAME AND
+# ITS J2000 `BarycentricMeanEcliptic` FRAME)
+FRAME_ROTATIONS = {
+    "galactic": [
+        [-0.05487565771259163, 0.4941094371927268, -0.8676661375596576],
+        [-0.8734370519556159, -0.4448297212232953, -0.19807633727300059],
+        [-0.48383507361671546, 0.7469821839866676, 0.45598381368730156]],
+    "ecliptic": [
+        [9.9999999999999412e-01, 3.2897004138651989e-08, -1.0207044719361121e-07],
+        [-7.0783689609715561e-08, 9.1748212991495837e-01, -3.9777699944404304e-01],
+        [8.0562139776131861e-08, 3.9777699944404793e-01, 9.1748212991495559e-01]]
+}
+FRAMES = ['icrs', 'galactic', 'ecliptic']
+
+
+def prepare_skymap(
+        mapPath,
+        log=False,
+        region=False,
+        useIndex=True):
+    """*Read a multi-order HealPix skymap and prepare the arrays needed to look up the credible level of sky-locations*
+
+    **Key Arguments:**
+        - ``mapPath`` -- path the the multi-order HealPix map, or the map itself as ``bytes``, a ``memoryview`` or a file-like object (see `read_skymap_table`)
+        - ``log`` -- logger
+        - ``region`` -- only keep the map pixels overlapping this region of the sky (see below). Default *False* (keep the whole map)
+        - ``useIndex`` -- read the prepared arrays from the map's sidecar index (see `index_skymap`) if one exists and matches the map. Default *True*
+
+    **Return:**
+        - ``skymap`` -- a dictionary of prepared numpy arrays plus the map header (``meta``) and the ``region`` used
+
+    The pixels are first ranked by ``PROBDENSITY`` to compute the cumulative probability (``CUMPROB``) of each pixel, and then every array is reordered by ``INDEX29`` (the nested index of the first level-29 pixel within each multi-order pixel) so that sky-locations can be matched to pixels with a single `searchsorted` and no extra sorter.
+
+    The arrays returned are ``UNIQ``, ``LEVEL``, ``INDEX29``, ``PROBDENSITY``, ``PROB`` and ``CUMPROB``, plus ``DISTMU``, ``DISTSIGMA`` and ``DISTNORM`` for maps with distance layers.
+
+    ```python
+    from skytag.commonutils import prepare_skymap
+    skymap = prepare_skymap(
+        log=log,
+        mapPath="/path/to/bayestar.multiorder.fits"
+    )
+    ```
+
+    If you only care about a small patch of sky, pass a ``region`` to keep just the pixels overlapping it. Credible levels depend on the ranking of every pixel in the map, so ``UNIQ`` and ``PROBDENSITY`` are still read and ranked across the whole map. Only the distance layers are restricted to the kept pixels (they are read from a memory-mapped table), and only the kept pixels are sorted by ``INDEX29`` and returned. The returned skymap is therefore small, but peak memory during preparation still scales with the whole map. A region can be:
+
+    - a cone: ``{"ra": 10.3, "dec": 14.3, "radius": 2.0}`` (decimal degrees)
+    - several cones: ``{"ra": [10.3, 170.3], "dec": [14.3, -40.5], "radius": 0.5}``
+    - the pixels containing a set of positions (no radius): ``{"ra": [10.3, 170.3], "dec": [14.3, -40.5]}``
+    - a box: ``{"raMin": 350., "raMax": 10., "decMin": -5., "decMax": 5.}`` (boxes with ``raMin > raMax`` wrap through RA=0)
+
+    ```python
+    skymap = prepare_skymap(
+        log=log,
+        mapPath="/path/to/bayestar.multiorder.fits",
+        region={"ra": 10.3, "dec": 14.3, "radius": 2.0}
+    )
+    ```
+
+    Locations falling outside a region-restricted map are matched to row ``-1`` by `match_skymap_pixels`.
+
+    If the map has been indexed with `index_skymap` (or `skytag index`), the prepared arrays are memory-mapped from the sidecar instead of being recomputed. The sidecar stores the whole-map ``CUMPROB`` of every pixel, so with a ``region`` only the overlapping rows are read from disk.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``prepare_skymap`` function')
+
+    if useIndex and isinstance(mapPath, (str, os.PathLike)):
+        from skytag.commonutils.index_skymap import read_skymap_index
+        skymap = read_skymap_index(mapPath=mapPath, log=log, region=region)
+        if skymap is not None:
+            log.debug('completed the ``prepare_skymap`` function')
+            return skymap
+
+    import astropy_healpix as ah
+    import numpy as np
+    from astropy import units as u
+
+    # MEMORY-MAP THE TABLE WHEN ONLY A REGION IS NEEDED SO ONLY THE KEPT ROWS OF THE DISTANCE LAYERS ARE READ
+    # (UNIQ AND PROBDENSITY ARE STILL READ IN FULL TO RANK THE WHOLE MAP)
+    table = read_skymap_table(mapPath, memmap=bool(region))
+
+    uniq = np.asarray(table['UNIQ'], dtype=np.int64)
+    probdensity = np.asarray(table['PROBDENSITY'], dtype=np.float64)
+
+    # FIND LEVEL AND NSIDE PIXEL INDEX FOR EACH MULTI-RES PIXEL
+    level, ipix = ah.uniq_to_level_ipix(uniq)
+    nside = ah.level_to_nside(level)
+    # DETERMINE THE PIXEL AREA AND PROB OF EACH PIXEL
+    area = ah.nside_to_pixel_area(nside).to_value(u.steradian)
+    prob = area * probdensity
+
+    # CUMULATIVE PROBABILITY IN ORDER OF DECREASING PROBDENSITY (SAME ORDERING AS `Table.sort(reverse=True)`)
+    densityOrder = np.argsort(table['PROBDENSITY'])[::-1]
+    cumprob = np.empty_like(prob)
+    cumprob[densityOrder] = np.cumsum(prob[densityOrder])
+    del densityOrder
+
+    # DETERMINE THE INDEX OF MULTI-RES PIX AT HIGHEST HEALPIX RESOLUTION
+    index29 = ipix * (2**(MAX_LEVEL - level))**2
+
+    # KEEP ONLY THE ROWS OVERLAPPING THE REGION, THEN REORDER BY INDEX29 SO LOOKUPS NEED NO SORTER
+    rows = np.arange(len(uniq))
+    if region:
+        rows = rows[_region_mask(region=region, index29=index29, level=level)]
+    rows = rows[np.argsort(index29[rows])]
+
+    skymap = {}
+    skymap['UNIQ'] = uniq[rows]
+    skymap['LEVEL'] = level[rows].astype(np.int8)
+    skymap['INDEX29'] = index29[rows]
+    skymap['PROBDENSITY'] = probdensity[rows]
+    skymap['PROB'] = prob[rows]
+    skymap['CUMPROB'] = cumprob[rows]
+    for c in DISTANCE_COLUMNS:
+        if c in table.colnames:
+            skymap[c] = np.asarray(table[c][rows], dtype=np.float64)
+
+    skymap['meta'] = dict(table.meta)
+    skymap['region'] = region
+
+    log.debug('completed the ``prepare_skymap`` function')
+    return skymap
+
+
+def lonlat_to_index29(
+        ra,
+        dec):
+    """*Convert sky-locations to level-29 nested HealPix indices*
+
+    **Key Arguments:**
+        - ``ra`` -- right ascension in decimal degrees (numpy array)
+        - ``dec`` -- declination in decimal degrees (numpy array)
+
+    **Return:**
+        - ``ipix`` -- numpy array of level-29 nested pixel indices
+    """
+    import astropy_healpix as ah
+    import numpy as np
+    from astropy import units as u
+
+    return ah.lonlat_to_healpix(np.asarray(ra) * u.deg, np.asarray(dec) * u.deg, ah.level_to_nside(MAX_LEVEL), order='nested')
+
+
+def coordinate_arrays(
+        ra,
+        dec):
+    """*Convert single sky-locations or lists of sky-locations to equal-length numpy arrays*
+
+    **Key Arguments:**
+        - ``ra`` -- right ascension in decimal degrees (float, list or numpy array)
+        - ``dec`` -- declination in decimal degrees (float, list or numpy array)
+
+    **Return:**
+        - ``ra`` -- numpy array of right ascensions
+        - ``dec`` -- numpy array of declinations
+    """
+    import numpy as np
+
+    if not isinstance(ra, list) and not isinstance(ra, np.ndarray):
+        ra = [ra]
+    if not isinstance(dec, list) and not isinstance(dec, np.ndarray):
+        dec = [dec]
+
+    ra = np.array(ra, dtype=np.float64)
+    dec = np.array(dec, dtype=np.float64)
+
+    # TEST FOR EQUAL LEN
+    if ra.shape != dec.shape:
+        raise AttributeError("RA and Dec lists must be of equal length")
+
+    return ra, dec
+
+
+def frame_to_icrs(
+        lon,
+        lat,
+        frame):
+    """*Convert galactic or ecliptic sky-locations to equatorial (ICRS) right ascension and declination*
+
+    **Key Arguments:**
+        - ``lon`` -- longitude in decimal degrees (numpy array)
+        - ``lat`` -- latitude in decimal degrees (numpy array)
+        - ``frame`` -- the frame of the input locations: ``icrs`` (returned unchanged), ``galactic`` or ``ecliptic`` (the J2000 mean ecliptic, astropy's `BarycentricMeanEcliptic`)
+
+    **Return:**
+        - ``ra`` -- numpy array of right ascensions in decimal degrees
+        - ``dec`` -- numpy array of declinations in decimal degrees
+
+    The locations are rotated to ICRS with a fixed rotation matrix in vectorized numpy, agreeing with astropy's `SkyCoord` transformations to better than a microarcsecond without their per-call overhead.
+    """
+    import numpy as np
+
+    frame = str(frame).lower()
+    if frame not in FRAMES:
+        raise AttributeError("The frame must be one of %s" % (", ".join(FRAMES),))
+    if frame == "icrs":
+        return lon, lat
+
+    m = FRAME_ROTATIONS[frame]
+    l, b = np.radians(lon), np.radians(lat)
+    x, y, z = np.cos(b) * np.cos(l), np.cos(b) * np.sin(l), np.sin(b)
+    del l, b
+    rx = m[0][0] * x + m[0][1] * y + m[0][2] * z
+    ry = m[1][0] * x + m[1][1] * y + m[1][2] * z
+    rz = m[2][0] * x + m[2][1] * y + m[2][2] * z
+    ra = np.degrees(np.arctan2(ry, rx)) % 360.
+    dec = np.degrees(np.arctan2(rz, np.hypot(rx, ry)))
+    return ra, dec
+
+
+def match_skymap_pixels(
+        skymap,
+        ipix,
+        partial=None,
+        strategy="auto"):
+    """*Return the rows of a prepared skymap containing the given level-29 nested HealPix indices*
+
+    **Key Arguments:**
+        - ``skymap`` -- the prepared skymap (see `prepare_skymap`). Only ``INDEX29`` and ``LEVEL`` are needed.
+        - ``ipix`` -- numpy array of level-29 nested pixel indices
+        - ``partial`` -- the map only covers part of the sky, so check each index really falls within its matched pixel. Default *None* (partial if the skymap was prepared for a ``region``)
+        - ``strategy`` -- how to join the indices to the map pixels (see below). Default *auto*
+
+    **Return:**
+        - ``rows`` -- numpy array of row indices into the prepared skymap arrays (``-1`` for indices not covered by a partial map)
+
+    The join strategies all return identical rows:
+
+    - ``search`` -- a binary search of every index in the sorted ``INDEX29`` array.
+    - ``levels`` -- a direct lookup in a dense pixel-to-row table built from the levels present in the map, at the map's finest level (or level 9 if the map is finer). Indices falling in cells covered by finer pixels fall back to the search. The table is built once and cached on the skymap.
+    - ``merge`` -- a sort-merge join of the (sorted) indices with the sorted map pixels. Best for catalogues larger than the map that are already sorted.
+    - ``auto`` -- pick one with `choose_join_strategy`.
+    """
+    import numpy as np
+
+    ipix = np.asarray(ipix, dtype=np.int64)
+    if strategy == "auto":
+        strategy = choose_join_strategy(skymap, ipix)
+
+    if strategy == "search":
+        # FIND INDICES WHERE ELEMENTS SHOULD BE INSERTED TO MAINTAIN ORDER -- CLOSET MATCH TO THE RIGHT
+        rows = np.searchsorted(skymap['INDEX29'], ipix, side='right') - 1
+    elif strategy == "levels":
+        rows = _match_levels(skymap, ipix)
+    elif strategy == "merge":
+        rows = _match_merge(skymap['INDEX29'], ipix)
+    else:
+        raise AttributeError("The join strategy must be one of %s" % (", ".join(JOIN_STRATEGIES),))
+
+    if partial is None:
+        partial = bool(skymap.get('region', False))
+    if partial:
+        safeRows = np.maximum(rows, 0)
+        span = np.left_shift(1, 2 * (MAX_LEVEL - skymap['LEVEL'][safeRows].astype(np.int64)))
+        covered = (rows >= 0) & (ipix < skymap['INDEX29'][safeRows] + span)
+        rows[~covered] = -1
+
+    return rows
+
+
+def choose_join_strategy(
+        skymap,
+        ipix):
+    """*Choose how to join level-29 indices to the pixels of a prepared skymap, from the map's level histogram and the catalogue size*
+
+    **Key Arguments:**
+        - ``skymap`` -- the prepared skymap (see `prepare_skymap`)
+        - ``ipix`` -- numpy array of level-29 nested pixel indices
+
+    **Return:**
+        - ``strategy`` -- ``search``, ``levels`` or ``merge`` (see `match_skymap_pixels`)
+
+    Catalogues at least as large as the map that are already sorted use ``merge``. Otherwise ``levels`` is used if its table is already built, or if the catalogue is large enough to repay building it (one location per 16 table cells) and at least half of the map's sky area is made of pixels no finer than the table (so most indices are resolved by the table alone). Everything else uses ``search``.
+    """
+    import numpy as np
+
+    count = len(ipix)
+    rows = len(skymap['INDEX29'])
+    if count >= rows and count > 1 and bool(np.all(ipix[1:] >= ipix[:-1])):
+        return "merge"
+    if _cached_level_table(skymap) is not None:
+        return "levels"
+
+    levels, counts = np.unique(skymap['LEVEL'], return_counts=True)
+    tableLevel = min(int(levels.max()), LEVEL_TABLE_MAX_LEVEL)
+    if count * LEVEL_TABLE_CELLS_PER_LOCATION < 12 * 4**tableLevel:
+        return "search"
+
+    # FRACTION OF THE MAP AREA COVERED BY PIXELS THE TABLE RESOLVES DIRECTLY
+    area = counts * 4.**(-levels.astype(np.float64))
+    if area[levels <= tableLevel].sum() < 0.5 * area.sum():
+        return "search"
+    return "levels"
+
+
+def take_rows(
+        values,
+        rows):
+    """*Gather values for matched rows, returning `nan` for rows of -1 (locations outside a partial map)*
+
+    **Key Arguments:**
+        - ``values`` -- a prepared skymap array
+        - ``rows`` -- matched rows (see `match_skymap_pixels`)
+
+    **Return:**
+        - ``taken`` -- the gathered values
+    """
+    import numpy as np
+
+    taken = values[rows]
+    outside = rows < 0
+    if outside.any():
+        taken = taken.astype(np.float64)
+        taken[outside] = np.nan
+    return taken
+
+
+def _match_levels(
+        skymap,
+        ipix):
+    """*join indices to map rows with the cached dense pixel-to-row table, falling back to a search in cells covered by finer pixels*
+    """
+    import numpy as np
+
+    table = _cached_level_table(skymap)
+    if table is None:
+        table = _build_level_table(skymap)
+    tableLevel, cells = table
+
+    rows = cells[ipix >> (2 * (MAX_LEVEL - tableLevel))].astype(np.int64)
+    fallback = rows < 0
+    if fallback.any():
+        rows[fallback] = np.searchsorted(skymap['INDEX29'], ipix[fallback], side='right') - 1
+    return rows
+
+
+def _cached_level_table(
+        skymap):
+    """*the level table cached on the skymap, if it was built for the skymap's current INDEX29 array*
+    """
+    cached = skymap.get('levelTable')
+    if cached is not None and cached[0] is skymap['INDEX29']:
+        return cached[1:]
+    return None
+
+
+def _build_level_table(
+        skymap):
+    """*build (and cache on the skymap) a dense table giving the map row covering each pixel at the table level*
+
+    Cells covered by a single map pixel hold its row. Cells split between finer map pixels hold -2 and cells the map does not cover hold -1.
+    """
+    import numpy as np
+
+    index29 = skymap['INDEX29']
+    level = skymap['LEVEL'].astype(np.int64)
+    tableLevel = int(min(level.max(), LEVEL_TABLE_MAX_LEVEL))
+    shift = 2 * (MAX_LEVEL - tableLevel)
+
+    cells = np.full(12 * 4**tableLevel, -1, dtype=np.int32)
+    for l in np.unique(level[level <= tableLevel]):
+        # A LEVEL-l PIXEL COVERS AN ALIGNED RUN OF 4^(tableLevel-l) CELLS: ONE ROW OF A 2D VIEW OF THE TABLE
+        rows = np.nonzero(level == l)[0]
+        run = 4**(tableLevel - int(l))
+        cells.reshape(-1, run)[index29[rows] >> (2 * (MAX_LEVEL - int(l)))] = rows[:, None]
+    cells[index29[level > tableLevel] >> shift] = -2
+
+    # THE TABLE IS NOT AN ARRAY COLUMN OF THE SKYMAP (SO IS NOT SHARED OR WRITTEN TO A SIDECAR INDEX)
+    skymap['levelTable'] = (index29, tableLevel, cells)
+    return tableLevel, cells
+
+
+def _match_merge(
+        index29,
+        ipix):
+    """*sort-merge join of indices with the sorted INDEX29 array: each map row takes the run of sorted indices up to the next row*
+    """
+    import numpy as np
+
+    if not len(index29):
+        return np.full(len(ipix), -1, dtype=np.int64)
+    order = None
+    if len(ipix) > 1 and not np.all(ipix[1:] >= ipix[:-1]):
+        order = np.argsort(ipix, kind='stable')
+        ipix = ipix[order]
+
+    starts = np.searchsorted(ipix, index29, side='left')
+    counts = np.diff(np.append(starts, len(ipix)))
+    # INDICES BEFORE THE FIRST MAP PIXEL MATCH ROW -1
+    sortedRows = np.repeat(np.arange(-1, len(index29)), np.append(starts[:1], counts))
+
+    if order is None:
+        return sortedRows
+    rows = np.empty_like(sortedRows)
+    rows[order] = sortedRows
+    return rows
+
+
+def _region_mask(
+        region,
+        index29,
+        level):
+    """*flag the multi-order map pixels overlapping a region of the sky*
+
+    **Key Arguments:**
+        - ``region`` -- the region dictionary (see `prepare_skymap`)
+        - ``index29`` -- the level-29 index of the first sub-pixel of each map pixel
+        - ``level`` -- the level of each map pixel
+
+    **Return:**
+        - ``mask`` -- boolean array, True for pixels overlapping the region
+    """
+    import numpy as np
+
+    regionLevel, regionPixels = _region_pixels(region)
+
+    # THE RANGE OF REGION-LEVEL PIXELS EACH MAP PIXEL SPANS
+    shift = 2 * (MAX_LEVEL - regionLevel)
+    span = np.left_shift(np.int64(1), 2 * (MAX_LEVEL - level.astype(np.int64)))
+    low = index29 >> shift
+    high = (index29 + span - 1) >> shift
+
+    return np.searchsorted(regionPixels, low, side='left') < np.searchsorted(regionPixels, high, side='right')
+
+
+def _region_pixels(
+        region):
+    """*convert a region dictionary to a sorted array of nested HealPix pixels (at a level suited to the region size) that covers it*
+
+    **Key Arguments:**
+        - ``region`` -- the region dictionary (see `prepare_skymap`)
+
+    **Return:**
+        - ``regionLevel`` -- the HealPix level of the returned pixels
+        - ``regionPixels`` -- sorted, unique nested pixel indices covering the region
+    """
+    import astropy_healpix as ah
+    import numpy as np
+    from astropy import units as u
+
+    if not isinstance(region, dict):
+        raise AttributeError("A region must be a dictionary describing a cone, a set of positions or a box (see `prepare_skymap`)")
+
+    # THE SIDE OF A LEVEL-0 PIXEL (~58.6 DEG); EACH LEVEL HALVES IT
+    level0Size = ah.nside_to_pixel_resolution(1).to_value(u.deg)
+
+    def region_level(size, area):
+        # AIM FOR PIXELS ~1/16 OF THE REGION SIZE, BUT NEVER MORE THAN MAX_REGION_PIXELS ACROSS THE REGION AREA (SR)
+        level = np.ceil(np.log2(level0Size / max(size / 16., 1e-7)))
+        maxLevel = np.floor(np.log(MAX_REGION_PIXELS * 4. * np.pi / (12. * max(area, 1e-30))) / np.log(4.))
+        return int(np.clip(min(level, maxLevel), 0, MAX_LEVEL))
+
+    if "raMin" in region:
+        missing = [k for k in ["raMin", "raMax", "decMin", "decMax"] if k not in region]
+        if missing:
+            raise AttributeError("A box region needs raMin, raMax, decMin and decMax keys (missing %s)" % (", ".join(missing),))
+        raMin, raMax = float(region["raMin"]) % 360., float(region["raMax"]) % 360.
+        decMin, decMax = float(region["decMin"]), float(region["decMax"])
+        if not -90. <= decMin <= decMax <= 90.:
+            raise AttributeError("A box region needs -90 <= decMin <= decMax <= 90")
+        raWidth = (raMax - raMin) % 360. or 360.
+        raCentre = (raMin + raWidth / 2.) % 360.
+
+        # BOUNDING CONE OF THE BOX FROM POINTS ALONG ITS EDGES
+        t = np.linspace(0., 1., 50)
+        edgeRa = np.concatenate([raMin + t * raWidth, raMin + t * raWidth, np.full(50, raMin), np.full(50, raMax)])
+        edgeDec = np.concatenate([np.full(50, decMin), np.full(50, decMax), decMin + t * (decMax - decMin), decMin + t * (decMax - decMin)])
+        decCentre = (decMin + decMax) / 2.
+        cosSep = np.sin(np.radians(decCentre)) * np.sin(np.radians(edgeDec)) + np.cos(np.radians(decCentre)) * np.cos(np.radians(edgeDec)) * np.cos(np.radians(edgeRa - raCentre))
+        radius = np.degrees(np.arccos(np.clip(cosSep, -1., 1.))).max()
+
+        # THE BOX IS WIDEST IN RA AT THE DECLINATION CLOSEST TO THE EQUATOR
+        widestDec = 0. if decMin <= 0. <= decMax else min(abs(decMin), abs(decMax))
+        coneArea = 2. * np.pi * (1. - np.cos(np.radians(min(radius, 180.))))
+        regionLevel = region_level(min(decMax - decMin, raWidth * np.cos(np.radians(widestDec))), coneArea)
+        hp = ah.HEALPix(nside=ah.level_to_nside(regionLevel), order='nested')
+        pad = hp.pixel_resolution.to_value(u.deg)
+        if coneArea > np.pi:
+            # LARGE CONE SEARCHES ARE SLOW; FILTERING EVERY PIXEL BY ITS CENTRE IS QUICKER
+            pixels = np.arange(hp.npix, dtype=np.int64)
+        else:
+            pixels = hp.cone_search_lonlat(raCentre * u.deg, decCentre * u.deg, (radius + pad) * u.deg)
+
+        # KEEP PIXELS WITH CENTRES INSIDE THE BOX GROWN BY ONE PIXEL
+        lon, lat = hp.healpix_to_lonlat(pixels)
+        lon, lat = lon.to_value(u.deg), lat.to_value(u.deg)
+        keep = (lat >= decMin - pad) & (lat <= decMax + pad)
+        if raWidth < 360. and max(abs(decMin), abs(decMax)) + pad < 90.:
+            raPad = pad / np.cos(np.radians(max(abs(decMin), abs(decMax)) + pad))
+            keep &= ((lon - raMin) % 360. <= raWidth + raPad) | ((raMin - lon) % 360. <= raPad)
+        return regionLevel, np.unique(pixels[keep])
+
+    if "ra" not in region or "dec" not in region:
+        raise AttributeError("A region needs either ra and dec keys (cone or positions) or raMin, raMax, decMin and decMax keys (box)")
+    ra = np.atleast_1d(np.asarray(region["ra"], dtype=np.float64))
+    dec = np.atleast_1d(np.asarray(region["dec"], dtype=np.float64))
+    if ra.shape != dec.shape:
+        raise AttributeError("Region RA and Dec lists must be of equal length")
+
+    if not region.get("radius"):
+        # JUST THE PIXELS CONTAINING THE POSITIONS
+        return MAX_LEVEL, np.unique(lonlat_to_index29(ra, dec))
+
+    radius = float(region["radius"])
+    if radius < 0.:
+        raise AttributeError("A cone region radius must be positive")
+    coneArea = len(ra) * 2. * np.pi * (1. - np.cos(np.radians(min(radius, 180.))))
+    regionLevel = region_level(2. * radius, coneArea)
+    hp = ah.HEALPix(nside=ah.level_to_nside(regionLevel), order='nested')
+    pixels = [hp.cone_search_lonlat(r * u.deg, d * u.deg, radius * u.deg) for r, d in zip(ra, dec)]
+    return regionLevel, np.unique(np.concatenate(pixels))
+
+
+def read_skymap_table(
+        mapPath,
+        memmap=False):
+    """*Read the multi-order pixel table of a skymap from a path, or from the map itself held in memory*
+
+    **Key Arguments:**
+        - ``mapPath`` -- path the the multi-order HealPix map, or the map file contents as ``bytes``, a ``bytearray``, a ``memoryview`` or a file-like object (gzipped or not)
+        - ``memmap`` -- memory-map the table when reading from a path. Default *False*
+
+    **Return:**
+        - ``table`` -- an astropy Table of the map pixels, with the table header in ``meta``
+
+    Maps held in memory are parsed without a round-trip through the disk. Where the FITS layout permits (a binary table of fixed-width numeric columns, as written by the LIGO/Virgo/KAGRA pipelines), the table columns are views of the given buffer rather than copies. Gzipped maps are decompressed in memory first.
+
+    Flat (single-resolution) full-sky HealPix maps, such as GRB localisations, are converted to a multi-order table with one ``UNIQ`` pixel per map pixel (see `flat_to_multiorder`).
+    """
+    from astropy.table import Table
+
+    if isinstance(mapPath, (str, os.PathLike)):
+        table = Table.read(mapPath, memmap=memmap)
+    else:
+        table = _buffer_table(_map_buffer(mapPath))
+    if 'UNIQ' not in table.colnames:
+        table = flat_to_multiorder(table)
+    return table
+
+
+def flat_to_multiorder(
+        table):
+    """*Convert the table of a flat (single-resolution) full-sky HealPix map to a multi-order pixel table*
+
+    **Key Arguments:**
+        - ``table`` -- astropy Table of the flat map (``RING`` or ``NESTED`` ordering, as given by the ``ORDERING`` keyword; default ``RING``)
+
+    **Return:**
+        - ``table`` -- astropy Table with ``UNIQ`` and ``PROBDENSITY`` columns (plus any distance layers), and the original header in ``meta``
+
+    The probability is read from the ``PROBDENSITY`` (per steradian), ``PROB`` or ``PROBABILITY`` (per pixel) column, or failing those the first column of the table. Rows holding several pixels each (as written by healpy) are flattened.
+    """
+    import astropy_healpix as ah
+    import numpy as np
+    from astropy import units as u
+    from astropy.table import Table
+
+    meta = dict(table.meta)
+    if str(meta.get("INDXSCHM", "IMPLICIT")).upper() != "IMPLICIT":
+        raise AttributeError("Only full-sky (implicitly indexed) flat HealPix maps can be read")
+    probColumn = ([c for c in ['PROBDENSITY', 'PROB', 'PROBABILITY'] if c in table.colnames] + table.colnames)[0]
+    values = np.asarray(table[probColumn], dtype=np.float64).ravel()
+    try:
+        nside = int(ah.npix_to_nside(len(values)))
+    except ValueError:
+        raise AttributeError("The skymap has neither a UNIQ column nor a full-sky flat HealPix map of 12 * nside^2 pixels")
+
+    ipix = np.arange(len(values), dtype=np.int64)
+    if str(meta.get("ORDERING", "RING")).upper() == "RING":
+        ipix = np.asarray(ah.HEALPix(nside=nside, order='nested').ring_to_nested(ipix), dtype=np.int64)
+    if probColumn != 'PROBDENSITY':
+        values = values / ah.nside_to_pixel_area(nside).to_value(u.steradian)
+
+    multiorder = Table({'UNIQ': 4 * nside**2 + ipix, 'PROBDENSITY': values}, meta=meta)
+    for c in DISTANCE_COLUMNS:
+        if c in table.colnames:
+            multiorder[c] = np.asarray(table[c], dtype=np.float64).ravel()
+    return multiorder
+
+
+def _map_buffer(
+        mapSource):
+    """*the contents of an in-memory map (bytes, memoryview or file-like object) as a flat, decompressed byte buffer*
+    """
+    import gzip
+
+    if hasattr(mapSource, "getbuffer"):
+        # IN-MEMORY STREAMS (io.BytesIO) EXPOSE THEIR BUFFER WITHOUT A COPY
+        buffer = mapSource.getbuffer()
+    elif hasattr(mapSource, "read"):
+        buffer = mapSource.read()
+    else:
+        buffer = mapSource
+    try:
+        buffer = memoryview(buffer).cast('B')
+    except TypeError:
+        raise AttributeError("A skymap must be given as a path, bytes, a memoryview or a file-like object")
+
+    if buffer[:2] == b"\x1f\x8b":
+        buffer = memoryview(gzip.decompress(buffer))
+    if buffer[:9] != b"SIMPLE  =":
+        raise AttributeError("The skymap given is not a FITS file")
+    return buffer
+
+
+def _fits_hdus(
+        buffer):
+    """*parse the header, data offset and data size of every HDU in a FITS file held in a byte buffer*
+    """
+    from astropy.io import fits
+
+    hdus = []
+    offset = 0
+    while offset + 2880 <= len(buffer):
+        # THE HEADER RUNS TO THE END OF THE 2880-BYTE BLOCK HOLDING ITS END CARD
+        end = None
+        for block in range(offset, len(buffer) - 2879, 2880):
+            cards = bytes(buffer[block:block + 2880])
+            if any(cards[c:c + 8] == b"END     " for c in range(0, 2880, 80)):
+                end = block + 2880
+                break
+        if end is None:
+            raise AttributeError("The skymap FITS file is truncated")
+        header = fits.Header.fromstring(bytes(buffer[offset:end]))
+        axes = [header.get("NAXIS%d" % i, 0) for i in range(1, header.get("NAXIS", 0) + 1)]
+        pixels = 0
+        if axes:
+            pixels = 1
+            for a in axes:
+                pixels *= a
+        size = abs(header["BITPIX"]) // 8 * header.get("GCOUNT", 1) * (header.get("PCOUNT", 0) + pixels)
+        hdus.append((header, end, size))
+        offset = end + -(-size // 2880) * 2880
+    return hdus
+
+
+def _buffer_table(
+        buffer):
+    """*an astropy Table of the first binary table in a FITS byte buffer, viewing the buffer where the layout permits*
+    """
+    import io
+    import re
+    import numpy as np
+    from astropy.table import Table, Column
+    from astropy import units as u
+    from astropy.io.fits.connect import is_column_keyword, REMOVE_KEYWORDS
+
+    tables = [h for h in _fits_hdus(buffer) if h[0].get("XTENSION") == "BINTABLE"]
+    if not tables:
+        raise AttributeError("The skymap FITS file has no binary table")
+    header, offset, size = tables[0]
+
+    # FIXED-WIDTH NUMERIC COLUMNS WITH NO HEAP OR SCALING CAN BE VIEWED IN PLACE
+    formats = {"B": "u1", "I": ">i2", "J": ">i4", "K": ">i8", "E": ">f4", "D": ">f8"}
+    names, dtypes = [], []
+    for i in range(1, header["TFIELDS"] + 1):
+        form = re.match(r"^\s*(\d*)([A-Z])", header["TFORM%d" % i])
+        if not form or form.group(1) not in ("", "1") or form.group(2) not in formats or "TSCAL%d" % i in header or "TZERO%d" % i in header:
+            break
+        names.append(header["TTYPE%d" % i])
+        dtypes.append(formats[form.group(2)])
+    else:
+        rowType = np.dtype(list(zip(names, dtypes)))
+        if header.get("PCOUNT", 0) == 0 and rowType.itemsize == header["NAXIS1"]:
+            rows = np.frombuffer(buffer, dtype=rowType, count=header["NAXIS2"], offset=offset)
+            units = [header.get("TUNIT%d" % i) for i in range(1, len(names) + 1)]
+            table = Table([Column(rows[n], name=n, unit=u.Unit(unit, parse_strict='silent') if unit else None, copy=False) for n, unit in zip(names, units)], copy=False)
+            for key, value, comment in header.cards:
+                if key in ["COMMENT", "HISTORY"]:
+                    table.meta.setdefault("comments" if key == "COMMENT" else key, []).append(value)
+                elif not is_column_keyword(key) and key not in REMOVE_KEYWORDS:
+                    table.meta[key] = value
+            return table
+
+    return Table.read(io.BytesIO(bytes(buffer)), format="fits")
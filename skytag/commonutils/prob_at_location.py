@@ -23,17 +23,29 @@ def prob_at_location(
         mjd=False,
         log=False,
         distance=False,
-        probdensity=False):
+        probdensity=False,
+        workers=1,
+        region=False,
+        skymap=False,
+        cache=False,
+        frame="icrs",
+        lazy=False):
     """*Return the probability contour a given sky-location resides within in a heaplix skymap*
 
     **Key Arguments:**
-        - ``ra`` -- right ascension in decimal degrees (float or list)
+        - ``ra`` -- right ascension in decimal degrees (float or list), or a `coordinate_set` (``dec`` is then ignored)
         - ``dec`` -- declination in decimal degrees (float or list)
-        - ``mapPath`` -- path the the HealPix map
+        - ``mapPath`` -- path the the HealPix map, or the map itself as ``bytes``, a ``memoryview`` or a file-like object (e.g. straight from an alert payload)
         - ``mjd`` -- MJD of transient event (e.g. discovery date). If supplied, a time-delta from the map event is returned (float or list)
         - ``log`` -- logger
         - ``distance`` -- return also a distance (if present). Default False
         - ``probdensity`` -- return also the probability density. Default False
+        - ``workers`` -- number of worker processes to annotate the locations with. When greater than 1 the prepared map is placed in shared memory once and each worker processes a shard of the locations. The private copy of each map array is freed as it is shared, so peak memory is roughly the map plus its largest column, however many workers are used. Default 1
+        - ``region`` -- only keep the map pixels overlapping a region of the sky. Pass `True` to use the pixels containing the input locations, or a region dictionary (cones or a box, see `prepare_skymap`). Credible levels are still ranked against the whole map. Locations outside the region return `nan`. Default False
+        - ``skymap`` -- an already prepared skymap (see `prepare_skymap`), used in place of reading ``mapPath`` (``region`` is then ignored; prepare the skymap with a region instead). Default False
+        - ``cache`` -- a persistent result cache (see `result_cache`), or `True` to use the default cache. Only the locations missing from the cache are computed. Default False
+        - ``frame`` -- the frame of the input locations: ``icrs``, ``galactic`` or ``ecliptic``. For galactic and ecliptic inputs, ``ra`` and ``dec`` hold the longitudes and latitudes in decimal degrees. Default *icrs*
+        - ``lazy`` -- return a `location_result` whose outputs are only computed when first read, in place of the lists below (``distance`` and ``probdensity`` are then ignored; every output is available). Cannot be combined with ``workers`` or ``cache``. Default False
 
     **Return:**
         - ``probs`` -- a list of probabilities the same length as the input RA and Dec lists. One probability per location.
@@ -110,6 +122,101 @@ def prob_at_location(
     )
     ```
 
+    For very large catalogues, spread the work over several processes. The prepared map is shared between the workers rather than copied into each one:
+
+    ```
+    from skytag.commonutils import prob_at_location
+    prob = prob_at_location(
+        log=log,
+        ra=raArray,
+        dec=decArray,
+        mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+        workers=8
+    )
+    ```
+
+    If you only need a handful of locations, or a single telescope field, restrict the map to the region of interest. Only the overlapping pixels are indexed and have their distance layers read:
+
+    ```
+    from skytag.commonutils import prob_at_location
+    prob = prob_at_location(
+        log=log,
+        ra=[10.343234, 10.512235],
+        dec=[14.345532, 14.125411],
+        mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+        region=True
+    )
+    ```
+
+    If the same catalogues are annotated against the same maps again and again (nightly re-runs, restarts, several tools querying one event), keep the results in a persistent cache. A re-run only computes the locations the cache has not seen for that map:
+
+    ```
+    from skytag.commonutils import prob_at_location
+    prob = prob_at_location(
+        log=log,
+        ra=raArray,
+        dec=decArray,
+        mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+        cache=True
+    )
+    ```
+
+    Maps that arrive inside alert payloads can be annotated without first writing them to disk. Pass the map file contents in place of a path:
+
+    ```
+    import base64
+    from skytag.commonutils import prob_at_location
+    prob = prob_at_location(
+        log=log,
+        ra=raArray,
+        dec=decArray,
+        mapPath=base64.b64decode(alert["skymap"])
+    )
+    ```
+
+    When the same catalogue is annotated against several maps (or several revisions of one event's map), convert it to a `coordinate_set` once. Its HealPix indices are computed a single time and reused for every map:
+
+    ```
+    from skytag.commonutils import prob_at_location, coordinate_set
+    coords = coordinate_set(log=log, ra=raArray, dec=decArray)
+    for mapPath in mapPaths:
+        prob = prob_at_location(
+            log=log,
+            ra=coords,
+            dec=None,
+            mapPath=mapPath
+        )
+    ```
+
+    The shape of the returned list depends on the outputs requested. Pass ``lazy=True`` for a `location_result` with named attributes instead. Only the outputs actually read are computed, so there is no need to request distances "just in case":
+
+    ```
+    from skytag.commonutils import prob_at_location
+    results = prob_at_location(
+        log=log,
+        ra=[10.343234, 170.343532],
+        dec=[14.345532, -40.532255],
+        mjd=[60034.257381, 60063.257381],
+        mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+        lazy=True
+    )
+    probs, deltas = results.prob, results.mjdDelta
+    distances = results.distance
+    ```
+
+    Catalogues in galactic or ecliptic coordinates can be passed as they are. They are rotated to equatorial coordinates with a precomputed rotation matrix (see `frame_to_icrs`):
+
+    ```
+    from skytag.commonutils import prob_at_location
+    prob = prob_at_location(
+        log=log,
+        ra=glonArray,
+        dec=glatArray,
+        mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+        frame="galactic"
+    )
+    ```
+
     """
 
     if not log:
@@ -118,63 +225,66 @@ def prob_at_location(
 
     log.debug('starting the ``prob_at_location`` function')
 
-    from astropy.table import Table
-    import astropy_healpix as ah
+    from skytag.commonutils.prepare_skymap import prepare_skymap, lonlat_to_index29, match_skymap_pixels, coordinate_arrays, take_rows, frame_to_icrs
+    from skytag.commonutils.coordinate_set import coordinate_set
     import numpy as np
-    from astropy import units as u
-    import pandas as pd
-
-
-    
 
-    # CONVERT HEALPIX MAP TO DATAFRAME
-    skymap = Table.read(mapPath)
-    if "DISTMEAN" in skymap.meta:
-        rmax = skymap.meta["DISTMEAN"] + 7*skymap.meta["DISTSTD"]   
+    coords = None
+    if isinstance(ra, coordinate_set):
+        coords = ra
+        ra, dec = coords.ra, coords.dec
+    else:
+        ra, dec = coordinate_arrays(ra, dec)
+        ra, dec = frame_to_icrs(ra, dec, frame)
+
+    if lazy and ((workers and workers > 1) or cache is not False):
+        raise AttributeError("Lazy results cannot be combined with workers or a result cache")
+
+    if cache is not False:
+        results = _cached_prob_at_location(ra=ra, dec=dec, mapPath=mapPath, mjd=mjd, log=log, distance=distance, probdensity=probdensity, workers=workers, region=region, skymap=skymap, cache=cache)
+        log.debug('completed the ``prob_at_location`` function')
+        return results
+
+    # PREPARE THE HEALPIX MAP ARRAYS (ONLY AROUND THE INPUT LOCATIONS IF REQUESTED)
+    ownMap = skymap is False
+    if ownMap:
+        if region is True:
+            region = {"ra": ra, "dec": dec}
+        skymap = prepare_skymap(mapPath=mapPath, log=log, region=region)
+    meta = skymap['meta']
+    if "DISTMEAN" in meta:
+        rmax = meta["DISTMEAN"] + 7*meta["DISTSTD"]
     else:
         rmax = 500
-    mjdObs = skymap.meta["MJD-OBS"]
-    skymap.sort('PROBDENSITY', reverse=True)
-    tableData = skymap.to_pandas()
-
-    # FIND LEVEL AND NSIDE PIXEL INDEX FOR EACH MULTI-RES PIXEL
-    tableData['LEVEL'], tableData['IPIX'] = ah.uniq_to_level_ipix(tableData['UNIQ'])
-    tableData['NSIDE'] = ah.level_to_nside(tableData['LEVEL'])
-    # DETERMINE THE PIXEL AREA AND PROB OF EACH PIXEL
-    tableData['AREA'] = ah.nside_to_pixel_area(tableData['NSIDE']).to_value(u.steradian)
-    tableData['PROB'] = tableData['AREA'] * tableData["PROBDENSITY"]
-    tableData['CUMPROB'] = np.cumsum(tableData['PROB'])
-
-    # DETERMINE THE INDEX OF MULTI-RES PIX AT HIGHEST HEALPIX RESOLUTION
-    max_level = 29
-    max_nside = ah.level_to_nside(max_level)
-    tableData['INDEX29'] = tableData['IPIX'] * (2**(max_level - tableData['LEVEL']))**2
-
-    if not isinstance(ra, list) and not isinstance(ra, np.ndarray):
-        ra = [ra]
-    if not isinstance(dec, list) and not isinstance(dec, np.ndarray):
-        dec = [dec]
-
-    ra = np.array(ra) * u.deg
-    dec = np.array(dec) * u.deg
-
-    # TEST FOR EQUAL LEN
-    if ra.shape != dec.shape:
-        raise AttributeError("RA and Dec lists must be of equal length")
-
-    # DETERMINE THE HIGH-RES PIXEL LOCATION FOR EACH RA AND DEC
-    match_ipix = ah.lonlat_to_healpix(ra, dec, max_nside, order='nested')
-
-    # RETURNS THE INDICES THAT WOULD SORT THIS ARRAY
-    sorter = np.argsort(tableData['INDEX29'])
-    # FIND INDICES WHERE ELEMENTS SHOULD BE INSERTED TO MAINTAIN ORDER -- CLOSET MATCH TO THE RIGHT
-    matchedIndices = sorter[np.searchsorted(tableData['INDEX29'].values, match_ipix, side='right', sorter=sorter) - 1]
-
-    # MERGE TABLES
-    results = tableData.iloc[matchedIndices]
+    mjdObs = meta["MJD-OBS"]
+
+    distMean, distStd = None, None
+    if workers and workers > 1:
+        # SHARD THE CATALOGUE ACROSS WORKER PROCESSES ATTACHED TO THE MAP IN SHARED MEMORY. THE PRIVATE
+        # MAP ARRAYS (UNLESS THE CALLER OWNS THEM) ARE RELEASED AS THEY ARE SHARED, SO GATHER THE VALUES
+        # NEEDED BEFORE THE BLOCKS CLOSE
+        from skytag.commonutils.shared_skymap import shared_skymap
+        with shared_skymap(log=log, skymap=skymap, release=ownMap) as sharedMap:
+            matchedIndices, distMean, distStd = sharedMap.lookup(ra=ra, dec=dec, workers=workers, distance=distance, rmax=rmax)
+            matchedCumprob = take_rows(skymap['CUMPROB'], matchedIndices)
+            matchedDensity = take_rows(skymap['PROBDENSITY'], matchedIndices)
+    else:
+        # DETERMINE THE HIGH-RES PIXEL LOCATION FOR EACH RA AND DEC AND MATCH TO THE MULTI-RES PIXELS
+        if coords is not None:
+            matchedIndices = coords.match(skymap)
+        else:
+            match_ipix = lonlat_to_index29(ra, dec)
+            matchedIndices = match_skymap_pixels(skymap, match_ipix)
+        if lazy:
+            from skytag.commonutils.location_result import location_result
+            results = location_result(log=log, skymap=skymap, rows=matchedIndices, mjd=mjd)
+            log.debug('completed the ``prob_at_location`` function')
+            return results
+        matchedCumprob = take_rows(skymap['CUMPROB'], matchedIndices)
+        matchedDensity = take_rows(skymap['PROBDENSITY'], matchedIndices)
 
     resultCount = 1
-    resultsToReturn = [np.around(results['CUMPROB'].values * 100., 2).tolist()]
+    resultsToReturn = [np.around(matchedCumprob * 100., 2).tolist()]
 
     if mjd:
         resultCount += 1
@@ -189,13 +299,11 @@ def prob_at_location(
 
     if distance:
         resultCount += 1
-        if 'DISTMU' in results.columns:
-            dist = results['DISTMU'].values
-            distsigma = results['DISTSIGMA'].values
-            distnorm = results['DISTNORM'].values
-            mean, std = ansatz_to_normal(distmu=dist, distsigma=distsigma, distnorm=distnorm, rmax=rmax, num=10000)
+        if distMean is not None or 'DISTMU' in skymap:
+            if distMean is None:
+                distMean, distStd = _location_distances(skymap, matchedIndices)
             distTuples = []
-            distTuples[:] = [(d, s) for d, s in zip(np.round(mean, 2), np.round(std, 2))]
+            distTuples[:] = [(d, s) for d, s in zip(np.round(distMean, 2), np.round(distStd, 2))]
             resultsToReturn.append(distTuples)
         else:
             distTuples = []
@@ -205,7 +313,7 @@ def prob_at_location(
 
     if probdensity:
         resultCount += 1
-        prob = np.around(results['PROBDENSITY'].values, 5).tolist()
+        prob = np.around(matchedDensity, 5).tolist()
         resultsToReturn.append(prob)
 
     log.debug('completed the ``prob_at_location`` function')
@@ -215,6 +323,87 @@ def prob_at_location(
         return resultsToReturn[0:resultCount]
 
 
+def _cached_prob_at_location(
+        ra,
+        dec,
+        mapPath,
+        mjd,
+        log,
+        distance,
+        probdensity,
+        workers,
+        region,
+        skymap,
+        cache):
+    """*`prob_at_location` served from a persistent result cache, computing (and caching) only the missing locations*
+    """
+    import numpy as np
+    from skytag.commonutils.result_cache import result_cache
+
+    if mapPath is False or mapPath is None:
+        raise AttributeError("A mapPath is needed to cache results (the cache is keyed by the map file checksum)")
+    if not isinstance(mapPath, (str, os.PathLike)):
+        # READ A FILE-LIKE MAP ONCE, FOR BOTH THE CHECKSUM AND ANY LOCATIONS MISSING FROM THE CACHE
+        from skytag.commonutils.prepare_skymap import _map_buffer
+        mapPath = _map_buffer(mapPath)
+    if cache is True:
+        cache = result_cache(log=log)
+
+    sha256, mjdObs, hasDistance = cache.map_key(mapPath)
+    found, values = cache.get(sha256, ra, dec, distance=distance)
+    missing = ~found
+    log.info('%s of %s locations found in the result cache' % (found.sum(), len(ra)))
+
+    if missing.any():
+        results = prob_at_location(ra=ra[missing], dec=dec[missing], mapPath=mapPath, log=log, distance=distance, probdensity=True, workers=workers, region=region, skymap=skymap)
+        values["prob"][missing] = results[0]
+        values["probdensity"][missing] = results[-1]
+        if distance and hasDistance:
+            values["distMean"][missing] = [d for d, s in results[1]]
+            values["distStd"][missing] = [s for d, s in results[1]]
+        # LOCATIONS OUTSIDE A REGION-RESTRICTED MAP HAVE NO RESULT TO CACHE
+        keep = np.zeros(len(ra), dtype=bool)
+        keep[missing] = ~np.isnan(values["prob"][missing])
+        cache.put(sha256, ra[keep], dec[keep], values["prob"][keep], values["probdensity"][keep], distMean=values["distMean"][keep] if distance else None, distStd=values["distStd"][keep] if distance else None)
+
+    resultsToReturn = [values["prob"].tolist()]
+    if mjd:
+        if not isinstance(mjd, list) and not isinstance(mjd, np.ndarray):
+            mjd = [mjd]
+        mjd = np.array(mjd)
+        if ra.shape != mjd.shape:
+            raise AttributeError("MJD list must be of equal length to RA and Dec lists")
+        resultsToReturn.append(np.around(mjd - mjdObs, 5).tolist())
+    if distance:
+        if hasDistance:
+            resultsToReturn.append([(d, s) for d, s in zip(np.round(values["distMean"], 2), np.round(values["distStd"], 2))])
+        else:
+            resultsToReturn.append([(None, None) for p in resultsToReturn[0]])
+    if probdensity:
+        resultsToReturn.append(values["probdensity"].tolist())
+
+    return resultsToReturn
+
+
+def _location_distances(
+        skymap,
+        rows):
+    """*the distance mean and sigma at matched skymap rows, nan for locations outside a region-restricted map*
+    """
+    import numpy as np
+
+    meta = skymap['meta']
+    if "DISTMEAN" in meta:
+        rmax = meta["DISTMEAN"] + 7*meta["DISTSTD"]
+    else:
+        rmax = 500
+    distMean = np.full(len(rows), np.nan)
+    distStd = np.full(len(rows), np.nan)
+    inside = rows >= 0
+    insideRows = rows[inside]
+    distMean[inside], distStd[inside] = ansatz_to_normal(distmu=skymap['DISTMU'][insideRows], distsigma=skymap['DISTSIGMA'][insideRows], distnorm=skymap['DISTNORM'][insideRows], rmax=rmax, num=10000)
+    return distMean, distStd
+
 
 def ansatz_to_normal(distmu, distsigma, distnorm, rmin=0, rmax=500, num=1000):
     """
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Return the map probability within, and the best credible level of, the positional error regions of sources*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+
+def prob_in_error_region(
+        ra,
+        dec,
+        mapPath=False,
+        log=False,
+        radius=False,
+        semiMajor=False,
+        semiMinor=False,
+        pa=0.,
+        samples=128,
+        skymap=False):
+    """*Return the map probability within, and the best credible level of, the positional error regions of sources*
+
+    **Key Arguments:**
+        - ``ra`` -- right ascension of the sources in decimal degrees (float or list)
+        - ``dec`` -- declination of the sources in decimal degrees (float or list)
+        - ``mapPath`` -- path the the multi-order HealPix map
+        - ``log`` -- logger
+        - ``radius`` -- error-circle radius of each source in decimal degrees (float or list)
+        - ``semiMajor`` -- error-ellipse semi-major axis of each source in decimal degrees (float or list). Use in place of ``radius``
+        - ``semiMinor`` -- error-ellipse semi-minor axis of each source in decimal degrees (float or list)
+        - ``pa`` -- position angle of each ellipse's major axis in decimal degrees, east of north (float or list). Default *0*
+        - ``samples`` -- the number of sample positions used to rasterise each error region. Default *128*
+        - ``skymap`` -- an already prepared skymap (see `prepare_skymap`), used in place of ``mapPath``. Default *False*
+
+    **Return:**
+        - ``probs`` -- the map probability (%) contained within each error region
+        - ``bestLevels`` -- the best (lowest) credible level (%) found anywhere within each error region
+
+    ```python
+    from skytag.commonutils import prob_in_error_region
+    probs, bestLevels = prob_in_error_region(
+        log=log,
+        ra=[10.343234, 170.343532],
+        dec=[14.345532, -40.532255],
+        radius=[0.5, 2.0],
+        mapPath="/path/to/bayestar.multiorder.fits"
+    )
+    ```
+
+    Or for error ellipses:
+
+    ```python
+    probs, bestLevels = prob_in_error_region(
+        log=log,
+        ra=[10.343234, 170.343532],
+        dec=[14.345532, -40.532255],
+        semiMajor=[0.5, 2.0],
+        semiMinor=[0.2, 1.0],
+        pa=[30., 120.],
+        mapPath="/path/to/bayestar.multiorder.fits"
+    )
+    ```
+
+    A source whose error region overlaps the 90% credible region has a ``bestLevel`` below 90, even if its catalogued position lies outside it. The ``bestLevel`` is never worse than the credible level at the catalogued position. The probability within the region is useful for ranking sources with very different positional errors against each other.
+
+    Every error region is rasterised with the same number of equal-area samples (a unit-disk template scaled to each source's ellipse on the tangent plane) and all sources are matched to the multi-order map together. Regions much smaller than the map pixels are effectively exact; for very large error regions increase ``samples``.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``prob_in_error_region`` function')
+
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import prepare_skymap, coordinate_arrays, lonlat_to_index29, match_skymap_pixels, take_rows
+    from skytag.commonutils.fov_probability import integrate_templates, SAMPLE_CHUNK
+
+    ra, dec = coordinate_arrays(ra, dec)
+    if radius is not False:
+        semiMajor = semiMinor = radius
+    elif semiMajor is False or semiMinor is False:
+        raise AttributeError("Give either an error radius or an error-ellipse semiMajor and semiMinor")
+    try:
+        semiMajor = np.broadcast_to(np.asarray(semiMajor, dtype=np.float64), ra.shape)
+        semiMinor = np.broadcast_to(np.asarray(semiMinor, dtype=np.float64), ra.shape)
+        pa = np.broadcast_to(np.asarray(pa, dtype=np.float64), ra.shape)
+    except ValueError:
+        raise AttributeError("Error region sizes and position angles must be single values or lists of equal length to the RA and Dec lists")
+    if (semiMajor < 0.).any() or (semiMinor < 0.).any() or (semiMajor >= 90.).any() or (semiMinor >= 90.).any():
+        raise AttributeError("Error region sizes must be between 0 and 90 degrees")
+    samples = int(samples)
+    if samples < 1:
+        raise AttributeError("At least one sample per error region is needed")
+
+    if skymap is False:
+        skymap = prepare_skymap(mapPath=mapPath, log=log)
+
+    # EQUAL-AREA SAMPLES OF THE UNIT DISK ON A SUNFLOWER SPIRAL
+    i = np.arange(samples) + 0.5
+    r = np.sqrt(i / samples)
+    theta = i * np.pi * (3. - np.sqrt(5.))
+    u, v = r * np.sin(theta), r * np.cos(theta)
+
+    probs = np.zeros(len(ra))
+    best = np.full(len(ra), np.nan)
+    step = max(1, SAMPLE_CHUNK // samples)
+    for start in range(0, len(ra), step):
+        stop = min(start + step, len(ra))
+        # THE MAJOR AXIS RUNS ALONG THE POSITION ANGLE (THE TEMPLATE'S y-AXIS)
+        a = np.tan(np.radians(semiMajor[start:stop]))[:, None]
+        b = np.tan(np.radians(semiMinor[start:stop]))[:, None]
+        x, y = u * b, v * a
+        weight = np.pi * a * b / samples / (1. + x**2 + y**2)**1.5
+        probs[start:stop], best[start:stop] = integrate_templates(skymap=skymap, ra=ra[start:stop], dec=dec[start:stop], pa=pa[start:stop], x=x, y=y, weight=weight)
+
+    # THE CATALOGUED POSITION ITSELF IS ALWAYS PART OF THE ERROR REGION
+    centre = take_rows(skymap['CUMPROB'], match_skymap_pixels(skymap, lonlat_to_index29(ra, dec)))
+    best = np.fmin(best, centre)
+
+    log.debug('completed the ``prob_in_error_region`` function')
+    return np.around(probs * 100., 4).tolist(), np.around(best * 100., 2).tolist()
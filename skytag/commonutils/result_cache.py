@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*A persistent (SQLite) cache of sky-location annotations, keyed by the content of the map and the sky-location*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+DEFAULT_CACHE_PATH = "~/.config/skytag/results.sqlite"
+
+
+class result_cache(object):
+    """
+    *a persistent (SQLite) cache of sky-location annotations, keyed by the content of the map and the sky-location*
+
+    **Key Arguments:**
+        - ``log`` -- logger
+        - ``cachePath`` -- path to the SQLite cache file. Default *~/.config/skytag/results.sqlite*
+        - ``maxEntries`` -- the maximum number of cached annotations. When exceeded, the least recently used annotations are evicted. Default *1,000,000*
+
+    **Usage:**
+
+    Pass a cache to `prob_at_location` and only the sources missing from the cache are computed:
+
+    ```python
+    from skytag.commonutils import prob_at_location, result_cache
+    cache = result_cache(log=log, maxEntries=5000000)
+    prob, deltas = prob_at_location(
+        log=log,
+        ra=raList,
+        dec=decList,
+        mjd=mjdList,
+        mapPath="/path/to/bayestar.multiorder.fits",
+        cache=cache
+    )
+    ```
+
+    Or pass ``cache=True`` to use the default cache file. Annotations are keyed by a sha256 checksum of the map file (so a map updated in place is never served stale results, and the same map at another path shares its results) and the exact RA and Dec. Distances are cached separately as they are only computed when requested. The cache is safe to share between processes.
+    """
+
+    def __init__(
+            self,
+            log,
+            cachePath=DEFAULT_CACHE_PATH,
+            maxEntries=1000000
+    ):
+        self.log = log
+        log.debug("instansiating a new 'result_cache' object")
+
+        import sqlite3
+
+        if int(maxEntries) < 1:
+            raise AttributeError("The cache must hold at least one entry")
+        self.maxEntries = int(maxEntries)
+        self.cachePath = os.path.expanduser(cachePath)
+        cacheDir = os.path.dirname(self.cachePath)
+        if cacheDir and not os.path.exists(cacheDir):
+            os.makedirs(cacheDir)
+
+        self.conn = sqlite3.connect(self.cachePath, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS maps (
+                path TEXT, size INTEGER, mtime INTEGER, sha256 TEXT, mjdObs REAL, hasDistance INTEGER,
+                PRIMARY KEY (path, size, mtime));
+            CREATE TABLE IF NOT EXISTS results (
+                sha256 TEXT, distance INTEGER, ra REAL, dec REAL,
+                prob REAL, probdensity REAL, distMean REAL, distStd REAL, accessed REAL,
+                PRIMARY KEY (sha256, distance, ra, dec));
+            CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+        """)
+        self.conn.commit()
+
+        return None
+
+    def map_key(
+            self,
+            mapPath):
+        """*the sha256 checksum, event MJD and distance layers of a map, read only when the map file is new or has changed*
+
+        **Key Arguments:**
+            - ``mapPath`` -- path the the HealPix map, or the map itself held in memory (see `read_skymap_table`)
+
+        **Return:**
+            - ``sha256`` -- checksum of the map file
+            - ``mjdObs`` -- the MJD of the map event
+            - ``hasDistance`` -- True if the map has distance layers
+        """
+        self.log.debug('starting the ``map_key`` method')
+
+        import hashlib
+        from astropy.io import fits
+        from skytag.commonutils.index_skymap import _checksum
+        from skytag.commonutils.prepare_skymap import _map_buffer, _fits_hdus
+
+        if not isinstance(mapPath, (str, os.PathLike)):
+            # A MAP HELD IN MEMORY IS CHECKSUMMED EVERY TIME
+            buffer = _map_buffer(mapPath)
+            header = [h[0] for h in _fits_hdus(buffer) if h[0].get("XTENSION") == "BINTABLE"][0]
+            columns = [header[k] for k in header if k.startswith("TTYPE")]
+            self.log.debug('completed the ``map_key`` method')
+            return hashlib.sha256(buffer).hexdigest(), float(header["MJD-OBS"]), "DISTMU" in columns
+
+        path = os.path.realpath(mapPath)
+        stat = os.stat(path)
+        row = self.conn.execute("SELECT sha256, mjdObs, hasDistance FROM maps WHERE path=? AND size=? AND mtime=?", (path, stat.st_size, stat.st_mtime_ns)).fetchone()
+        if row is None:
+            header = fits.getheader(path, 1)
+            columns = [header[k] for k in header if k.startswith("TTYPE")]
+            row = (_checksum(path), float(header["MJD-OBS"]), int("DISTMU" in columns))
+            with self.conn:
+                self.conn.execute("DELETE FROM maps WHERE path=?", (path,))
+                self.conn.execute("INSERT INTO maps VALUES (?, ?, ?, ?, ?, ?)", (path, stat.st_size, stat.st_mtime_ns) + row)
+
+        self.log.debug('completed the ``map_key`` method')
+        return row[0], row[1], bool(row[2])
+
+    def get(
+            self,
+            sha256,
+            ra,
+            dec,
+            distance=False):
+        """*fetch the cached annotations of sky-locations*
+
+        **Key Arguments:**
+            - ``sha256`` -- the map checksum (see `map_key`)
+            - ``ra`` -- right ascensions in decimal degrees (numpy array)
+            - ``dec`` -- declinations in decimal degrees (numpy array)
+            - ``distance`` -- fetch annotations that include distances. Default *False*
+
+        **Return:**
+            - ``found`` -- boolean array flagging the cached sky-locations
+            - ``values`` -- dictionary of ``prob``, ``probdensity``, ``distMean`` and ``distStd`` arrays (``nan`` where not found)
+        """
+        self.log.debug('starting the ``get`` method')
+
+        import time
+        import numpy as np
+
+        count = len(ra)
+        found = np.zeros(count, dtype=bool)
+        values = {k: np.full(count, np.nan) for k in ["prob", "probdensity", "distMean", "distStd"]}
+
+        with self.conn:
+            self._query_table(ra, dec)
+            rows = self.conn.execute("""
+                SELECT q.i, r.prob, r.probdensity, r.distMean, r.distStd FROM query q
+                JOIN results r ON r.sha256=? AND r.distance=? AND r.ra=q.ra AND r.dec=q.dec""", (sha256, int(bool(distance)))).fetchall()
+            self.conn.execute("""
+                UPDATE results SET accessed=? WHERE sha256=? AND distance=? AND EXISTS (
+                    SELECT 1 FROM query q WHERE q.ra=results.ra AND q.dec=results.dec)""", (time.time(), sha256, int(bool(distance))))
+
+        if rows:
+            rows = np.array(rows, dtype=np.float64)
+            index = rows[:, 0].astype(np.int64)
+            found[index] = True
+            for n, k in enumerate(["prob", "probdensity", "distMean", "distStd"]):
+                values[k][index] = rows[:, n + 1]
+
+        self.log.debug('completed the ``get`` method')
+        return found, values
+
+    def put(
+            self,
+            sha256,
+            ra,
+            dec,
+            prob,
+            probdensity,
+            distMean=None,
+            distStd=None):
+        """*cache the annotations of sky-locations, evicting the least recently used annotations if the cache is full*
+
+        **Key Arguments:**
+            - ``sha256`` -- the map checksum (see `map_key`)
+            - ``ra`` -- right ascensions in decimal degrees (numpy array)
+            - ``dec`` -- declinations in decimal degrees (numpy array)
+            - ``prob`` -- credible levels (%)
+            - ``probdensity`` -- probability densities
+            - ``distMean`` -- distance means (None if distances were not computed)
+            - ``distStd`` -- distance sigmas (None if distances were not computed)
+        """
+        self.log.debug('starting the ``put`` method')
+
+        import time
+        import numpy as np
+
+        distance = distMean is not None
+        count = len(ra)
+        if not distance:
+            distMean = distStd = np.full(count, np.nan)
+        now = time.time()
+        # NAN IS STORED AS NULL BY SQLITE AND READ BACK AS nan BY NUMPY
+        records = [(sha256, int(distance), float(r), float(d), _nullable(p), _nullable(pd), _nullable(m), _nullable(s), now) for r, d, p, pd, m, s in zip(ra, dec, prob, probdensity, distMean, distStd)]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", records)
+            total = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if total > self.maxEntries:
+                # EVICT DOWN TO 90% OF THE LIMIT SO EVICTION IS NOT REPEATED ON EVERY WRITE
+                evict = total - int(self.maxEntries * 0.9)
+                self.conn.execute("DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY accessed LIMIT ?)", (evict,))
+                self.log.info('evicted %(evict)s annotations from the result cache' % locals())
+
+        self.log.debug('completed the ``put`` method')
+        return None
+
+    def close(
+            self):
+        """*close the cache database*
+        """
+        self.conn.close()
+        return None
+
+    def _query_table(
+            self,
+            ra,
+            dec):
+        """*load the sky-locations being looked up into a temporary table to join against*
+        """
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS query (i INTEGER PRIMARY KEY, ra REAL, dec REAL)")
+        self.conn.execute("DELETE FROM query")
+        self.conn.executemany("INSERT INTO query VALUES (?, ?, ?)", ((i, float(r), float(d)) for i, (r, d) in enumerate(zip(ra, dec))))
+        return None
+
+
+def _nullable(
+        value):
+    """*convert a value to a float, or None for missing and nan values*
+    """
+    import math
+
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else value
@@ -0,0 +1,252 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Place the prepared arrays of a skymap in shared memory so a pool of worker processes can annotate shards of a catalogue without copying the map*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+SHARED_COLUMNS = ['INDEX29', 'LEVEL', 'CUMPROB', 'PROBDENSITY', 'DISTMU', 'DISTSIGMA', 'DISTNORM']
+
+# ARRAYS ATTACHED BY EACH WORKER PROCESS (POPULATED BY THE POOL INITIALIZER)
+_workerArrays = {}
+_workerBlocks = []
+
+
+class shared_skymap(object):
+    """
+    *place the prepared arrays of a skymap in shared memory so a pool of worker processes can annotate shards of a catalogue without copying the map*
+
+    **Key Arguments:**
+        - ``log`` -- logger
+        - ``skymap`` -- a prepared skymap (see `prepare_skymap`)
+        - ``release`` -- swap each array of ``skymap`` for a view of its shared memory block as soon as it is copied, so the map is never held twice (peak memory is the map plus its largest column). The shared arrays are removed from ``skymap`` again on `close()`. Default *False*
+
+    **Usage:**
+
+    The map arrays are copied into shared memory once. Every worker attaches to the same blocks zero-copy, so memory use does not grow with the number of workers. Without ``release=True`` the parent holds both its private copy of the map and the shared copy.
+
+    ```python
+    from skytag.commonutils import prepare_skymap
+    from skytag.commonutils.shared_skymap import shared_skymap
+    skymap = prepare_skymap(log=log, mapPath="/path/to/bayestar.multiorder.fits")
+    sharedMap = shared_skymap(log=log, skymap=skymap)
+    rows, distMean, distStd = sharedMap.lookup(ra=raArray, dec=decArray, workers=8, distance=True)
+    sharedMap.close()
+    ```
+
+    ``rows`` index into the arrays of the prepared skymap. Your own pool of workers can also attach to the map with `attach_shared_skymap(sharedMap.descriptor)`.
+    """
+
+    def __init__(
+            self,
+            log,
+            skymap,
+            release=False
+    ):
+        self.log = log
+        log.debug("instansiating a new 'shared_skymap' object")
+
+        import numpy as np
+
+        self.blocks = {}
+        self.descriptor = {}
+        self.skymap = skymap if release else None
+        self.partial = bool(skymap.get('region', False))
+        for c in SHARED_COLUMNS:
+            if c in skymap:
+                self._share(c, skymap[c], self.blocks, self.descriptor)
+                if release:
+                    # SWAP THE PRIVATE COPY FOR A VIEW OF THE SHARED BLOCK SO THE MAP IS NEVER HELD TWICE
+                    skymap[c] = np.ndarray(self.descriptor[c][1], dtype=self.descriptor[c][2], buffer=self.blocks[c].buf)
+
+        return None
+
+    def lookup(
+            self,
+            ra,
+            dec,
+            workers=None,
+            distance=False,
+            rmax=500,
+            shardSize=None):
+        """*match sky-locations to map pixels (and optionally estimate distances) using a pool of worker processes*
+
+        **Key Arguments:**
+            - ``ra`` -- right ascension in decimal degrees (numpy array)
+            - ``dec`` -- declination in decimal degrees (numpy array)
+            - ``workers`` -- number of worker processes. Default *all CPUs*
+            - ``distance`` -- also estimate the distance mean and sigma at each location (3D maps only). Default *False*
+            - ``rmax`` -- maximum distance of the ansatz integration grid (Mpc). Default *500*
+            - ``shardSize`` -- number of sources per shard. Default *split the catalogue into 4 shards per worker*
+
+        **Return:**
+            - ``rows`` -- the prepared-skymap row matched by each location (-1 for locations outside a region-restricted map)
+            - ``distMean`` -- distance means (None if not requested or no distance layers)
+            - ``distStd`` -- distance sigmas (None if not requested or no distance layers)
+        """
+        self.log.debug('starting the ``lookup`` method')
+
+        import numpy as np
+        import multiprocessing
+
+        ra = np.ascontiguousarray(ra, dtype=np.float64)
+        dec = np.ascontiguousarray(dec, dtype=np.float64)
+        count = len(ra)
+        if not workers:
+            workers = os.cpu_count() or 1
+        if not shardSize:
+            shardSize = max(1, int(np.ceil(count / (workers * 4))))
+        distance = bool(distance and 'DISTMU' in self.descriptor)
+
+        # THE CATALOGUE AND THE OUTPUT ARRAYS ALSO LIVE IN SHARED MEMORY
+        blocks = {}
+        descriptor = dict(self.descriptor)
+        self._share('RA', ra, blocks, descriptor)
+        self._share('DEC', dec, blocks, descriptor)
+        self._share('ROWS', np.zeros(count, dtype=np.int64), blocks, descriptor)
+        if distance:
+            self._share('OUT_DISTMEAN', np.zeros(count), blocks, descriptor)
+            self._share('OUT_DISTSTD', np.zeros(count), blocks, descriptor)
+
+        shards = [(start, min(start + shardSize, count), distance, rmax, self.partial) for start in range(0, count, shardSize)]
+
+        try:
+            ctx = multiprocessing.get_context()
+            with ctx.Pool(processes=workers, initializer=_attach_worker, initargs=(descriptor,)) as pool:
+                pool.map(_process_shard, shards)
+
+            views = {k: np.ndarray(descriptor[k][1], dtype=descriptor[k][2], buffer=blocks[k].buf) for k in blocks}
+            rows = views['ROWS'].copy()
+            distMean, distStd = None, None
+            if distance:
+                distMean = views['OUT_DISTMEAN'].copy()
+                distStd = views['OUT_DISTSTD'].copy()
+            del views
+        finally:
+            for b in blocks.values():
+                b.close()
+                b.unlink()
+
+        self.log.debug('completed the ``lookup`` method')
+        return rows, distMean, distStd
+
+    def close(
+            self):
+        """*release the shared memory blocks holding the map*
+        """
+        self.log.debug('starting the ``close`` method')
+
+        # DROP THE VIEWS HANDED BACK TO THE SKYMAP (A BLOCK CANNOT BE CLOSED WHILE VIEWED)
+        if self.skymap is not None:
+            for c in self.descriptor:
+                self.skymap.pop(c, None)
+            self.skymap = None
+
+        for b in self.blocks.values():
+            b.close()
+            b.unlink()
+        self.blocks = {}
+        self.descriptor = {}
+
+        self.log.debug('completed the ``close`` method')
+        return None
+
+    def _share(
+            self,
+            name,
+            array,
+            blocks,
+            descriptor):
+        """*copy an array into a new shared memory block and record how to attach to it*
+        """
+        from multiprocessing import shared_memory
+        import numpy as np
+
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+        view[:] = array[:]
+        del view
+        blocks[name] = shm
+        descriptor[name] = (shm.name, array.shape, array.dtype.str)
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def attach_shared_skymap(
+        descriptor):
+    """*attach to the shared memory blocks of a `shared_skymap` from another process*
+
+    **Key Arguments:**
+        - ``descriptor`` -- the ``descriptor`` attribute of a `shared_skymap` object
+
+    **Return:**
+        - ``arrays`` -- dictionary of numpy arrays viewing the shared memory (zero-copy)
+        - ``blocks`` -- the attached shared memory blocks. Keep a reference to these for as long as the arrays are in use, and `close()` (but do not unlink) them when finished.
+    """
+    from multiprocessing import shared_memory
+    import numpy as np
+
+    arrays = {}
+    blocks = []
+    for name, (shmName, shape, dtype) in descriptor.items():
+        try:
+            shm = shared_memory.SharedMemory(name=shmName, track=False)
+        except TypeError:
+            # PYTHON < 3.13 HAS NO `track` ARGUMENT
+            shm = shared_memory.SharedMemory(name=shmName)
+        blocks.append(shm)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    return arrays, blocks
+
+
+def _attach_worker(
+        descriptor):
+    """*pool initializer: attach the worker process to the shared skymap and catalogue*
+    """
+    arrays, blocks = attach_shared_skymap(descriptor)
+    _workerArrays.clear()
+    _workerArrays.update(arrays)
+    _workerBlocks[:] = blocks
+
+
+def _process_shard(
+        shard):
+    """*match one shard of the shared catalogue to map pixels, writing the results straight into shared memory*
+    """
+    from skytag.commonutils.prepare_skymap import lonlat_to_index29, match_skymap_pixels
+    from skytag.commonutils.prob_at_location import ansatz_to_normal
+
+    import numpy as np
+
+    start, stop, distance, rmax, partial = shard
+    a = _workerArrays
+    ipix = lonlat_to_index29(a['RA'][start:stop], a['DEC'][start:stop])
+    rows = match_skymap_pixels(a, ipix, partial=partial)
+    a['ROWS'][start:stop] = rows
+    if distance:
+        # LOCATIONS OUTSIDE A REGION-RESTRICTED MAP (ROW -1) GET NAN DISTANCES
+        inside = rows >= 0
+        mean, std = ansatz_to_normal(distmu=a['DISTMU'][rows[inside]], distsigma=a['DISTSIGMA'][rows[inside]], distnorm=a['DISTNORM'][rows[inside]], rmax=rmax, num=10000)
+        a['OUT_DISTMEAN'][start:stop] = np.nan
+        a['OUT_DISTSTD'][start:stop] = np.nan
+        a['OUT_DISTMEAN'][start:stop][inside] = mean
+        a['OUT_DISTSTD'][start:stop][inside] = std
+    return None
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*A Multi-Order Coverage map (MOC) of the sky, with vectorized membership tests and IVOA serialisations*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+
+class sky_moc(object):
+    """
+    *a Multi-Order Coverage map (MOC) of the sky, with vectorized membership tests and IVOA serialisations*
+
+    **Key Arguments:**
+        - ``log`` -- logger
+        - ``ranges`` -- an (N, 2) array of ``[start, stop)`` ranges of level-29 nested HealPix indices covered by the MOC (in any order, and overlapping or not)
+
+    **Usage:**
+
+    MOCs are usually made with `credible_moc`, or read from a FITS MOC (a survey footprint, say) with `read_moc`:
+
+    ```python
+    from skytag.commonutils import credible_moc
+    mocs = credible_moc(
+        log=log,
+        mapPath="/path/to/bayestar.multiorder.fits",
+        credible=[50., 90.]
+    )
+    moc = mocs[90.]
+    inside = moc.contains(ra=catalogue["ra"], dec=catalogue["dec"])
+    moc.write("/path/to/S230518h.90.moc.fits")
+    ```
+
+    The MOC is held as sorted, disjoint and non-adjacent index ranges, so ``contains`` is a single binary search of the level-29 index of every location. The normalised NUNIQ cells (each cell as coarse as possible), needed to serialise the MOC, are given by ``uniq``.
+    """
+
+    def __init__(
+            self,
+            log,
+            ranges
+    ):
+        self.log = log
+        log.debug("instansiating a new 'sky_moc' object")
+
+        import numpy as np
+
+        ranges = np.asarray(ranges, dtype=np.int64).reshape(-1, 2)
+        ranges = ranges[ranges[:, 1] > ranges[:, 0]]
+        ranges = ranges[np.argsort(ranges[:, 0], kind='stable')]
+        # MERGE OVERLAPPING AND TOUCHING RANGES: A NEW RANGE BEGINS WHERE A START PASSES EVERY EARLIER STOP
+        stops = np.maximum.accumulate(ranges[:, 1])
+        begins = np.concatenate([[True], ranges[1:, 0] > stops[:-1]]) if len(ranges) else np.zeros(0, dtype=bool)
+        ends = np.concatenate([begins[1:], [True]]) if len(ranges) else begins
+        self.ranges = np.stack([ranges[begins, 0], stops[ends]], axis=1)
+
+        return None
+
+    def __len__(
+            self):
+        return len(self.uniq())
+
+    @property
+    def area(
+            self):
+        """*the area of the MOC in square degrees*
+        """
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import MAX_LEVEL
+
+        cells = float(np.sum(self.ranges[:, 1] - self.ranges[:, 0]))
+        return cells * 4. * np.pi / (12 * 4**MAX_LEVEL) * (180. / np.pi)**2
+
+    def contains(
+            self,
+            ra,
+            dec,
+            frame="icrs"):
+        """*test which sky-locations fall within the MOC*
+
+        **Key Arguments:**
+            - ``ra`` -- right ascension in decimal degrees (float or list)
+            - ``dec`` -- declination in decimal degrees (float or list)
+            - ``frame`` -- the frame of ``ra`` and ``dec``: ``icrs``, ``galactic`` or ``ecliptic``. Default *icrs*
+
+        **Return:**
+            - ``inside`` -- numpy boolean array, True for the locations within the MOC
+        """
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import coordinate_arrays, frame_to_icrs, lonlat_to_index29
+
+        ra, dec = coordinate_arrays(ra, dec)
+        ra, dec = frame_to_icrs(ra, dec, frame)
+        ipix = lonlat_to_index29(ra, dec)
+        if not len(self.ranges):
+            return np.zeros(len(ipix), dtype=bool)
+        rows = np.searchsorted(self.ranges[:, 0], ipix, side='right') - 1
+        return (rows >= 0) & (ipix < self.ranges[np.maximum(rows, 0), 1])
+
+    def uniq(
+            self):
+        """*the normalised NUNIQ cells of the MOC (each cell as coarse as possible), sorted*
+
+        **Return:**
+            - ``uniq`` -- numpy int64 array of NUNIQ cell indices (``4 x 4^level + ipix``)
+        """
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import MAX_LEVEL
+
+        # CARVE THE WHOLE CELLS OF EACH LEVEL FROM THE RANGES, COARSEST FIRST, PASSING THE LEFT-OVER ENDS ON TO THE NEXT LEVEL
+        starts, stops = self.ranges[:, 0], self.ranges[:, 1]
+        cells = []
+        for level in range(MAX_LEVEL + 1):
+            if not len(starts):
+                break
+            shift = 2 * (MAX_LEVEL - level)
+            first = (starts + (1 << shift) - 1) >> shift
+            last = stops >> shift
+            whole = first < last
+            counts = np.where(whole, last - first, 0)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            cells.append(4 * 4**level + np.repeat(first, counts) + offsets)
+            starts, stops = (
+                np.concatenate([starts, (last << shift)[whole]]),
+                np.concatenate([np.where(whole, first << shift, stops), stops[whole]])
+            )
+            keep = stops > starts
+            starts, stops = starts[keep], stops[keep]
+
+        if not cells:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate(cells))
+
+    def to_string(
+            self):
+        """*the MOC in the IVOA MOC 2.0 ASCII serialisation (e.g.* ``3/3 10 4/16-18 22`` *)*
+        """
+        orders = self._order_cells()
+        words = []
+        for level, ipix in orders:
+            # RUNS OF CONSECUTIVE CELLS ARE WRITTEN AS first-last
+            breaks = [0] + [i for i in range(1, len(ipix)) if ipix[i] != ipix[i - 1] + 1] + [len(ipix)]
+            runs = ["%s" % (ipix[a],) if b - a == 1 else "%s-%s" % (ipix[a], ipix[b - 1]) for a, b in zip(breaks[:-1], breaks[1:])]
+            words.append("%s/%s" % (level, " ".join(runs)))
+        return " ".join(words)
+
+    def to_json(
+            self):
+        """*the MOC in the IVOA MOC JSON serialisation (e.g.* ``{"3": [3, 10], "4": [16, 17, 18, 22]}`` *)*
+        """
+        import json
+        return json.dumps({str(level): ipix for level, ipix in self._order_cells()})
+
+    def write(
+            self,
+            pathToOutput):
+        """*write the MOC to an IVOA FITS MOC (a binary table of NUNIQ cells)*
+
+        **Key Arguments:**
+            - ``pathToOutput`` -- path of the FITS file to write
+
+        **Return:**
+            - ``pathToOutput`` -- the path of the FITS file written
+        """
+        self.log.debug('starting the ``write`` method')
+
+        import astropy_healpix as ah
+        from astropy.io import fits
+
+        uniq = self.uniq()
+        order = int(ah.uniq_to_level_ipix(uniq)[0].max()) if len(uniq) else 0
+        hdu = fits.BinTableHDU.from_columns([fits.Column(name="UNIQ", format="K", array=uniq)])
+        hdu.header["PIXTYPE"] = "HEALPIX"
+        hdu.header["ORDERING"] = "NUNIQ"
+        hdu.header["COORDSYS"] = "C"
+        hdu.header["MOCVERS"] = "2.0"
+        hdu.header["MOCDIM"] = "SPACE"
+        hdu.header["MOCORDER"] = order
+        hdu.header["MOCORD_S"] = order
+        hdu.header["MOCTOOL"] = "skytag"
+        hdu.writeto(pathToOutput, overwrite=True)
+
+        self.log.debug('completed the ``write`` method')
+        return pathToOutput
+
+    def _order_cells(
+            self):
+        """*the normalised cells grouped by level, as (level, sorted ipix list) pairs*
+        """
+        import numpy as np
+        import astropy_healpix as ah
+
+        levels, ipix = ah.uniq_to_level_ipix(self.uniq())
+        return [(int(l), ipix[levels == l].tolist()) for l in np.unique(levels)]
+
+
+def read_moc(
+        mocPath,
+        log=False):
+    """*read an IVOA FITS MOC (a binary table of NUNIQ cells) into a `sky_moc`*
+
+    **Key Arguments:**
+        - ``mocPath`` -- path to the FITS MOC
+        - ``log`` -- logger
+
+    **Return:**
+        - ``moc`` -- the `sky_moc`
+
+    ```python
+    from skytag.commonutils.sky_moc import read_moc
+    footprint = read_moc(log=log, mocPath="/path/to/survey_footprint.moc.fits")
+    inside = footprint.contains(ra=catalogue["ra"], dec=catalogue["dec"])
+    ```
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``read_moc`` function')
+
+    import numpy as np
+    import astropy_healpix as ah
+    from astropy.io import fits
+    from skytag.commonutils.prepare_skymap import MAX_LEVEL
+
+    with fits.open(mocPath) as hdus:
+        tables = [h for h in hdus if isinstance(h, fits.BinTableHDU) and "UNIQ" in h.columns.names]
+        if not tables:
+            raise AttributeError("`%s` is not a FITS MOC (no binary table with a UNIQ column)" % (mocPath,))
+        uniq = np.asarray(tables[0].data["UNIQ"], dtype=np.int64)
+
+    levels, ipix = ah.uniq_to_level_ipix(uniq)
+    shift = 2 * (MAX_LEVEL - levels.astype(np.int64))
+    starts = ipix.astype(np.int64) << shift
+    moc = sky_moc(log=log, ranges=np.stack([starts, starts + (np.int64(1) << shift)], axis=1))
+
+    log.debug('completed the ``read_moc`` function')
+    return moc
@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*An archive index over many event skymaps, answering which events' credible regions contain a sky-position*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+ARCHIVE_VERSION = 1
+
+
+class skymap_archive(object):
+    """
+    *an archive index over many event skymaps, answering which events' credible regions contain a sky-position*
+
+    **Key Arguments:**
+        - ``log`` -- logger
+        - ``archivePath`` -- the directory holding the archive index (created if missing)
+        - ``coarseLevel`` -- the HealPix level of the coarse cells of the inverted index (only used when a new archive is created). Default *6* (~0.9 degree cells)
+        - ``maxCredible`` -- the largest credible level (%) the archive can be queried at (only used when a new archive is created). Default *99*
+
+    **Usage:**
+
+    Build the archive once over a directory of maps (re-running `build` only re-indexes new and changed maps):
+
+    ```python
+    from skytag.commonutils import skymap_archive
+    archive = skymap_archive(
+        log=log,
+        archivePath="/path/to/archive.skytag"
+    )
+    archive.build(mapPaths="/path/to/o4/skymaps/")
+    ```
+
+    Then ask which events contain each position within their 90% credible region, and at what credible level:
+
+    ```python
+    matches = archive.query(
+        ra=[10.343234, 170.343532],
+        dec=[14.345532, -40.532255],
+        credible=90.
+    )
+    ```
+
+    ``matches`` holds one list per position of ``(event, prob)`` tuples, sorted by credible level. ``prob`` is the credible level (%) the position resides within, exactly as `prob_at_location` would return it.
+
+    The archive is an inverted index from coarse HealPix cell to the events whose ``maxCredible`` region touches the cell, with the lowest and highest credible level of each event within the cell. A query looks up the cells of its positions with a binary search, drops the events whose lowest level in the cell is above ``credible``, and reads the exact credible level from the index when one map pixel covers the whole cell. Only the remaining (position, event) pairs are refined, against compact memory-mapped copies of the candidate maps' credible regions held in the archive. No FITS file is opened at query time.
+    """
+
+    def __init__(
+            self,
+            log,
+            archivePath,
+            coarseLevel=6,
+            maxCredible=99.
+    ):
+        self.log = log
+        log.debug("instansiating a new 'skymap_archive' object")
+
+        import json
+
+        self.archivePath = os.path.abspath(os.path.expanduser(archivePath))
+        self.metaPath = os.path.join(self.archivePath, "archive.json")
+        if os.path.exists(self.metaPath):
+            with open(self.metaPath) as f:
+                self.meta = json.load(f)
+            if self.meta.get("version") != ARCHIVE_VERSION:
+                raise AttributeError("The archive at `%s` was written by an incompatible version of skytag; rebuild it" % (self.archivePath,))
+        else:
+            if not 0 <= int(coarseLevel) <= 12:
+                raise AttributeError("The archive coarse level must be between 0 and 12")
+            if not 0. < float(maxCredible) <= 100.:
+                raise AttributeError("The archive maxCredible must be a percentage above 0 and at most 100")
+            self.meta = {"version": ARCHIVE_VERSION, "coarseLevel": int(coarseLevel), "maxCredible": float(maxCredible), "events": []}
+
+        self.index = None
+        self.eventArrays = {}
+
+        return None
+
+    def __len__(
+            self):
+        return len(self.meta["events"])
+
+    @property
+    def events(
+            self):
+        """*the names of the archived events*
+        """
+        return [e["name"] for e in self.meta["events"]]
+
+    def build(
+            self,
+            mapPaths,
+            names=None):
+        """*index a directory (or list) of skymaps into the archive*
+
+        **Key Arguments:**
+            - ``mapPaths`` -- a directory of maps (every ``*.fits`` and ``*.fits.gz`` file is indexed) or a list of map paths
+            - ``names`` -- the event names, one per map path. Default *None* (the map file names, minus their extensions)
+
+        **Return:**
+            - ``indexed`` -- the number of maps (re-)indexed
+
+        Maps already in the archive and unchanged on disk (same size and modification time) are not re-read.
+        """
+        self.log.debug('starting the ``build`` method')
+
+        import glob
+        import json
+        import shutil
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import prepare_skymap
+
+        if isinstance(mapPaths, (str, os.PathLike)):
+            if not os.path.isdir(mapPaths):
+                raise AttributeError("`%s` is not a directory of skymaps" % (mapPaths,))
+            mapPaths = sorted(glob.glob(os.path.join(mapPaths, "*.fits")) + glob.glob(os.path.join(mapPaths, "*.fits.gz")))
+        mapPaths = [os.path.realpath(p) for p in mapPaths]
+        if names is None:
+            names = [os.path.basename(p).split(".")[0] for p in mapPaths]
+        elif len(names) != len(mapPaths):
+            raise AttributeError("Give one event name per map path")
+
+        eventsPath = os.path.join(self.archivePath, "events")
+        if not os.path.exists(eventsPath):
+            os.makedirs(eventsPath)
+        known = {e["path"]: e for e in self.meta["events"]}
+        nextId = max([e["id"] for e in self.meta["events"]] + [-1]) + 1
+
+        indexed = 0
+        for mapPath, name in zip(mapPaths, names):
+            stat = os.stat(mapPath)
+            event = known.get(mapPath)
+            if event and event["size"] == stat.st_size and event["mtime_ns"] == stat.st_mtime_ns:
+                event["name"] = name
+                continue
+            if event is None:
+                event = {"id": nextId, "path": mapPath}
+                nextId += 1
+                self.meta["events"].append(event)
+                known[mapPath] = event
+
+            skymap = prepare_skymap(mapPath=mapPath, log=self.log)
+            event.update({"name": name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "mjdObs": skymap['meta'].get("MJD-OBS")})
+            eventPath = os.path.join(eventsPath, str(event["id"]))
+            if os.path.exists(eventPath):
+                shutil.rmtree(eventPath)
+            os.makedirs(eventPath)
+            for k, v in _event_arrays(skymap, coarseLevel=self.meta["coarseLevel"], maxCredible=self.meta["maxCredible"]).items():
+                np.save(os.path.join(eventPath, k + ".npy"), v)
+            indexed += 1
+            self.log.info('indexed `%(mapPath)s` into the skymap archive' % locals())
+
+        # MERGE THE PER-EVENT CELL LISTS INTO ONE INVERTED INDEX SORTED BY CELL
+        cells, events, minProbs, maxProbs = [], [], [], []
+        for event in self.meta["events"]:
+            eventPath = os.path.join(eventsPath, str(event["id"]))
+            cells.append(np.load(os.path.join(eventPath, "CELL.npy")))
+            events.append(np.full(len(cells[-1]), event["id"], dtype=np.int32))
+            minProbs.append(np.load(os.path.join(eventPath, "MINPROB.npy")))
+            maxProbs.append(np.load(os.path.join(eventPath, "MAXPROB.npy")))
+        cells = np.concatenate(cells + [np.array([], dtype=np.int64)])
+        order = np.argsort(cells, kind='stable')
+        index = {
+            "CELL": cells[order],
+            "EVENT": np.concatenate(events + [np.array([], dtype=np.int32)])[order],
+            "MINPROB": np.concatenate(minProbs + [np.array([])])[order],
+            "MAXPROB": np.concatenate(maxProbs + [np.array([])])[order]
+        }
+        for k, v in index.items():
+            np.save(os.path.join(self.archivePath, k + ".npy"), v)
+        with open(self.metaPath, "w") as f:
+            json.dump(self.meta, f)
+        self.index = None
+        self.eventArrays = {}
+
+        self.log.debug('completed the ``build`` method')
+        return indexed
+
+    def query(
+            self,
+            ra,
+            dec,
+            credible=90.):
+        """*find the archived events whose credible region contains each sky-position, and the credible level the position resides within*
+
+        **Key Arguments:**
+            - ``ra`` -- right ascension in decimal degrees (float or list)
+            - ``dec`` -- declination in decimal degrees (float or list)
+            - ``credible`` -- the credible region (%) to search. Default *90*
+
+        **Return:**
+            - ``matches`` -- one list per position of ``(event, prob)`` tuples for every event with the position inside its ``credible`` region, sorted by the credible level ``prob`` (%)
+        """
+        self.log.debug('starting the ``query`` method')
+
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import coordinate_arrays, lonlat_to_index29, match_skymap_pixels, take_rows, MAX_LEVEL
+
+        if not 0. < float(credible) <= self.meta["maxCredible"]:
+            raise AttributeError("This archive can only be queried at credible levels above 0 and up to %s%%" % (self.meta["maxCredible"],))
+        ra, dec = coordinate_arrays(ra, dec)
+        index = self._index()
+
+        # CANDIDATE (POSITION, EVENT) PAIRS FROM THE COARSE CELLS OF THE POSITIONS
+        ipix = np.asarray(lonlat_to_index29(ra, dec), dtype=np.int64)
+        cells = ipix >> (2 * (MAX_LEVEL - self.meta["coarseLevel"]))
+        first = np.searchsorted(index["CELL"], cells, side='left')
+        counts = np.searchsorted(index["CELL"], cells, side='right') - first
+        positions = np.repeat(np.arange(len(ra)), counts)
+        entries = np.repeat(first, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        # CREDIBLE LEVELS ARE COMPARED AFTER ROUNDING TO 0.01%, SO KEEP CANDIDATES JUST ABOVE THE LEVEL
+        level = (credible + 0.01) / 100.
+        minProb = index["MINPROB"][entries]
+        keep = minProb <= level
+        positions, entries, minProb = positions[keep], entries[keep], minProb[keep]
+        events = index["EVENT"][entries]
+
+        # ONE MAP PIXEL COVERING THE WHOLE CELL GIVES THE EXACT LEVEL; REFINE THE REST AGAINST THE CANDIDATE MAPS ONLY
+        cumprob = np.where(index["MAXPROB"][entries] == minProb, minProb, np.nan)
+        refine = np.isnan(cumprob)
+        for event in np.unique(events[refine]):
+            pairs = np.flatnonzero(refine & (events == event))
+            arrays = self._event_arrays(int(event))
+            rows = match_skymap_pixels(arrays, ipix[positions[pairs]], partial=True)
+            cumprob[pairs] = take_rows(arrays["CUMPROB"], rows)
+
+        # ROUNDED AS BY `prob_at_location`
+        probs = np.around(cumprob * 100., 2)
+        inside = probs <= credible
+        names = {e["id"]: e["name"] for e in self.meta["events"]}
+        matches = [[] for r in ra]
+        order = np.lexsort((probs, positions))
+        for i in order[inside[order]]:
+            matches[positions[i]].append((names[int(events[i])], float(probs[i])))
+
+        self.log.debug('completed the ``query`` method')
+        return matches
+
+    def _index(
+            self):
+        """*the memory-mapped inverted index*
+        """
+        import numpy as np
+
+        if self.index is None:
+            if not os.path.exists(os.path.join(self.archivePath, "CELL.npy")):
+                raise AttributeError("The archive at `%s` has not been built yet" % (self.archivePath,))
+            self.index = {k: np.load(os.path.join(self.archivePath, k + ".npy"), mmap_mode='r') for k in ["CELL", "EVENT", "MINPROB", "MAXPROB"]}
+        return self.index
+
+    def _event_arrays(
+            self,
+            event):
+        """*the memory-mapped credible-region pixels of one archived event*
+        """
+        import numpy as np
+
+        if event not in self.eventArrays:
+            eventPath = os.path.join(self.archivePath, "events", str(event))
+            self.eventArrays[event] = {k: np.load(os.path.join(eventPath, k + ".npy"), mmap_mode='r') for k in ["INDEX29", "LEVEL", "CUMPROB"]}
+        return self.eventArrays[event]
+
+
+def _event_arrays(
+        skymap,
+        coarseLevel,
+        maxCredible):
+    """*the coarse-cell entries and credible-region pixels of one prepared skymap*
+
+    **Key Arguments:**
+        - ``skymap`` -- the prepared (whole) skymap
+        - ``coarseLevel`` -- the HealPix level of the coarse cells
+        - ``maxCredible`` -- the largest credible level (%) indexed
+
+    **Return:**
+        - ``arrays`` -- dictionary of ``CELL``, ``MINPROB`` and ``MAXPROB`` (one entry per coarse cell touching the ``maxCredible`` region, with the lowest and highest ``CUMPROB`` of the map pixels overlapping the cell) and the ``INDEX29``, ``LEVEL`` and ``CUMPROB`` of the map pixels within the ``maxCredible`` region
+    """
+    import numpy as np
+    from skytag.commonutils.prepare_skymap import MAX_LEVEL
+
+    level = np.asarray(skymap['LEVEL'], dtype=np.int64)
+    index29 = np.asarray(skymap['INDEX29'], dtype=np.int64)
+    cumprob = np.asarray(skymap['CUMPROB'], dtype=np.float64)
+    # PIXELS WITHIN 0.01% OF THE LIMIT ROUND TO IT
+    limit = (maxCredible + 0.01) / 100.
+
+    # EVERY COARSE CELL OVERLAPPED BY EACH MAP PIXEL (PIXELS COARSER THAN THE CELLS SPAN SEVERAL). THE MAP IS
+    # ORDERED BY INDEX29, SO THE CELLS COME OUT SORTED
+    cellCounts = np.left_shift(1, 2 * np.maximum(coarseLevel - level, 0))
+    offsets = np.arange(cellCounts.sum()) - np.repeat(np.cumsum(cellCounts) - cellCounts, cellCounts)
+    cells = np.repeat(index29 >> (2 * (MAX_LEVEL - coarseLevel)), cellCounts) + offsets
+    cellProbs = np.repeat(cumprob, cellCounts)
+
+    starts = np.flatnonzero(np.concatenate([[True], cells[1:] != cells[:-1]]))
+    minProb = np.minimum.reduceat(cellProbs, starts)
+    maxProb = np.maximum.reduceat(cellProbs, starts)
+    touched = minProb <= limit
+
+    inside = cumprob <= limit
+    return {
+        "CELL": cells[starts][touched],
+        "MINPROB": minProb[touched],
+        "MAXPROB": maxProb[touched],
+        "INDEX29": index29[inside],
+        "LEVEL": np.asarray(skymap['LEVEL'])[inside].astype(np.int8),
+        "CUMPROB": cumprob[inside]
+    }
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*A consolidated HDF5 store of many prepared skymaps, read back lazily chunk by chunk*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+STORE_VERSION = 1
+# ROWS PER HDF5 CHUNK (THE UNIT OF COMPRESSION AND OF LAZY READS)
+STORE_CHUNK_ROWS = 32768
+# THE ARRAYS READ IN FULL WHEN A MAP IS OPENED (NEEDED TO MATCH LOCATIONS TO PIXELS)
+MATCH_ARRAYS = ['INDEX29', 'LEVEL']
+
+
+class skymap_store(object):
+    """
+    *a consolidated HDF5 store of many prepared skymaps, read back lazily chunk by chunk*
+
+    **Key Arguments:**
+        - ``log`` -- logger
+        - ``storePath`` -- path to the HDF5 store file (created by `pack` if missing)
+
+    **Usage:**
+
+    Pack a directory (or list) of maps into the store once (re-running `pack` only re-packs new and changed maps). This needs the optional ``h5py`` package:
+
+    ```python
+    from skytag.commonutils import skymap_store
+    store = skymap_store(
+        log=log,
+        storePath="/path/to/o4.skymaps.h5"
+    )
+    store.pack(mapPaths="/path/to/o4/skymaps/")
+    ```
+
+    Then open any stored event as a prepared skymap and query it as you would a map prepared from its FITS file:
+
+    ```python
+    from skytag.commonutils import prob_at_location
+    for event in store.events:
+        prob, deltas = prob_at_location(
+            log=log,
+            ra=catalogue["ra"],
+            dec=catalogue["dec"],
+            mjd=catalogue["mjd"],
+            mapPath=False,
+            skymap=store.skymap(event)
+        )
+    ```
+
+    A stored map can be written back out as a multi-order FITS file:
+
+    ```python
+    store.export(event, "/path/to/S230518h.multiorder.fits")
+    ```
+
+    Each event is a group of the store holding every array of its prepared skymap (``UNIQ``, ``LEVEL``, ``INDEX29``, ``PROBDENSITY``, ``PROB``, ``CUMPROB`` and the distance layers), ordered by ``INDEX29`` and written in compressed chunks of ``STORE_CHUNK_ROWS`` rows, with the map header (``MJD-OBS`` etc.) kept as a group attribute. The credible levels are ranked once, at packing time, so opening a stored map involves no FITS parsing and no preparation.
+
+    Opening a map reads only ``INDEX29`` and ``LEVEL``, the arrays needed to match locations to pixels. Every other array is read lazily: a lookup reads (and keeps) just the chunks holding its matched rows, so annotating a small catalogue against a large archive touches a small fraction of the store. The store is kept open until `close` is called.
+
+    Re-packing a changed map replaces its group, but HDF5 does not reclaim the space of the old one; run ``h5repack`` on the store to compact it.
+    """
+
+    def __init__(
+            self,
+            log,
+            storePath
+    ):
+        self.log = log
+        log.debug("instansiating a new 'skymap_store' object")
+
+        self.storePath = os.path.abspath(os.path.expanduser(storePath))
+        self.handle = None
+
+        return None
+
+    def __len__(
+            self):
+        return len(self.events)
+
+    @property
+    def events(
+            self):
+        """*the names of the stored events*
+        """
+        if not os.path.exists(self.storePath):
+            return []
+        return sorted(self._open()["events"].keys())
+
+    def pack(
+            self,
+            mapPaths,
+            names=None):
+        """*prepare a directory (or list) of skymaps and pack them into the store*
+
+        **Key Arguments:**
+            - ``mapPaths`` -- a directory of maps (every ``*.fits`` and ``*.fits.gz`` file is packed) or a list of map paths
+            - ``names`` -- the event names, one per map path. Default *None* (the map file names, minus their extensions)
+
+        **Return:**
+            - ``packed`` -- the number of maps (re-)packed
+
+        Maps already in the store and unchanged on disk (same size and modification time) are not re-read.
+        """
+        self.log.debug('starting the ``pack`` method')
+
+        import glob
+        import json
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import prepare_skymap
+        h5py = _import_h5py()
+
+        if isinstance(mapPaths, (str, os.PathLike)):
+            if not os.path.isdir(mapPaths):
+                raise AttributeError("`%s` is not a directory of skymaps" % (mapPaths,))
+            mapPaths = sorted(glob.glob(os.path.join(mapPaths, "*.fits")) + glob.glob(os.path.join(mapPaths, "*.fits.gz")))
+        mapPaths = [os.path.realpath(p) for p in mapPaths]
+        if names is None:
+            names = [os.path.basename(p).split(".")[0] for p in mapPaths]
+        elif len(names) != len(mapPaths):
+            raise AttributeError("Give one event name per map path")
+        if len(set(names)) != len(names):
+            raise AttributeError("The event names must be unique")
+
+        self.close()
+        storeDir = os.path.dirname(self.storePath)
+        if not os.path.exists(storeDir):
+            os.makedirs(storeDir)
+
+        packed = 0
+        with h5py.File(self.storePath, "a") as f:
+            _check_version(f, self.storePath)
+            f.attrs["version"] = STORE_VERSION
+            events = f.require_group("events")
+            for name, mapPath in zip(names, mapPaths):
+                stat = os.stat(mapPath)
+                if name in events:
+                    attrs = events[name].attrs
+                    if attrs["path"] == mapPath and attrs["size"] == stat.st_size and attrs["mtime_ns"] == stat.st_mtime_ns:
+                        continue
+                    del events[name]
+                self.log.info('packing `%(mapPath)s` into the skymap store as `%(name)s`' % locals())
+                skymap = prepare_skymap(mapPath=mapPath, log=self.log)
+                group = events.create_group(name)
+                for k, v in skymap.items():
+                    if isinstance(v, np.ndarray):
+                        group.create_dataset(k, data=np.ascontiguousarray(v), chunks=(min(STORE_CHUNK_ROWS, max(len(v), 1)),), compression="gzip", shuffle=True)
+                header = {}
+                for k, v in skymap['meta'].items():
+                    try:
+                        json.dumps(v)
+                        header[k] = v
+                    except TypeError:
+                        header[k] = str(v)
+                group.attrs["header"] = json.dumps(header)
+                group.attrs["path"] = mapPath
+                group.attrs["size"] = stat.st_size
+                group.attrs["mtime_ns"] = stat.st_mtime_ns
+                packed += 1
+
+        self.log.debug('completed the ``pack`` method')
+        return packed
+
+    def skymap(
+            self,
+            name):
+        """*open a stored event as a prepared skymap (see `prepare_skymap`), with lazily read arrays*
+
+        **Key Arguments:**
+            - ``name`` -- the event name
+
+        **Return:**
+            - ``skymap`` -- the prepared skymap. ``INDEX29`` and ``LEVEL`` are numpy arrays; the other arrays read their chunks from the store on first access
+        """
+        self.log.debug('starting the ``skymap`` method')
+
+        import json
+        import numpy as np
+
+        events = self._open()["events"]
+        if name not in events:
+            raise AttributeError("There is no event `%s` in the skymap store" % (name,))
+        group = events[name]
+
+        skymap = {}
+        for k, dataset in group.items():
+            if k in MATCH_ARRAYS:
+                skymap[k] = dataset[()]
+            else:
+                skymap[k] = _store_column(dataset)
+        skymap['meta'] = json.loads(group.attrs["header"])
+        skymap['region'] = False
+
+        self.log.debug('completed the ``skymap`` method')
+        return skymap
+
+    def export(
+            self,
+            name,
+            pathToOutput):
+        """*write a stored event back out as a multi-order FITS skymap*
+
+        **Key Arguments:**
+            - ``name`` -- the event name
+            - ``pathToOutput`` -- path of the FITS file to write
+
+        **Return:**
+            - ``pathToOutput`` -- the path of the FITS file written
+        """
+        self.log.debug('starting the ``export`` method')
+
+        import numpy as np
+        from skytag.commonutils.prepare_skymap import DISTANCE_COLUMNS
+        from skytag.commonutils.synthetic_skymap import _write_table
+
+        skymap = self.skymap(name)
+        columns = {'UNIQ': np.asarray(skymap['UNIQ'], dtype=np.int64), 'PROBDENSITY': np.asarray(skymap['PROBDENSITY'], dtype=np.float64)}
+        units = {'PROBDENSITY': 'sr-1', 'DISTMU': 'Mpc', 'DISTSIGMA': 'Mpc', 'DISTNORM': 'Mpc-2'}
+        for c in DISTANCE_COLUMNS:
+            if c in skymap:
+                columns[c] = np.asarray(skymap[c], dtype=np.float64)
+        meta = {k: v for k, v in skymap['meta'].items() if isinstance(v, (str, int, float, bool)) and k not in ("HISTORY", "COMMENT")}
+        _write_table(pathToOutput=pathToOutput, columns=columns, units=units, meta=meta)
+
+        self.log.debug('completed the ``export`` method')
+        return pathToOutput
+
+    def close(
+            self):
+        """*close the store file (it is re-opened on the next read)*
+        """
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        return None
+
+    def _open(
+            self):
+        """*the store file, opened read-only on first use*
+        """
+        if self.handle is None:
+            h5py = _import_h5py()
+            if not os.path.exists(self.storePath):
+                raise AttributeError("There is no skymap store at `%s`; pack some maps into it first" % (self.storePath,))
+            self.handle = h5py.File(self.storePath, "r")
+            _check_version(self.handle, self.storePath)
+        return self.handle
+
+
+class _store_column(object):
+    """*a stored skymap array that reads (and keeps) only the chunks holding the rows asked for*
+    """
+
+    def __init__(
+            self,
+            dataset):
+        self.dataset = dataset
+        self.shape = dataset.shape
+        self.dtype = dataset.dtype
+        self.chunkRows = dataset.chunks[0] if dataset.chunks else max(len(dataset), 1)
+        self.chunks = {}
+
+    def __len__(
+            self):
+        return self.shape[0]
+
+    def __array__(
+            self,
+            dtype=None,
+            copy=None):
+        import numpy as np
+        values = self[np.arange(len(self))]
+        return values if dtype is None else values.astype(dtype)
+
+    def __getitem__(
+            self,
+            rows):
+        import numpy as np
+
+        if isinstance(rows, slice):
+            rows = np.arange(len(self))[rows]
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        # NEGATIVE ROWS COUNT FROM THE END, AS FOR NUMPY ARRAYS
+        rows = np.where(rows < 0, rows + len(self), rows).astype(np.int64)
+        if rows.size and (rows.min() < 0 or rows.max() >= len(self)):
+            raise IndexError("row index out of range for a stored skymap array of %s rows" % (len(self),))
+
+        # GROUP THE ROWS BY CHUNK SO EACH CHUNK IS READ (AT MOST) ONCE
+        values = np.empty(rows.shape, dtype=self.dtype)
+        flatValues = values.reshape(-1)
+        flatRows = rows.reshape(-1)
+        chunkIds = flatRows // self.chunkRows
+        order = np.argsort(chunkIds, kind='stable')
+        sortedIds = chunkIds[order]
+        bounds = np.flatnonzero(np.concatenate([[True], sortedIds[1:] != sortedIds[:-1], [True]])) if rows.size else [0]
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            c = int(sortedIds[first])
+            if c not in self.chunks:
+                self.chunks[c] = self.dataset[c * self.chunkRows:(c + 1) * self.chunkRows]
+            picks = order[first:last]
+            flatValues[picks] = self.chunks[c][flatRows[picks] - c * self.chunkRows]
+        if values.ndim == 0:
+            return values[()]
+        return values
+
+
+def _import_h5py():
+    """*import the optional h5py package the skymap store is written with*
+    """
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("The skymap store needs the optional h5py package (`pip install h5py`)")
+    return h5py
+
+
+def _check_version(
+        f,
+        storePath):
+    """*refuse a store written by an incompatible version of skytag*
+    """
+    version = f.attrs.get("version")
+    if version is not None and version != STORE_VERSION:
+        raise AttributeError("The skymap store at `%s` was written by an incompatible version of skytag; re-pack it" % (storePath,))
+    return None
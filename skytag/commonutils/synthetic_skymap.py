@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+*Generate synthetic multi-order skymaps and source catalogues for scale and stress testing*
+
+:Author:
+    David Young
+
+:Date Created:
+    October 19, 2026
+"""
+from fundamentals import tools
+from builtins import object
+import sys
+import os
+os.environ['TERM'] = 'vt100'
+
+
+def synthetic_skymap(
+        pathToOutput,
+        log=False,
+        pixels=20000,
+        maxLevel=10,
+        levels=None,
+        blobs=3,
+        distance=True,
+        mjdObs=60000.,
+        seed=None):
+    """*Write a valid multi-order HealPix skymap, with a configurable pixel count, level distribution and number of probability blobs*
+
+    **Key Arguments:**
+        - ``pathToOutput`` -- path to write the FITS skymap to (overwritten if it exists)
+        - ``log`` -- logger
+        - ``pixels`` -- the number of map pixels. Default *20000*
+        - ``maxLevel`` -- the finest HealPix level (order) of the map. Default *10*
+        - ``levels`` -- the fraction of the map pixels at each level, e.g. ``{5: 0.1, 8: 0.5, 11: 0.4}`` (overrides ``maxLevel``; see below). Default *None*
+        - ``blobs`` -- the number of probability blobs on the sky. Default *3*
+        - ``distance`` -- add the ``DISTMU``, ``DISTSIGMA`` and ``DISTNORM`` distance layers and the ``DISTMEAN`` and ``DISTSTD`` headers. Default *True*
+        - ``mjdObs`` -- the ``MJD-OBS`` of the synthetic event. Default *60000*
+        - ``seed`` -- seed of the random number generator (for reproducible maps). Default *None*
+
+    **Return:**
+        - ``pathToOutput`` -- the path to the skymap written
+
+    ```python
+    from skytag.commonutils import synthetic_skymap
+    mapPath = synthetic_skymap(
+        log=log,
+        pathToOutput="/tmp/synthetic.multiorder.fits",
+        pixels=10000000,
+        maxLevel=14,
+        blobs=5,
+        seed=1
+    )
+    ```
+
+    The map is built like the LIGO/Virgo/KAGRA adaptive maps: the sky starts at a coarse level and, level by level, the most probable pixels are split into their 4 children. By default the same number of pixels is split at every level from the coarsest level needed up to ``maxLevel``, so (as in real maps) each level holds a similar number of pixels, and the total is ``pixels`` to within a few pixels. With ``levels``, the fraction of pixels at each level is set explicitly instead. The coarsest level given covers the rest of the sky, so its pixel count is implied by the finer levels, and levels missing from ``levels`` hold no more than a few pixels.
+
+    The probability density is a mixture of ``blobs`` Fisher (spherical Gaussian) distributions with random centres, widths of 2-15 degrees and random weights. Each blob lies at its own random distance (40-400 Mpc), and the distance layers of each pixel blend the blobs contributing to it.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``synthetic_skymap`` function')
+
+    import numpy as np
+    import astropy_healpix as ah
+    from astropy import units as u
+    from scipy.stats import norm
+
+    rng = np.random.default_rng(seed)
+    counts = _level_counts(pixels=pixels, maxLevel=maxLevel, levels=levels)
+    if int(blobs) < 1:
+        raise AttributeError("A synthetic skymap needs at least one probability blob")
+
+    # THE BLOB MIXTURE: CENTRES UNIFORM ON THE SKY, FISHER CONCENTRATIONS FROM THEIR WIDTHS
+    blobs = int(blobs)
+    blobRa = rng.uniform(0., 2. * np.pi, blobs)
+    blobDec = np.arcsin(rng.uniform(-1., 1., blobs))
+    blobCentres = np.stack([np.cos(blobDec) * np.cos(blobRa), np.cos(blobDec) * np.sin(blobRa), np.sin(blobDec)], axis=-1)
+    kappa = 1. / np.radians(rng.uniform(2., 15., blobs))**2
+    weights = rng.dirichlet(np.ones(blobs))
+    blobDistances = rng.uniform(40., 400., blobs)
+
+    def log_blob_densities(level, ipix):
+        # LOG OF EACH BLOB'S WEIGHTED DENSITY (PER SR) AT THE PIXEL CENTRES
+        lon, lat = ah.healpix_to_lonlat(ipix, ah.level_to_nside(level), order='nested')
+        lon, lat = lon.to_value(u.rad), lat.to_value(u.rad)
+        xyz = np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+        return np.log(weights * kappa / (2. * np.pi * (1. - np.exp(-2. * kappa)))) + kappa * (xyz @ blobCentres.T - 1.)
+
+    # REFINE THE MOST PROBABLE PIXELS LEVEL BY LEVEL, KEEPING ONLY THE TOTAL DENSITY AND BLENDED DISTANCE OF EACH PIXEL
+    uniq, logDensity, distmu = [], [], []
+    levelList = sorted(counts)
+    ipix = np.arange(12 * 4**levelList[0], dtype=np.int64)
+    for level in range(levelList[0], levelList[-1] + 1):
+        blobDensity = log_blob_densities(level, ipix)
+        total = np.logaddexp.reduce(blobDensity, axis=1)
+        stay = np.ones(len(ipix), dtype=bool)
+        keep = counts.get(level, 0)
+        if level < levelList[-1] and keep < len(ipix):
+            # PIXEL PROBABILITY IS DENSITY x AREA, AND EVERY PIXEL OF A LEVEL HAS THE SAME AREA
+            split = np.argpartition(total, keep)[keep:]
+            stay[split] = False
+        uniq.append(ipix[stay] + 4 * 4**level)
+        logDensity.append(total[stay])
+        if distance:
+            # BLEND THE BLOB DISTANCES BY EACH BLOB'S SHARE OF THE PIXEL DENSITY
+            distmu.append(np.exp(blobDensity[stay] - total[stay, None]) @ blobDistances)
+        del blobDensity
+        if stay.all():
+            break
+        ipix = (4 * ipix[~stay][:, None] + np.arange(4)).ravel()
+
+    uniq = np.concatenate(uniq)
+    order = np.argsort(uniq)
+    uniq = uniq[order]
+    logDensity = np.concatenate(logDensity)[order]
+
+    # NORMALISE SO THE PIXEL PROBABILITIES SUM TO EXACTLY 1
+    level, _ = ah.uniq_to_level_ipix(uniq)
+    probdensity = np.exp(logDensity - logDensity.max())
+    del logDensity
+    probdensity /= (probdensity * ah.nside_to_pixel_area(ah.level_to_nside(level)).to_value(u.sr)).sum()
+    minLevel, maxLevel = int(level.min()), int(level.max())
+    del level
+
+    columns = {'UNIQ': uniq, 'PROBDENSITY': probdensity}
+    units = {'PROBDENSITY': 'sr-1'}
+    meta = {
+        "PIXTYPE": "HEALPIX",
+        "ORDERING": "NUNIQ",
+        "COORDSYS": "C",
+        "MOCORDER": maxLevel,
+        "INDXSCHM": "EXPLICIT",
+        "OBJECT": "SYNTHETIC",
+        "MJD-OBS": float(mjdObs),
+        "CREATOR": "skytag"
+    }
+
+    if distance:
+        distmu = np.concatenate(distmu)[order]
+        distsigma = 0.25 * distmu
+        # DISTNORM NORMALISES THE r^2-WEIGHTED GAUSSIAN ANSATZ OVER r > 0 (z = DISTMU / DISTSIGMA IS THE SAME FOR EVERY PIXEL)
+        z = 4.
+        columns['DISTMU'] = distmu
+        columns['DISTSIGMA'] = distsigma
+        columns['DISTNORM'] = 1. / ((distmu**2 + distsigma**2) * norm.cdf(z) + distmu * distsigma * norm.pdf(z))
+        units.update({'DISTMU': 'Mpc', 'DISTSIGMA': 'Mpc', 'DISTNORM': 'Mpc-2'})
+        meanDistance = (weights * blobDistances).sum()
+        meta["DISTMEAN"] = float(meanDistance)
+        meta["DISTSTD"] = float(np.sqrt((weights * blobDistances**2 * (1. + 0.25**2)).sum() - meanDistance**2))
+
+    _write_table(pathToOutput, columns=columns, units=units, meta=meta)
+    log.info('wrote a synthetic skymap of %s pixels (levels %s-%s) to `%s`' % (len(uniq), minLevel, maxLevel, pathToOutput))
+
+    log.debug('completed the ``synthetic_skymap`` function')
+    return pathToOutput
+
+
+def synthetic_catalogue(
+        count,
+        mapPath=False,
+        log=False,
+        fromMap=0.5,
+        seed=None,
+        skymap=False):
+    """*Generate a random catalogue of sky-locations, part drawn from a skymap's probability distribution and part uniform over the sky*
+
+    **Key Arguments:**
+        - ``count`` -- the number of sky-locations
+        - ``mapPath`` -- path the the multi-order HealPix map to draw sources from. Default *False* (every source is uniform over the sky)
+        - ``log`` -- logger
+        - ``fromMap`` -- the fraction of the sources drawn from the map's probability distribution. Default *0.5*
+        - ``seed`` -- seed of the random number generator (for reproducible catalogues). Default *None*
+        - ``skymap`` -- an already prepared skymap (see `prepare_skymap`), used in place of ``mapPath``. Default *False*
+
+    **Return:**
+        - ``ra`` -- numpy array of right ascensions (decimal degrees)
+        - ``dec`` -- numpy array of declinations (decimal degrees)
+
+    ```python
+    from skytag.commonutils import synthetic_catalogue
+    ra, dec = synthetic_catalogue(
+        log=log,
+        count=10000000,
+        mapPath="/tmp/synthetic.multiorder.fits",
+        fromMap=0.1,
+        seed=1
+    )
+    ```
+
+    Sources drawn from the map pick a pixel in proportion to its probability and then a random position within it, so a fraction ``p`` of them lie within the map's ``p`` credible region. The map and uniform sources are shuffled together.
+    """
+    if not log:
+        from fundamentals.logs import emptyLogger
+        log = emptyLogger()
+
+    log.debug('starting the ``synthetic_catalogue`` function')
+
+    import numpy as np
+    import astropy_healpix as ah
+    from astropy import units as u
+    from skytag.commonutils.prepare_skymap import prepare_skymap, MAX_LEVEL
+
+    count = int(count)
+    if count < 0:
+        raise AttributeError("The catalogue size cannot be negative")
+    if not 0. <= fromMap <= 1.:
+        raise AttributeError("The fraction of sources drawn from the map must be between 0 and 1")
+    rng = np.random.default_rng(seed)
+
+    mapCount = 0
+    if fromMap and (mapPath is not False or skymap is not False):
+        mapCount = int(round(count * fromMap))
+    elif fromMap:
+        log.warning('no skymap given; every source of the synthetic catalogue is uniform over the sky')
+
+    # UNIFORM OVER THE SKY
+    ra = rng.uniform(0., 360., count)
+    dec = np.degrees(np.arcsin(rng.uniform(-1., 1., count)))
+
+    if mapCount:
+        if skymap is False:
+            skymap = prepare_skymap(mapPath=mapPath, log=log)
+        prob = np.asarray(skymap['PROB'], dtype=np.float64)
+        rows = rng.choice(len(prob), size=mapCount, p=prob / prob.sum())
+        # A RANDOM LEVEL-29 SUB-PIXEL OF EACH CHOSEN PIXEL
+        span = np.left_shift(np.int64(1), 2 * (MAX_LEVEL - skymap['LEVEL'][rows].astype(np.int64)))
+        ipix = skymap['INDEX29'][rows] + (rng.random(mapCount) * span).astype(np.int64)
+        lon, lat = ah.healpix_to_lonlat(ipix, ah.level_to_nside(MAX_LEVEL), order='nested')
+        ra[:mapCount], dec[:mapCount] = lon.to_value(u.deg), lat.to_value(u.deg)
+        shuffle = rng.permutation(count)
+        ra, dec = ra[shuffle], dec[shuffle]
+
+    log.debug('completed the ``synthetic_catalogue`` function')
+    return ra, dec
+
+
+def _write_table(
+        pathToOutput,
+        columns,
+        units,
+        meta):
+    """*write numpy columns to a FITS binary table in chunks, so the table is never copied whole*
+    """
+    import numpy as np
+    from astropy.io import fits
+
+    count = len(next(iter(columns.values())))
+    formats = {np.dtype(np.int64): 'K', np.dtype(np.float64): 'D'}
+    hdu = fits.BinTableHDU.from_columns([fits.Column(name=n, format=formats[c.dtype], unit=units.get(n), array=c[:0]) for n, c in columns.items()])
+    hdu.header['NAXIS2'] = count
+    for k, v in meta.items():
+        hdu.header[k] = v
+    rowType = np.dtype([(n, c.dtype.newbyteorder('>')) for n, c in columns.items()])
+
+    with open(pathToOutput, "wb") as f:
+        f.write(fits.PrimaryHDU().header.tostring().encode("ascii"))
+        f.write(hdu.header.tostring().encode("ascii"))
+        step = 1000000
+        for start in range(0, count, step):
+            rows = np.empty(min(step, count - start), dtype=rowType)
+            for n, c in columns.items():
+                rows[n] = c[start:start + step]
+            f.write(rows.tobytes())
+        f.write(b"\0" * (-(count * rowType.itemsize) % 2880))
+    return None
+
+
+def _level_counts(
+        pixels,
+        maxLevel,
+        levels):
+    """*the number of map pixels to leave at each level, from a total and finest level or from explicit level fractions*
+    """
+    import numpy as np
+
+    if levels:
+        levelList = sorted(int(l) for l in levels)
+        if levelList[0] < 0 or levelList[-1] > 29:
+            raise AttributeError("Skymap levels must be between 0 and 29")
+        counts = {l: int(round(float(levels[l]) * pixels)) for l in levels}
+        # WORK UP FROM THE FINEST LEVEL: THE PIXELS AT EACH LEVEL ARE THE CHILDREN OF THE PIXELS SPLIT AT THE LEVEL ABOVE
+        split = 0
+        for level in range(levelList[-1], levelList[0], -1):
+            parents = -(-(counts.get(level, 0) + split) // 4)
+            counts[level] = 4 * parents - split
+            split = parents
+        counts[levelList[0]] = 12 * 4**levelList[0] - split
+        if counts[levelList[0]] < 0:
+            raise AttributeError("The finer levels need more pixels than level %s holds; use a finer coarsest level or fewer pixels" % (levelList[0],))
+        return counts
+
+    pixels, maxLevel = int(pixels), int(maxLevel)
+    if pixels < 12:
+        raise AttributeError("A skymap needs at least 12 pixels")
+    if not 0 <= maxLevel <= 29:
+        raise AttributeError("The finest skymap level must be between 0 and 29")
+    if pixels > 12 * 4**maxLevel:
+        raise AttributeError("A skymap with a finest level of %s holds at most %s pixels" % (maxLevel, 12 * 4**maxLevel))
+
+    # SPLIT THE SAME NUMBER OF PIXELS AT EVERY LEVEL, STARTING AT THE COARSEST LEVEL WITH ENOUGH PIXELS TO SPLIT
+    for minLevel in range(maxLevel + 1):
+        base = 12 * 4**minLevel
+        depth = maxLevel - minLevel
+        if depth == 0 or base >= pixels:
+            return {minLevel: base}
+        split = int(round((pixels - base) / (3. * depth)))
+        if split <= base:
+            break
+    counts = {minLevel: base - split}
+    for level in range(minLevel + 1, maxLevel):
+        counts[level] = 3 * split
+    counts[maxLevel] = 4 * split
+    return counts
@@ -0,0 +1,154 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import importlib.util
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_annotate_dataframe(unittest.TestCase):
+
+    def test_annotate_dataframe_function(self):
+
+        from skytag.commonutils import annotate_dataframe, prob_at_location
+        import numpy as np
+        import pandas as pd
+        rng = np.random.default_rng(42)
+        df = pd.DataFrame({
+            "ra": rng.uniform(0., 360., 3000),
+            "dec": np.degrees(np.arcsin(rng.uniform(-1., 1., 3000))),
+            "mjd": rng.uniform(60000., 60100., 3000)
+        }, index=np.arange(3000) * 2)
+        for name in ["bayestar", "bilby"]:
+            mapPath = pathToOutputDir + "/%(name)s.multiorder.fits" % locals()
+            annotated = annotate_dataframe(
+                log=log,
+                df=df,
+                mapPath=mapPath,
+                mjd="mjd",
+                distance=True,
+                probdensity=True
+            )
+            prob, deltas, dist, density = prob_at_location(log=log, ra=df["ra"].tolist(), dec=df["dec"].tolist(), mjd=df["mjd"].tolist(), mapPath=mapPath, distance=True, probdensity=True)
+            self.assertEqual(list(annotated.columns), ["ra", "dec", "mjd", "prob", "mjdDelta", "distance", "distanceSigma", "probdensity"])
+            self.assertTrue(annotated.index.equals(df.index))
+            self.assertEqual(annotated["prob"].tolist(), prob)
+            self.assertEqual(annotated["mjdDelta"].tolist(), deltas)
+            np.testing.assert_equal(annotated["distance"].to_numpy(), np.array([d for d, s in dist], dtype=np.float64))
+            np.testing.assert_equal(annotated["distanceSigma"].to_numpy(), np.array([s for d, s in dist], dtype=np.float64))
+            self.assertEqual(annotated["probdensity"].tolist(), density)
+        self.assertEqual(list(df.columns), ["ra", "dec", "mjd"])
+
+    def test_annotate_dataframe_accessor_function(self):
+
+        import skytag.commonutils.dataframe_accessor
+        from skytag.commonutils import prob_at_location
+        import pandas as pd
+        df = pd.DataFrame({"RAJ2000": [10.343234, 170.343532], "DEJ2000": [14.345532, -40.532255], "prob": [1., 2.]})
+        annotated = df.skytag.annotate(pathToOutputDir + "/bayestar.multiorder.fits", ra="RAJ2000", dec="DEJ2000", prefix="gw_")
+        self.assertEqual(annotated["gw_prob"].tolist(), [100.0, 74.55])
+        self.assertEqual(annotated["prob"].tolist(), [1., 2.])
+
+    def test_annotate_dataframe_accessor_frame_function(self):
+
+        import skytag.commonutils.dataframe_accessor
+        from skytag.commonutils import prob_at_location
+        from astropy.coordinates import SkyCoord
+        import pandas as pd
+        coords = SkyCoord(ra=[10.343234, 170.343532], dec=[14.345532, -40.532255], unit="deg").galactic
+        df = pd.DataFrame({"l": coords.l.deg, "b": coords.b.deg})
+        annotated = df.skytag.annotate(pathToOutputDir + "/bayestar.multiorder.fits", ra="l", dec="b", frame="galactic")
+        expected = prob_at_location(log=log, ra=list(coords.l.deg), dec=list(coords.b.deg), mapPath=pathToOutputDir + "/bayestar.multiorder.fits", frame="galactic")[0]
+        self.assertEqual(annotated["prob"].tolist(), expected)
+        self.assertEqual(expected, [100.0, 74.55])
+
+    def test_annotate_dataframe_partitions_function(self):
+
+        from skytag.commonutils import annotate_dataframe, prepare_skymap
+        from unittest import mock
+        import importlib
+        import numpy as np
+        import pandas as pd
+        module = importlib.import_module("skytag.commonutils.annotate_dataframe")
+        prepare_module = importlib.import_module("skytag.commonutils.prepare_skymap")
+        rng = np.random.default_rng(43)
+        df = pd.DataFrame({"ra": rng.uniform(0., 360., 1000), "dec": np.degrees(np.arcsin(rng.uniform(-1., 1., 1000)))})
+        mapPath = pathToOutputDir + "/partitions.bilby.multiorder.fits"
+        shutil.copyfile(pathToInputDir + "/bilby.multiorder.fits", mapPath)
+        expected = annotate_dataframe(log=log, df=df, skymap=prepare_skymap(log=log, mapPath=mapPath))
+
+        # EVERY PARTITION HANDLED BY A PROCESS SHARES ONE PREPARED MAP
+        with mock.patch.object(prepare_module, "prepare_skymap", wraps=prepare_module.prepare_skymap) as prepare:
+            partitions = [module._annotate_partition(p, mapPath=mapPath, skymap=False, ra="ra", dec="dec", mjd=False, distance=False, probdensity=False, prefix="") for p in [df.iloc[i:i + 150] for i in range(0, 1000, 150)]]
+            self.assertEqual(prepare.call_count, 1)
+        self.assertTrue(pd.concat(partitions).equals(expected))
+
+    @unittest.skipUnless(importlib.util.find_spec("dask"), "dask is not installed")
+    def test_annotate_dataframe_dask_function(self):
+
+        import skytag.commonutils.dataframe_accessor
+        from skytag.commonutils import annotate_dataframe
+        import dask.dataframe as dd
+        import numpy as np
+        import pandas as pd
+        rng = np.random.default_rng(44)
+        df = pd.DataFrame({"ra": rng.uniform(0., 360., 2000), "dec": np.degrees(np.arcsin(rng.uniform(-1., 1., 2000))), "mjd": np.full(2000, 60063.)})
+        mapPath = pathToOutputDir + "/bayestar.multiorder.fits"
+        expected = annotate_dataframe(log=log, df=df, mapPath=mapPath, mjd="mjd", distance=True)
+        annotated = dd.from_pandas(df, npartitions=4).skytag.annotate(mapPath, mjd="mjd", distance=True).compute()
+        pd.testing.assert_frame_equal(annotated, expected)
+
+    def test_annotate_dataframe_function_exception(self):
+
+        from skytag.commonutils import annotate_dataframe
+        import pandas as pd
+        df = pd.DataFrame({"ra": [10.343234], "dec": [14.345532]})
+        with self.assertRaises(AttributeError):
+            annotate_dataframe(log=log, df=df)
+        with self.assertRaises(AttributeError):
+            annotate_dataframe(log=log, df=df, mapPath=pathToOutputDir + "/bayestar.multiorder.fits", mjd="mjd")
+
+        # x-print-testpage-for-pessto-marshall-web-object
+
+    # x-class-to-test-named-worker-function
@@ -0,0 +1,184 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_annotate_stream(unittest.TestCase):
+
+    def test_annotate_stream_function(self):
+
+        import io
+        import json
+        import numpy as np
+        from skytag.commonutils import annotate_stream, prob_at_location
+        bayestar = pathToOutputDir + "/bayestar.multiorder.fits"
+        bilby = pathToOutputDir + "/bilby.multiorder.fits"
+        rng = np.random.default_rng(31)
+        ra = rng.uniform(0., 360., 25)
+        dec = np.degrees(np.arcsin(rng.uniform(-1., 1., 25)))
+        lines = [json.dumps({"ra": r, "dec": d, "mjd": 60063.257381}) for r, d in zip(ra, dec)]
+        lines[3] = json.dumps({"ra": ra[3], "dec": dec[3], "mapPath": bilby})
+        lines.append("not json")
+
+        outputStream = io.StringIO()
+        stream = annotate_stream(
+            log=log,
+            mapPath=bayestar,
+            batchSize=10,
+            maxWait=5.,
+            distance=True,
+            probdensity=True
+        )
+        stream.run(inputStream=io.StringIO("\n".join(lines) + "\n"), outputStream=outputStream)
+        records = [json.loads(l) for l in outputStream.getvalue().splitlines()]
+
+        assert len(records) == 26
+        assert [s["size"] for s in stream.stats] == [10, 10, 6]
+        assert stream.stats[0]["maps"] == 2
+        assert stream.stats[-1]["errors"] == 1
+        assert "error" in records[-1]
+
+        probs, deltas, distances, densities = prob_at_location(log=log, ra=list(ra), dec=list(dec), mjd=[60063.257381] * 25, mapPath=bayestar, distance=True, probdensity=True)
+        for i, record in enumerate(records[:-1]):
+            if i == 3:
+                assert record["prob"] == prob_at_location(log=log, ra=ra[3], dec=dec[3], mapPath=bilby)[0][0]
+                assert "mjdDelta" not in record
+                continue
+            assert record["prob"] == probs[i]
+            assert record["mjdDelta"] == deltas[i]
+            # NON-FINITE VALUES ARE EMITTED AS JSON null
+            assert repr((record["distance"], record["distanceSigma"])) == repr(tuple(None if np.isnan(d) else float(d) for d in distances[i]))
+            assert record["probdensity"] == densities[i]
+
+    def test_annotate_stream_malformed_records_function(self):
+
+        import json
+        from skytag.commonutils import annotate_stream, prob_at_location
+        bayestar = pathToOutputDir + "/bayestar.multiorder.fits"
+        stream = annotate_stream(log=log, mapPath=bayestar)
+        records = stream.annotate_batch([
+            json.dumps({"ra": 10.343234, "dec": 14.345532, "mjd": 60063.257381}),
+            json.dumps({"ra": 170.343532, "dec": -40.532255, "mjd": "yesterday"}),
+            json.dumps({"ra": 170.343532, "dec": -40.532255, "mapPath": [bayestar]}),
+            json.dumps({"ra": 170.343532, "dec": -40.532255, "mjd": 60063.257381})
+        ])
+
+        # A BAD RECORD BECOMES AN ERROR RECORD AND ITS NEIGHBOURS ARE STILL ANNOTATED
+        assert records[1]["error"].startswith("ValueError")
+        assert records[2]["error"].startswith("TypeError")
+        probs, deltas = prob_at_location(log=log, ra=[10.343234, 170.343532], dec=[14.345532, -40.532255], mjd=[60063.257381] * 2, mapPath=bayestar)
+        assert [records[0]["prob"], records[3]["prob"]] == probs
+        assert [records[0]["mjdDelta"], records[3]["mjdDelta"]] == deltas
+
+    def test_annotate_stream_deadline_function(self):
+
+        import json
+        import os
+        import threading
+        import time
+        from skytag.commonutils import annotate_stream
+        readFd, writeFd = os.pipe()
+        outFd, inFd = os.pipe()
+        stream = annotate_stream(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            batchSize=1000,
+            maxWait=0.05
+        )
+        runner = threading.Thread(target=stream.run, args=(os.fdopen(readFd), os.fdopen(inFd, "w")))
+        runner.start()
+        writer = os.fdopen(writeFd, "w")
+        reader = os.fdopen(outFd)
+        # A LONE RECORD IS EMITTED ONCE maxWAIT EXPIRES, WITHOUT THE BATCH FILLING OR THE STREAM ENDING
+        writer.write(json.dumps({"ra": 170.343532, "dec": -40.532255}) + "\n")
+        writer.flush()
+        assert json.loads(reader.readline())["prob"] == 74.55
+        writer.close()
+        runner.join(10)
+        assert not runner.is_alive()
+        assert len(stream.stats) == 1 and stream.stats[0]["size"] == 1
+
+    def test_annotate_stream_socket_function(self):
+
+        import json
+        import socket
+        import tempfile
+        import threading
+        import time
+        from skytag.commonutils import annotate_stream
+        socketPath = tempfile.mktemp(suffix=".sock")
+        stream = annotate_stream(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            maxWait=0.01,
+            socketPath=socketPath
+        )
+        runner = threading.Thread(target=stream.run)
+        runner.start()
+        for i in range(100):
+            if os.path.exists(socketPath):
+                break
+            time.sleep(0.05)
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socketPath)
+        client.sendall((json.dumps({"ra": 10.343234, "dec": 14.345532}) + "\n" + json.dumps({"ra": 170.343532, "dec": -40.532255}) + "\n").encode())
+        replies = client.makefile("r")
+        probs = [json.loads(replies.readline())["prob"] for i in range(2)]
+        client.close()
+        stream.stop()
+        runner.join(10)
+
+        assert probs == [100.0, 74.55]
+        assert not runner.is_alive()
+
+    def test_annotate_stream_exception(self):
+
+        from skytag.commonutils import annotate_stream
+        with self.assertRaises(AttributeError):
+            annotate_stream(log=log, batchSize=0)
+
+    # x-class-to-test-named-worker-function
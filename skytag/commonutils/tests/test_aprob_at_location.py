@@ -0,0 +1,109 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_aprob_at_location(unittest.TestCase):
+
+    def test_aprob_at_location_function(self):
+
+        import asyncio
+        from skytag.commonutils import aprob_at_location, prob_at_location
+        kwargs = {
+            "ra": [10.343234, 170.343532],
+            "dec": [14.345532, -40.532255],
+            "mjd": [60034.257381, 60063.257381],
+            "distance": True,
+            "probdensity": True
+        }
+        for mapName in ["bayestar", "bilby"]:
+            mapPath = pathToOutputDir + "/%(mapName)s.multiorder.fits" % locals()
+            results = asyncio.run(aprob_at_location(log=log, mapPath=mapPath, **kwargs))
+            assert repr(results) == repr(prob_at_location(log=log, mapPath=mapPath, **kwargs))
+
+    def test_aprob_at_location_coalesce_function(self):
+
+        import asyncio
+        from unittest import mock
+        from skytag.commonutils import aprob_at_location
+        import importlib
+        prepare_module = importlib.import_module("skytag.commonutils.prepare_skymap")
+        bayestar = pathToOutputDir + "/bayestar.multiorder.fits"
+        bilby = pathToOutputDir + "/bilby.multiorder.fits"
+
+        async def annotate():
+            return await asyncio.gather(
+                *[aprob_at_location(log=log, ra=10. * i, dec=-40., mapPath=bayestar) for i in range(6)],
+                *[aprob_at_location(log=log, ra=10. * i, dec=-40., mapPath=bilby) for i in range(6)])
+
+        with mock.patch.object(prepare_module, "prepare_skymap", wraps=prepare_module.prepare_skymap) as prepare:
+            results = asyncio.run(annotate())
+        # ONE LOAD PER MAP, HOWEVER MANY CONCURRENT REQUESTS
+        assert prepare.call_count == 2
+        assert len(results) == 12
+
+        from skytag.commonutils.aprob_at_location import _inflightLoads
+        assert not _inflightLoads
+
+    def test_aprob_at_location_event_loop_function(self):
+
+        import asyncio
+        from skytag.commonutils import aprob_at_location
+
+        async def annotate():
+            # THE EVENT LOOP KEEPS TICKING WHILE THE MAP IS READ AND QUERIED
+            ticks = 0
+            task = asyncio.ensure_future(aprob_at_location(log=log, ra=10.343234, dec=14.345532, mapPath=pathToOutputDir + "/bayestar.multiorder.fits"))
+            while not task.done():
+                ticks += 1
+                await asyncio.sleep(0)
+            return ticks, task.result()
+
+        ticks, results = asyncio.run(annotate())
+        assert ticks > 1
+        assert results == [[100.0]]
+
+    # x-class-to-test-named-worker-function
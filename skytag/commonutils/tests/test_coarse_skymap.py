@@ -0,0 +1,110 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_coarse_skymap(unittest.TestCase):
+
+    def test_coarse_skymap_function(self):
+
+        from skytag.commonutils import coarse_skymap
+        coarse = coarse_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            level=7
+        )
+        probs = coarse.get(
+            ra=[10.343234, 170.343532],
+            dec=[14.345532, -40.532255]
+        )
+        print(probs, coarse.maxError)
+
+    def test_coarse_skymap_error_bound_function(self):
+
+        from skytag.commonutils import coarse_skymap, prepare_skymap, prob_at_location
+        import numpy as np
+        ra = np.linspace(0., 359., 2000)
+        dec = np.degrees(np.arcsin(np.linspace(-0.99, 0.99, 2000)))
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bilby.multiorder.fits"
+        )
+        exact = np.array(prob_at_location(
+            log=log,
+            ra=ra,
+            dec=dec,
+            mapPath=pathToOutputDir + "/bilby.multiorder.fits"
+        )[0])
+        for level in [6, 8, 10]:
+            coarse = coarse_skymap(log=log, skymap=skymap, level=level)
+            approx = np.array(coarse.get(ra=ra, dec=dec))
+            assert np.abs(approx - exact).max() <= coarse.maxError + 0.01
+        # THE BILBY MAP IS NO FINER THAN LEVEL 10 SO NO ERROR IS INTRODUCED
+        assert coarse.maxError == 0.
+
+    def test_coarse_skymap_level_exception(self):
+
+        from skytag.commonutils import coarse_skymap
+        for level in [-1, 30]:
+            with self.assertRaises(AttributeError):
+                coarse_skymap(
+                    log=log,
+                    mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+                    level=level
+                )
+
+    def test_coarse_skymap_region_exception(self):
+
+        from skytag.commonutils import coarse_skymap, prepare_skymap
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            region={"ra": 170., "dec": -40., "radius": 2.}
+        )
+        with self.assertRaises(AttributeError):
+            coarse_skymap(log=log, skymap=skymap, level=7)
+
+    # x-class-to-test-named-worker-function
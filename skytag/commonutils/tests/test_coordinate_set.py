@@ -0,0 +1,119 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_coordinate_set(unittest.TestCase):
+
+    def test_coordinate_set_function(self):
+
+        from skytag.commonutils import coordinate_set, prob_at_location
+        coords = coordinate_set(
+            log=log,
+            ra=[10.343234, 170.343532],
+            dec=[14.345532, -40.532255]
+        )
+        prob, deltas = prob_at_location(
+            log=log,
+            ra=coords,
+            dec=None,
+            mjd=[60034.257381, 60063.257381],
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        self.assertEqual(len(coords), 2)
+        self.assertEqual(prob, [100.0, 74.55])
+        self.assertEqual(deltas, [-28.11018, 0.88982])
+
+    def test_coordinate_set_many_maps_function(self):
+
+        from skytag.commonutils import coordinate_set, prob_at_location, prepare_skymap
+        import numpy as np
+        rng = np.random.default_rng(38)
+        ra, dec = rng.uniform(0., 360., 20000), np.degrees(np.arcsin(rng.uniform(-1., 1., 20000)))
+
+        for sort in [True, False]:
+            coords = coordinate_set(log=log, ra=ra, dec=dec, sort=sort)
+            for mapName in ["bayestar", "bilby"]:
+                mapPath = pathToOutputDir + "/%s.multiorder.fits" % mapName
+                expected = prob_at_location(log=log, ra=ra, dec=dec, mapPath=mapPath, probdensity=True)
+                self.assertEqual(prob_at_location(log=log, ra=coords, dec=None, mapPath=mapPath, probdensity=True), expected)
+
+                # REGION-RESTRICTED MAPS RETURN nan OUTSIDE THE REGION
+                region = {"ra": 170., "dec": -40., "radius": 5.}
+                skymap = prepare_skymap(log=log, mapPath=mapPath, region=region)
+                restricted = prob_at_location(log=log, ra=coords, dec=None, mapPath=mapPath, skymap=skymap)[0]
+                np.testing.assert_equal(restricted, prob_at_location(log=log, ra=ra, dec=dec, mapPath=mapPath, skymap=skymap)[0])
+
+    def test_credible_level_changes_function(self):
+
+        from skytag.commonutils import credible_level_changes, coordinate_set, prob_at_location
+        import numpy as np
+        rng = np.random.default_rng(38)
+        ra, dec = rng.uniform(0., 360., 1000), np.degrees(np.arcsin(rng.uniform(-1., 1., 1000)))
+        oldMapPath = pathToOutputDir + "/bayestar.multiorder.fits"
+        newMapPath = pathToOutputDir + "/bilby.multiorder.fits"
+
+        oldProbs, newProbs, changes = credible_level_changes(log=log, ra=ra, dec=dec, oldMapPath=oldMapPath, newMapPath=newMapPath)
+        self.assertEqual(oldProbs, prob_at_location(log=log, ra=ra, dec=dec, mapPath=oldMapPath)[0])
+        self.assertEqual(newProbs, prob_at_location(log=log, ra=ra, dec=dec, mapPath=newMapPath)[0])
+        np.testing.assert_allclose(changes, np.array(newProbs) - np.array(oldProbs), atol=0.006)
+
+        # AN UNCHANGED MAP HAS NO CHANGES
+        coords = coordinate_set(log=log, ra=ra, dec=dec)
+        oldProbs, newProbs, changes = credible_level_changes(log=log, ra=coords, dec=None, oldMapPath=oldMapPath, newMapPath=oldMapPath)
+        self.assertEqual(changes, [0.] * 1000)
+
+    def test_coordinate_set_function_exception(self):
+
+        from skytag.commonutils import coordinate_set
+        with self.assertRaises(AttributeError):
+            coordinate_set(log=log, ra=[10., 20.], dec=[14.])
+
+        # x-print-testpage-for-pessto-marshall-web-object
+
+    # x-class-to-test-named-worker-function
@@ -0,0 +1,87 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+
+class test_credible_moc(unittest.TestCase):
+
+    def test_credible_moc_function(self):
+
+        from skytag.commonutils import credible_moc, prepare_skymap, prob_at_location
+        from skytag.commonutils.prepare_skymap import lonlat_to_index29, match_skymap_pixels
+        import numpy as np
+        mapPath = pathToInputDir + "/bayestar.multiorder.fits"
+        mocs = credible_moc(log=log, mapPath=mapPath, credible=[95, 50., 90.])
+        self.assertEqual(list(mocs.keys()), [50., 90., 95.])
+
+        # MEMBERSHIP MATCHES THE (UNROUNDED) CREDIBLE LEVEL OF EVERY LOCATION
+        skymap = prepare_skymap(log=log, mapPath=mapPath)
+        rng = np.random.default_rng(4)
+        ra, dec = rng.uniform(0., 360., 200000), np.degrees(np.arcsin(rng.uniform(-1., 1., 200000)))
+        cumprob = skymap['CUMPROB'][match_skymap_pixels(skymap, lonlat_to_index29(ra, dec))]
+        for level, moc in mocs.items():
+            np.testing.assert_array_equal(moc.contains(ra=ra, dec=dec), cumprob <= level / 100.)
+            inside = skymap['CUMPROB'] <= level / 100.
+            area = np.sum(skymap['PROB'][inside] / skymap['PROBDENSITY'][inside]) * (180. / np.pi)**2
+            self.assertAlmostEqual(moc.area, area, places=6)
+        self.assertTrue(mocs[50.].area < mocs[90.].area < mocs[95.].area)
+        self.assertTrue(mocs[90.].contains(ra=170.343532, dec=-40.532255)[0])
+        self.assertFalse(mocs[50.].contains(ra=170.343532, dec=-40.532255)[0])
+
+        # THE 100% REGION IS THE WHOLE SKY
+        self.assertEqual(credible_moc(log=log, skymap=skymap, credible=100.)[100.].to_string(), "0/0-11")
+
+    def test_credible_moc_function_exception(self):
+
+        from skytag.commonutils import credible_moc, prepare_skymap
+        mapPath = pathToInputDir + "/bayestar.multiorder.fits"
+        for credible in [0., [50., 101.], []]:
+            with self.assertRaises(AttributeError):
+                credible_moc(log=log, mapPath=mapPath, credible=credible)
+        skymap = prepare_skymap(log=log, mapPath=mapPath, region={"ra": 1., "dec": 2., "radius": 5.})
+        with self.assertRaises(AttributeError):
+            credible_moc(log=log, skymap=skymap)
@@ -0,0 +1,134 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+
+def voxel_grid(skymap, radii):
+    """*the volume density and probability of every voxel of a prepared skymap on a radial grid (pixels x radii)*
+    """
+    import numpy as np
+    step = radii[1] - radii[0]
+    mu, sigma = skymap['DISTMU'][:, None], skymap['DISTSIGMA'][:, None]
+    density = skymap['PROBDENSITY'][:, None] * skymap['DISTNORM'][:, None] * np.exp(-0.5 * ((radii - mu) / sigma)**2) / (np.sqrt(2. * np.pi) * sigma)
+    mass = density * (skymap['PROB'] / skymap['PROBDENSITY'])[:, None] * radii**2 * step
+    return density, mass
+
+
+class test_credible_volume(unittest.TestCase):
+
+    def test_credible_volume_function(self):
+
+        from skytag.commonutils import credible_volume, synthetic_skymap, prepare_skymap
+        from skytag.commonutils.credible_volume import volume_density
+        from skytag.commonutils.prepare_skymap import lonlat_to_index29, match_skymap_pixels, MAX_LEVEL
+        import astropy_healpix as ah
+        import numpy as np
+        mapPath = pathToOutputDir + "/volume.multiorder.fits"
+        synthetic_skymap(log=log, pathToOutput=mapPath, pixels=3000, maxLevel=6, blobs=2, seed=8, distance=True)
+        skymap = prepare_skymap(log=log, mapPath=mapPath)
+
+        # GALAXIES DRAWN FROM THE 3D POSTERIOR, VIA THE VOXELS OF A FINE RADIAL GRID
+        radii = np.linspace(0., 2. * skymap['DISTMU'].max(), 2001)[1:]
+        density, mass = voxel_grid(skymap, radii)
+        rng = np.random.default_rng(8)
+        voxels = rng.choice(mass.size, size=20000, p=mass.ravel() / mass.sum())
+        rows, shells = np.divmod(voxels, len(radii))
+        span = np.left_shift(np.int64(1), 2 * (MAX_LEVEL - skymap['LEVEL'][rows].astype(np.int64)))
+        ipix = skymap['INDEX29'][rows] + (rng.random(len(rows)) * span).astype(np.int64)
+        lon, lat = ah.healpix_to_lonlat(ipix, ah.level_to_nside(MAX_LEVEL), order='nested')
+        distances = radii[shells] + (rng.random(len(rows)) - 0.5) * (radii[1] - radii[0])
+        levels = np.array(credible_volume(log=log, ra=lon.deg, dec=lat.deg, distance=distances, skymap=skymap))
+
+        # THE LEVELS OF POSTERIOR SAMPLES ARE UNIFORM
+        for q in [10., 50., 90.]:
+            self.assertAlmostEqual(np.mean(levels <= q), q / 100., delta=0.015)
+
+        # AND AGREE WITH RANKING THE VOXELS BY DENSITY
+        order = np.argsort(density.ravel())[::-1]
+        cumulative = np.cumsum(mass.ravel()[order])
+        galaxyDensity = volume_density(skymap, match_skymap_pixels(skymap, lonlat_to_index29(lon.deg, lat.deg)), distances)
+        expected = np.interp(-galaxyDensity, -density.ravel()[order], cumulative) * 100.
+        self.assertLess(np.abs(levels - expected).max(), 0.5)
+
+        # THE MAP IS RANKED ONCE, THEN CACHED ON THE SKYMAP
+        table = skymap['volumeTable']
+        credible_volume(log=log, ra=10., dec=20., distance=100., skymap=skymap)
+        self.assertIs(skymap['volumeTable'], table)
+
+    def test_credible_volume_edge_function(self):
+
+        from skytag.commonutils import credible_volume, prepare_skymap
+        import astropy_healpix as ah
+        import numpy as np
+        skymap = prepare_skymap(log=log, mapPath=pathToInputDir + "/bayestar.multiorder.fits")
+
+        # A PIXEL WITHOUT A DISTANCE ESTIMATE, A NEGATIVE DISTANCE, A DENSE SPOT AND A NAN DISTANCE
+        row = np.flatnonzero(~np.isfinite(skymap['DISTMU']))[0]
+        lon, lat = ah.healpix_to_lonlat(skymap['INDEX29'][row], 2**29, order='nested')
+        best = np.argmax(skymap['PROBDENSITY'])
+        lonBest, latBest = ah.healpix_to_lonlat(skymap['INDEX29'][best], 2**29, order='nested')
+        levels = credible_volume(
+            log=log,
+            ra=[lon.deg, 170.343532, lonBest.deg, 170.343532],
+            dec=[lat.deg, -40.532255, latBest.deg, -40.532255],
+            distance=[100., -5., skymap['DISTMU'][best], np.nan],
+            mapPath=pathToInputDir + "/bayestar.multiorder.fits"
+        )
+        self.assertEqual(levels[:2], [100., 100.])
+        self.assertLess(levels[2], 5.)
+        self.assertTrue(np.isnan(levels[3]))
+
+    def test_credible_volume_function_exception(self):
+
+        from skytag.commonutils import credible_volume, prepare_skymap
+        with self.assertRaises(AttributeError):
+            credible_volume(log=log, ra=1., dec=2., distance=100., mapPath=pathToInputDir + "/bilby.multiorder.fits")
+        with self.assertRaises(AttributeError):
+            credible_volume(log=log, ra=[1., 2.], dec=[2., 3.], distance=[100.], mapPath=pathToInputDir + "/bayestar.multiorder.fits")
+        skymap = prepare_skymap(log=log, mapPath=pathToInputDir + "/bayestar.multiorder.fits", region={"ra": 1., "dec": 2., "radius": 5.})
+        with self.assertRaises(AttributeError):
+            credible_volume(log=log, ra=1., dec=2., distance=100., skymap=skymap)
@@ -0,0 +1,162 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import pytest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_fov_probability(unittest.TestCase):
+
+    def test_fov_probability_function(self):
+
+        from skytag.commonutils import fov_probability
+        probs = fov_probability(
+            log=log,
+            ra=[10.3, 170.3],
+            dec=[14.3, -40.5],
+            footprint={"width": 2.0, "height": 2.0},
+            pa=[0., 45.],
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        print(probs)
+
+    def test_fov_probability_whole_sky_function(self):
+
+        from skytag.commonutils import fov_probability
+        # TWO HEMISPHERES HOLD ALL OF THE PROBABILITY
+        for mapName in ["bayestar", "bilby"]:
+            probs = fov_probability(
+                log=log,
+                ra=[0., 180.],
+                dec=[89.99, -89.99],
+                footprint={"radius": 89.99},
+                samples=200000,
+                mapPath=pathToOutputDir + "/%(mapName)s.multiorder.fits" % locals()
+            )
+            self.assertAlmostEqual(sum(probs), 100., delta=0.1)
+
+    def test_fov_probability_footprints_function(self):
+
+        from skytag.commonutils import fov_probability, prepare_skymap
+        from skytag.commonutils.fov_probability import footprint_template
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+
+        # TEMPLATE WEIGHTS SUM TO THE FOOTPRINT SOLID ANGLE
+        sqdeg = (180. / np.pi)**2
+        x, y, weight = footprint_template({"radius": 1.})
+        self.assertAlmostEqual(weight.sum(), 2. * np.pi * (1. - np.cos(np.radians(1.))), delta=1e-12)
+        x, y, weight = footprint_template({"width": 2., "height": 1.}, samples=10000)
+        self.assertAlmostEqual(weight.sum() * sqdeg, 2., delta=0.01)
+        x, y, weight = footprint_template({"vertices": [[-1., -1.], [1., -1.], [0., 1.]]}, samples=10000)
+        self.assertAlmostEqual(weight.sum() * sqdeg, 2., delta=0.01)
+
+        # A RECTANGLE ROTATED BY 90 DEGREES IS THE SAME AS SWAPPING ITS SIDES, AND IT EQUALS THE SAME POLYGON
+        ra, dec = [170.3, 165.1], [-40.5, -35.2]
+        wide = fov_probability(log=log, ra=ra, dec=dec, footprint={"width": 4., "height": 2.}, samples=20000, skymap=skymap)
+        tall = fov_probability(log=log, ra=ra, dec=dec, footprint={"width": 2., "height": 4.}, pa=90., samples=20000, skymap=skymap)
+        polygon = fov_probability(log=log, ra=ra, dec=dec, footprint={"vertices": [[-2., -1.], [2., -1.], [2., 1.], [-2., 1.]]}, samples=20000, skymap=skymap)
+        np.testing.assert_allclose(wide, tall, atol=0.01)
+        np.testing.assert_allclose(wide, polygon, atol=0.01)
+
+        # THE DEFAULT SAMPLING IS CLOSE TO A FINE SAMPLING
+        coarse = fov_probability(log=log, ra=ra, dec=dec, footprint={"width": 4., "height": 2.}, skymap=skymap)
+        np.testing.assert_allclose(coarse, wide, atol=0.05)
+
+        # ONE FOOTPRINT PER POINTING
+        mixed = fov_probability(log=log, ra=ra, dec=dec, footprint=[{"width": 4., "height": 2.}, {"radius": 1.}], samples=20000, skymap=skymap)
+        assert mixed[0] == wide[0]
+        assert mixed[1] == fov_probability(log=log, ra=ra[1], dec=dec[1], footprint={"radius": 1.}, samples=20000, skymap=skymap)[0]
+
+    def test_fov_probability_many_pointings_function(self):
+
+        from skytag.commonutils import fov_probability, prepare_skymap
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        rng = np.random.default_rng(35)
+        ra, dec, pa = rng.uniform(150., 190., 10000), rng.uniform(-60., -20., 10000), rng.uniform(0., 360., 10000)
+        for footprint in [{"radius": 1.}, {"width": 2., "height": 2.}]:
+            probs = np.array(fov_probability(log=log, ra=ra, dec=dec, footprint=footprint, pa=pa, skymap=skymap))
+            assert len(probs) == 10000
+
+            # THE DEFAULT SAMPLING AGREES WITH A FINE SAMPLING OF A SUBSET OF THE POINTINGS
+            subset = rng.choice(10000, 200, replace=False)
+            reference = fov_probability(log=log, ra=ra[subset], dec=dec[subset], footprint=footprint, pa=pa[subset], samples=50000, skymap=skymap)
+            np.testing.assert_allclose(probs[subset], reference, rtol=0.03, atol=0.05)
+
+    @pytest.mark.slow
+    def test_fov_probability_many_pointings_timing_function(self):
+
+        from skytag.commonutils import fov_probability, prepare_skymap
+        import numpy as np
+        import time
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        rng = np.random.default_rng(35)
+        fov_probability(log=log, ra=[170.], dec=[-40.], footprint={"radius": 1.}, skymap=skymap)
+        start = time.time()
+        fov_probability(log=log, ra=rng.uniform(150., 190., 10000), dec=rng.uniform(-60., -20., 10000), footprint={"radius": 1.}, pa=rng.uniform(0., 360., 10000), skymap=skymap)
+        elapsed = time.time() - start
+        print("10,000 pointings in %0.2fs" % (elapsed,))
+        # ~2s ON A SINGLE CORE, WITH HEADROOM FOR SLOWER MACHINES
+        assert elapsed < 6., elapsed
+
+    def test_fov_probability_exception(self):
+
+        from skytag.commonutils import fov_probability
+        mapPath = pathToOutputDir + "/bayestar.multiorder.fits"
+        for footprint in [{"radius": 95.}, {"width": 2.}, {"vertices": [[0., 0.], [1., 1.]]}, {"side": 2.}, [{"radius": 1.}]]:
+            with self.assertRaises(AttributeError):
+                fov_probability(log=log, ra=[10., 20.], dec=[0., 0.], footprint=footprint, mapPath=mapPath)
+
+    # x-class-to-test-named-worker-function
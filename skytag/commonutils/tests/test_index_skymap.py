@@ -0,0 +1,183 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_index_skymap(unittest.TestCase):
+
+    def test_index_skymap_function(self):
+
+        from skytag.commonutils import index_skymap, prepare_skymap
+        import numpy as np
+        mapPath = pathToOutputDir + "/indexed.bayestar.multiorder.fits"
+        shutil.copyfile(pathToInputDir + "/bayestar.multiorder.fits", mapPath)
+        sidecarPath = index_skymap(
+            log=log,
+            mapPath=mapPath
+        )
+        assert os.path.exists(sidecarPath + "/meta.json")
+
+        fresh = prepare_skymap(log=log, mapPath=mapPath, useIndex=False)
+        indexed = prepare_skymap(log=log, mapPath=mapPath)
+        assert isinstance(indexed['INDEX29'], np.memmap)
+        for k, v in fresh.items():
+            if isinstance(v, np.ndarray):
+                assert np.array_equal(v, indexed[k])
+        assert indexed['meta']['MJD-OBS'] == fresh['meta']['MJD-OBS']
+
+    def test_index_skymap_prob_at_location_function(self):
+
+        from skytag.commonutils import index_skymap, prob_at_location
+        import numpy as np
+        rng = np.random.default_rng(29)
+        ra = rng.uniform(0., 360., 5000)
+        dec = np.degrees(np.arcsin(rng.uniform(-1., 1., 5000)))
+        ra[:2] = [10.343234, 170.343532]
+        dec[:2] = [14.345532, -40.532255]
+        mapPath = pathToOutputDir + "/indexed.bilby.multiorder.fits"
+        shutil.copyfile(pathToInputDir + "/bilby.multiorder.fits", mapPath)
+
+        expected = {}
+        kwargs = {
+            "whole": {},
+            "region": {"region": {"ra": 170., "dec": -40., "radius": 10.}},
+            "positions": {"region": True}
+        }
+        for name, kw in kwargs.items():
+            expected[name] = repr(prob_at_location(log=log, ra=ra, dec=dec, mjd=list(np.full(5000, 60063.)), mapPath=mapPath, distance=True, probdensity=True, **kw))
+        index_skymap(log=log, mapPath=mapPath)
+        for name, kw in kwargs.items():
+            results = repr(prob_at_location(log=log, ra=ra, dec=dec, mjd=list(np.full(5000, 60063.)), mapPath=mapPath, distance=True, probdensity=True, **kw))
+            assert results == expected[name], name
+
+    def test_index_skymap_pathlib_function(self):
+
+        from pathlib import Path
+        from skytag.commonutils import index_skymap, prepare_skymap, prob_at_location
+        import numpy as np
+        mapPath = Path(pathToOutputDir) / "pathlib.bayestar.multiorder.fits"
+        shutil.copyfile(pathToInputDir + "/bayestar.multiorder.fits", mapPath)
+
+        # PATH-LIKE MAPS ARE READ WITH OR WITHOUT A SIDECAR INDEX
+        expected = prob_at_location(log=log, ra=[10.343234, 170.343532], dec=[14.345532, -40.532255], mapPath=str(mapPath))
+        assert prob_at_location(log=log, ra=[10.343234, 170.343532], dec=[14.345532, -40.532255], mapPath=mapPath) == expected
+        sidecarPath = index_skymap(log=log, mapPath=mapPath)
+        assert os.path.exists(os.path.join(sidecarPath, "meta.json"))
+        assert isinstance(prepare_skymap(log=log, mapPath=mapPath)['INDEX29'], np.memmap)
+        assert prob_at_location(log=log, ra=[10.343234, 170.343532], dec=[14.345532, -40.532255], mapPath=mapPath) == expected
+
+    def test_index_skymap_stale_function(self):
+
+        from skytag.commonutils import index_skymap, prepare_skymap
+        import numpy as np
+        mapPath = pathToOutputDir + "/stale.multiorder.fits"
+        shutil.copyfile(pathToInputDir + "/bayestar.multiorder.fits", mapPath)
+        index_skymap(log=log, mapPath=mapPath)
+
+        # THE SAME CONTENT WITH A NEW MODIFICATION TIME IS STILL VALID (CHECKSUM MATCHES)
+        os.utime(mapPath, ns=(0, 0))
+        assert isinstance(prepare_skymap(log=log, mapPath=mapPath)['INDEX29'], np.memmap)
+
+        # A DIFFERENT MAP AT THE SAME PATH IS NOT
+        shutil.copyfile(pathToInputDir + "/bilby.multiorder.fits", mapPath)
+        skymap = prepare_skymap(log=log, mapPath=mapPath)
+        assert not isinstance(skymap['INDEX29'], np.memmap)
+        fresh = prepare_skymap(log=log, mapPath=mapPath, useIndex=False)
+        assert np.array_equal(skymap['CUMPROB'], fresh['CUMPROB'])
+
+    def test_index_skymap_out_of_core_function(self):
+
+        from skytag.commonutils import index_skymap, prepare_skymap
+        import numpy as np
+        for name in ["bayestar", "bilby"]:
+            mapPath = pathToOutputDir + "/out_of_core.%(name)s.multiorder.fits" % locals()
+            shutil.copyfile(pathToInputDir + "/%(name)s.multiorder.fits" % locals(), mapPath)
+            # A SMALL CHUNK FORCES MANY SORT BUCKETS AND RUNS
+            sidecarPath = index_skymap(log=log, mapPath=mapPath, chunkRows=700)
+
+            fresh = prepare_skymap(log=log, mapPath=mapPath, useIndex=False)
+            indexed = prepare_skymap(log=log, mapPath=mapPath)
+            assert isinstance(indexed['INDEX29'], np.memmap)
+            for k, v in fresh.items():
+                if isinstance(v, np.ndarray):
+                    assert indexed[k].dtype == v.dtype, k
+                    np.testing.assert_array_equal(v, indexed[k], err_msg=k)
+            assert indexed['meta'] == fresh['meta']
+            assert not os.path.exists(sidecarPath + "/scratch")
+
+    def test_index_skymap_out_of_core_memory_function(self):
+
+        from skytag.commonutils import index_skymap, synthetic_skymap
+        import numpy as np
+        import tracemalloc
+        mapPath = pathToOutputDir + "/out_of_core.synthetic.multiorder.fits"
+        synthetic_skymap(log=log, pathToOutput=mapPath, pixels=500000, seed=41)
+
+        tracemalloc.start()
+        index_skymap(log=log, mapPath=mapPath, chunkRows=20000)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        # A PREPARED ROW IS 57 BYTES; THE IN-MEMORY PREPARATION PEAKS AT SEVERAL TIMES THAT PER ROW
+        assert peak < 500000 * 57 / 2, peak
+
+    def test_index_skymap_function_exception(self):
+
+        from skytag.commonutils import index_skymap, prepare_skymap
+        mapPath = pathToOutputDir + "/out_of_core.exception.multiorder.fits"
+        shutil.copyfile(pathToInputDir + "/bilby.multiorder.fits", mapPath)
+        try:
+            index_skymap(log=log, mapPath=mapPath, chunkRows=0)
+            assert False
+        except AttributeError as e:
+            pass
+        try:
+            index_skymap(log=log, mapPath=mapPath, chunkRows=100, skymap=prepare_skymap(log=log, mapPath=mapPath))
+            assert False
+        except AttributeError as e:
+            pass
+        assert not os.path.exists(mapPath + ".skytag")
+
+    # x-class-to-test-named-worker-function
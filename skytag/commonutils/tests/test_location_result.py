@@ -0,0 +1,101 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+
+class test_location_result(unittest.TestCase):
+
+    def test_location_result_function(self):
+
+        from skytag.commonutils import prob_at_location, location_result
+        import numpy as np
+        ra = [170.343532, 10.343234, 270.1, 0.]
+        dec = [-40.532255, 14.345532, 60.2, -89.9]
+        mjd = [60063.257381, 60034.257381, 60064., 60000.]
+        for mapPath in [pathToInputDir + "/bayestar.multiorder.fits", pathToInputDir + "/bilby.multiorder.fits"]:
+            eager = prob_at_location(log=log, ra=ra, dec=dec, mjd=mjd, mapPath=mapPath, distance=True, probdensity=True)
+            results = prob_at_location(log=log, ra=ra, dec=dec, mjd=mjd, mapPath=mapPath, lazy=True)
+            self.assertIsInstance(results, location_result)
+            self.assertEqual(len(results), 4)
+            self.assertEqual(results.prob, eager[0])
+            self.assertEqual(results.mjdDelta, eager[1])
+            np.testing.assert_equal(results.distance, eager[2])
+            self.assertEqual(results.probdensity, eager[3])
+
+        # NO MJDS
+        results = prob_at_location(log=log, ra=ra[0], dec=dec[0], mapPath=pathToInputDir + "/bayestar.multiorder.fits", lazy=True)
+        self.assertEqual(results.prob, [74.55])
+        self.assertIsNone(results.mjdDelta)
+
+    def test_location_result_lazy_function(self):
+
+        from skytag.commonutils import prob_at_location
+        from unittest import mock
+        import sys
+        pal = sys.modules["skytag.commonutils.prob_at_location"]
+        results = prob_at_location(log=log, ra=[170.343532, 10.343234], dec=[-40.532255, 14.345532], mapPath=pathToInputDir + "/bayestar.multiorder.fits", lazy=True)
+
+        # DISTANCES ARE ONLY COMPUTED WHEN READ, AND THEN ONLY ONCE
+        with mock.patch.object(pal, "_location_distances", wraps=pal._location_distances) as distances:
+            results.prob
+            results.probdensity
+            self.assertEqual(distances.call_count, 0)
+            first = results.distance
+            second = results.distance
+            self.assertEqual(distances.call_count, 1)
+        self.assertIs(first, second)
+        self.assertIs(results.prob, results.prob)
+
+    def test_location_result_function_exception(self):
+
+        from skytag.commonutils import prob_at_location
+        mapPath = pathToInputDir + "/bayestar.multiorder.fits"
+        for kwargs in [{"workers": 2}, {"cache": True}]:
+            with self.assertRaises(AttributeError):
+                prob_at_location(log=log, ra=[1., 2.], dec=[3., 4.], mapPath=mapPath, lazy=True, **kwargs)
+        with self.assertRaises(AttributeError):
+            prob_at_location(log=log, ra=[1., 2.], dec=[3., 4.], mjd=[60000.], mapPath=mapPath, lazy=True)
@@ -0,0 +1,82 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_measure_latency(unittest.TestCase):
+
+    def test_measure_latency_function(self):
+
+        from skytag.commonutils import measure_latency
+        from skytag.commonutils.measure_latency import latency_report
+        latency = measure_latency(
+            log=log,
+            ra=170.343532,
+            dec=-40.532255,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            coldRepeats=2,
+            warmRepeats=3
+        )
+        assert sorted(latency["cold"].keys()) == ["cli", "import", "load", "lookup", "settings", "startup", "total"]
+        assert sorted(latency["warm"].keys()) == ["load", "lookup", "total"]
+        for mode in latency.values():
+            for stats in mode.values():
+                assert 0 < stats["p50"] <= stats["p95"] <= stats["p99"]
+        print(latency_report(latency))
+
+    def test_measure_latency_exception(self):
+
+        from skytag.commonutils import measure_latency
+        with self.assertRaises(AttributeError):
+            measure_latency(
+                log=log,
+                ra=170.343532,
+                dec=-40.532255,
+                mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+                coldRepeats=0
+            )
+
+    # x-class-to-test-named-worker-function
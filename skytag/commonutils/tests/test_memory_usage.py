@@ -0,0 +1,151 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+import pytest
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# PEAK MEMORY IS MEASURED IN A NEW PROCESS FOR EACH SCENARIO AND COMPARED TO THE STORED BASELINE.
+# TO REFRESH THE BASELINE AFTER AN INTENDED CHANGE RUN:
+#   SKYTAG_UPDATE_MEMORY_BASELINE=1 pytest skytag/commonutils/tests/test_memory_usage.py
+baselinePath = pathToInputDir + "/memory_baseline.yaml"
+updateBaseline = bool(os.environ.get("SKYTAG_UPDATE_MEMORY_BASELINE"))
+# ALLOWED GROWTH OVER THE BASELINE (FRACTION, PLUS AN ABSOLUTE ALLOWANCE IN MB FOR NOISE)
+tracemallocTolerance = (0.10, 1.)
+rssTolerance = (0.25, 20.)
+
+memoryScript = """
+import sys, gc, json, resource, tracemalloc
+import numpy as np
+from astropy.table import Table
+import astropy_healpix
+import scipy.stats
+from skytag.commonutils.prepare_skymap import prepare_skymap
+from skytag.commonutils.prob_at_location import prob_at_location
+
+def vm(key):
+    try:
+        for line in open("/proc/self/status"):
+            if line.startswith(key):
+                return int(line.split()[1]) / 1024.
+    except IOError:
+        return None
+
+scenario, mapPath, size = sys.argv[1], sys.argv[2], int(sys.argv[3])
+rng = np.random.default_rng(33)
+ra = rng.uniform(0., 360., size)
+dec = np.degrees(np.arcsin(rng.uniform(-1., 1., size)))
+
+# WARM UP SO LAZY IMPORTS AND CACHES ARE NOT COUNTED, THEN RESET THE PEAK RSS (LINUX ONLY)
+prob_at_location(ra=0., dec=0., mapPath=mapPath)
+gc.collect()
+try:
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    rss0 = vm("VmRSS")
+except IOError:
+    rss0 = None
+
+tracemalloc.start()
+if scenario == "prepare":
+    skymap = prepare_skymap(mapPath=mapPath, useIndex=False)
+else:
+    probs = prob_at_location(ra=ra, dec=dec, mapPath=mapPath, probdensity=True)
+peak = tracemalloc.get_traced_memory()[1]
+rss1 = vm("VmHWM")
+print(json.dumps({"tracemallocMB": peak / 2.**20, "rssMB": None if rss0 is None or rss1 is None else rss1 - rss0}))
+"""
+
+scenarios = [
+    ("prepare", "bayestar", 0),
+    ("prepare", "bilby", 0),
+    ("lookup", "bayestar", 1000),
+    ("lookup", "bayestar", 100000),
+    ("lookup", "bayestar", 1000000),
+    ("lookup", "bilby", 1000),
+    ("lookup", "bilby", 100000),
+    ("lookup", "bilby", 1000000),
+]
+
+
+def measure(scenario, mapName, size):
+    import json
+    import subprocess
+    import sys
+    mapPath = pathToOutputDir + "/%(mapName)s.multiorder.fits" % locals()
+    output = subprocess.run([sys.executable, "-c", memoryScript, scenario, mapPath, str(size)], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_memory_usage(unittest.TestCase):
+
+    @pytest.mark.full
+    def test_memory_usage_function(self):
+
+        baseline = {}
+        if os.path.exists(baselinePath):
+            with open(baselinePath) as f:
+                baseline = yaml.safe_load(f) or {}
+
+        results = {}
+        for scenario, mapName, size in scenarios:
+            key = "%(scenario)s_%(mapName)s_%(size)s" % locals()
+            results[key] = measure(scenario, mapName, size)
+            print(key, results[key])
+            if updateBaseline:
+                continue
+            with self.subTest(key):
+                self.assertIn(key, baseline, "no memory baseline for %(key)s (set SKYTAG_UPDATE_MEMORY_BASELINE=1 to record one)" % locals())
+                limit = baseline[key]["tracemallocMB"] * (1. + tracemallocTolerance[0]) + tracemallocTolerance[1]
+                self.assertLessEqual(results[key]["tracemallocMB"], limit)
+                if results[key]["rssMB"] is not None and baseline[key].get("rssMB") is not None:
+                    limit = baseline[key]["rssMB"] * (1. + rssTolerance[0]) + rssTolerance[1]
+                    self.assertLessEqual(results[key]["rssMB"], limit)
+
+        if updateBaseline:
+            with open(baselinePath, "w") as f:
+                yaml.safe_dump({k: {m: round(v, 2) if v is not None else None for m, v in r.items()} for k, r in results.items()}, f, default_flow_style=False)
+
+    # x-class-to-test-named-worker-function
@@ -0,0 +1,147 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_plan_tiles(unittest.TestCase):
+
+    def test_plan_tiles_function(self):
+
+        from skytag.commonutils import plan_tiles
+        plan = plan_tiles(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            footprint={"width": 3.0, "height": 3.0},
+            budget=10
+        )
+        print(plan)
+        self.assertEqual(len(plan), 10)
+        gains = [p["prob"] for p in plan]
+        self.assertEqual(gains, sorted(gains, reverse=True))
+        self.assertAlmostEqual(sum(gains), plan[-1]["cumprob"], delta=0.001)
+
+    def test_plan_tiles_first_tile_function(self):
+
+        from skytag.commonutils import plan_tiles, fov_probability
+        from skytag.commonutils.prepare_skymap import prepare_skymap
+        skymap = prepare_skymap(mapPath=pathToOutputDir + "/bayestar.multiorder.fits", log=log)
+        for footprint in [{"width": 3.0, "height": 2.0}, {"radius": 1.5}]:
+            plan = plan_tiles(log=log, skymap=skymap, footprint=footprint, budget=1, pa=30.)
+            prob = fov_probability(log=log, mapPath=False, skymap=skymap, ra=[plan[0]["ra"]], dec=[plan[0]["dec"]], pa=[30.], footprint=footprint, samples=100000)[0]
+            # COVERAGE IS MEASURED ON CELLS ~1/8 OF THE FOOTPRINT ACROSS
+            self.assertAlmostEqual(plan[0]["prob"], prob, delta=0.03 * prob)
+
+    def test_plan_tiles_greedy_function(self):
+
+        import numpy as np
+        from skytag.commonutils import plan_tiles
+        from skytag.commonutils.prepare_skymap import prepare_skymap
+        from skytag.commonutils.fov_probability import _footprint_vertices
+        from skytag.commonutils.plan_tiles import _tile_cells, _cumulative_prob
+        skymap = prepare_skymap(mapPath=pathToOutputDir + "/bayestar.multiorder.fits", log=log)
+
+        # OVERLAPPING TILES AROUND THE MAP'S PEAK
+        rng = np.random.default_rng(7)
+        ra = 172. + rng.normal(0., 6., 300)
+        dec = -38. + rng.normal(0., 8., 300)
+        footprint = {"width": 4.0, "height": 4.0}
+        plan = plan_tiles(log=log, skymap=skymap, footprint=footprint, ra=ra, dec=dec, budget=15, level=7)
+
+        # A NAIVE GREEDY, SUMMING THE UNCOVERED PROBABILITY OF EVERY TILE EACH ROUND
+        vertices = _footprint_vertices(footprint)
+        tiles, cells = _tile_cells(ra=ra, dec=dec, pa=np.zeros(300), level=7, footprint=footprint, vertices=vertices, enclosingRadius=np.degrees(np.arctan(np.hypot(*vertices).max())))
+        shift = 2 * (29 - 7)
+        cellProb = dict(zip(cells.tolist(), (_cumulative_prob(skymap, (cells + 1) << shift) - _cumulative_prob(skymap, cells << shift)).tolist()))
+        tileCells = [set(cells[tiles == t].tolist()) for t in range(300)]
+        covered, naive = set(), []
+        for i in range(15):
+            gains = [sum(cellProb[c] for c in tc - covered) for tc in tileCells]
+            best = int(np.argmax(gains))
+            naive.append(best)
+            covered |= tileCells[best]
+        self.assertEqual([p["tile"] for p in plan], naive)
+        self.assertAlmostEqual(plan[-1]["cumprob"], sum(cellProb[c] for c in covered) * 100., delta=0.001)
+
+    def test_plan_tiles_many_tiles_function(self):
+
+        import time
+        import numpy as np
+        from skytag.commonutils import plan_tiles
+        from skytag.commonutils.prepare_skymap import prepare_skymap
+        skymap = prepare_skymap(mapPath=pathToOutputDir + "/bayestar.multiorder.fits", log=log)
+
+        # 10^4 ATLAS-LIKE TILES SPREAD OVER THE SKY
+        rng = np.random.default_rng(3)
+        ra = rng.uniform(0., 360., 10000)
+        dec = np.degrees(np.arcsin(rng.uniform(-1., 1., 10000)))
+        start = time.time()
+        plan = plan_tiles(log=log, skymap=skymap, footprint={"width": 5.46, "height": 5.46}, ra=ra, dec=dec, budget=100)
+        print("planned %s tiles in %0.2fs" % (len(plan), time.time() - start))
+        self.assertLessEqual(plan[-1]["cumprob"], 100.)
+        self.assertEqual(len(set(p["tile"] for p in plan)), len(plan))
+
+    def test_plan_tiles_function_exception(self):
+
+        from skytag.commonutils import plan_tiles
+        from skytag.commonutils.prepare_skymap import prepare_skymap
+        skymap = prepare_skymap(mapPath=pathToOutputDir + "/bayestar.multiorder.fits", log=log)
+        for kwargs in [
+            {"budget": 0},
+            {"footprint": [{"radius": 1.}]},
+            {"ra": [10., 20.], "dec": [10.]},
+            {"level": 25},
+            {"credible": 0.}
+        ]:
+            args = {"log": log, "skymap": skymap, "footprint": {"radius": 1.}}
+            args.update(kwargs)
+            with self.assertRaises(AttributeError):
+                plan_tiles(**args)
+
+        regional = prepare_skymap(mapPath=pathToOutputDir + "/bayestar.multiorder.fits", log=log, region={"ra": 170., "dec": -40., "radius": 5.})
+        with self.assertRaises(AttributeError):
+            plan_tiles(log=log, skymap=regional, footprint={"radius": 1.})
+
+    # x-class-to-test-named-worker-function
@@ -0,0 +1,271 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_prepare_skymap(unittest.TestCase):
+
+    def test_prepare_skymap_function(self):
+
+        from skytag.commonutils import prepare_skymap
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        assert np.all(np.diff(skymap['INDEX29']) > 0)
+        assert abs(skymap['CUMPROB'].max() - 1.) < 1e-3
+        assert 'DISTMU' in skymap
+        print(skymap['meta']['MJD-OBS'])
+
+    def test_prepare_skymap_2d_function(self):
+
+        from skytag.commonutils import prepare_skymap
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bilby.multiorder.fits"
+        )
+        assert 'DISTMU' not in skymap
+
+    def test_match_skymap_pixels_function(self):
+
+        from skytag.commonutils import prepare_skymap
+        from skytag.commonutils.prepare_skymap import lonlat_to_index29, match_skymap_pixels
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        rows = match_skymap_pixels(skymap, lonlat_to_index29([10.343234, 170.343532], [14.345532, -40.532255]))
+        print(skymap['CUMPROB'][rows])
+
+    def test_prepare_skymap_region_function(self):
+
+        from skytag.commonutils import prepare_skymap
+        from skytag.commonutils.prepare_skymap import lonlat_to_index29, match_skymap_pixels
+        import numpy as np
+        full = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        rng = np.random.default_rng(28)
+        ra = rng.uniform(0., 360., 20000)
+        dec = np.degrees(np.arcsin(rng.uniform(-1., 1., 20000)))
+        fullRows = match_skymap_pixels(full, lonlat_to_index29(ra, dec))
+
+        def sep(r, d):
+            return np.degrees(np.arccos(np.clip(np.sin(np.radians(dec)) * np.sin(np.radians(d)) + np.cos(np.radians(dec)) * np.cos(np.radians(d)) * np.cos(np.radians(ra - r)), -1., 1.)))
+
+        def in_box(box):
+            return (dec >= box["decMin"]) & (dec <= box["decMax"]) & ((ra - box["raMin"]) % 360. <= (box["raMax"] - box["raMin"]) % 360.)
+
+        box = {"raMin": 100., "raMax": 140., "decMin": -20., "decMax": 10.}
+        wrapBox = {"raMin": 350., "raMax": 20., "decMin": -10., "decMax": 30.}
+        regions = [
+            ({"ra": 170., "dec": -40., "radius": 5.}, sep(170., -40.) < 5.),
+            ({"ra": [170., 20.], "dec": [-40., 30.], "radius": 8.}, (sep(170., -40.) < 8.) | (sep(20., 30.) < 8.)),
+            ({"ra": ra[::100], "dec": dec[::100]}, np.arange(len(ra)) % 100 == 0),
+            (box, in_box(box)),
+            (wrapBox, in_box(wrapBox))
+        ]
+        for region, inside in regions:
+            assert inside.any()
+            skymap = prepare_skymap(
+                log=log,
+                mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+                region=region
+            )
+            assert len(skymap['UNIQ']) < len(full['UNIQ'])
+            rows = match_skymap_pixels(skymap, lonlat_to_index29(ra, dec))
+            # EVERY LOCATION IN THE REGION IS MATCHED, WITH THE SAME CREDIBLE LEVEL AS THE FULL MAP
+            assert (rows[inside] >= 0).all()
+            assert np.array_equal(skymap['CUMPROB'][rows[inside]], full['CUMPROB'][fullRows[inside]])
+            assert np.array_equal(skymap['DISTMU'][rows[inside]], full['DISTMU'][fullRows[inside]])
+
+    def test_prepare_skymap_region_exception(self):
+
+        from skytag.commonutils import prepare_skymap
+        for region in [{"raMin": 10.}, {"ra": 10.}, {"ra": [10., 11.], "dec": [1.]}, {"radius": 2.}, {"raMin": 0., "raMax": 10., "decMin": 10., "decMax": -10.}, "cone"]:
+            with self.assertRaises(AttributeError):
+                prepare_skymap(
+                    log=log,
+                    mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+                    region=region
+                )
+
+    def test_match_skymap_pixels_partial_function(self):
+
+        from skytag.commonutils import prepare_skymap
+        from skytag.commonutils.prepare_skymap import lonlat_to_index29, match_skymap_pixels, take_rows
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            region={"ra": 170., "dec": -40., "radius": 2.}
+        )
+        ipix = lonlat_to_index29([170., 10.], [-40., 60.])
+        rows = match_skymap_pixels(skymap, ipix)
+        assert rows[0] >= 0
+        assert rows[1] == -1
+        cumprob = take_rows(skymap['CUMPROB'], rows)
+        assert not np.isnan(cumprob[0])
+        assert np.isnan(cumprob[1])
+
+    def test_match_skymap_pixels_strategies_function(self):
+
+        from skytag.commonutils import prepare_skymap
+        from skytag.commonutils.prepare_skymap import lonlat_to_index29, match_skymap_pixels, choose_join_strategy
+        import numpy as np
+        rng = np.random.default_rng(34)
+        ra = rng.uniform(0., 360., 20000)
+        dec = np.degrees(np.arcsin(rng.uniform(-1., 1., 20000)))
+        ipix = lonlat_to_index29(ra, dec)
+        # INCLUDE THE FIRST AND LAST LEVEL-29 PIXELS AND REPEATED INDICES
+        ipix = np.concatenate([ipix, [0, 12 * 4**29 - 1], ipix[:50]])
+        for mapName in ["bayestar", "bilby"]:
+            for region in [False, {"ra": 170., "dec": -40., "radius": 15.}]:
+                skymap = prepare_skymap(
+                    log=log,
+                    mapPath=pathToOutputDir + "/%(mapName)s.multiorder.fits" % locals(),
+                    region=region
+                )
+                expected = match_skymap_pixels(skymap, ipix, strategy="search")
+                for strategy in ["levels", "merge", "auto"]:
+                    assert np.array_equal(match_skymap_pixels(skymap, ipix, strategy=strategy), expected), (mapName, region, strategy)
+                sortedIpix = np.sort(ipix)
+                assert np.array_equal(match_skymap_pixels(skymap, sortedIpix, strategy="merge"), match_skymap_pixels(skymap, sortedIpix, strategy="search"))
+
+    def test_choose_join_strategy_function(self):
+
+        from skytag.commonutils import prepare_skymap
+        from skytag.commonutils.prepare_skymap import lonlat_to_index29, match_skymap_pixels, choose_join_strategy
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        rng = np.random.default_rng(34)
+        ipix = lonlat_to_index29(rng.uniform(0., 360., 300000), np.degrees(np.arcsin(rng.uniform(-1., 1., 300000))))
+        assert choose_join_strategy(skymap, ipix[:10]) == "search"
+        assert choose_join_strategy(skymap, ipix[:100000]) == "search"
+        assert choose_join_strategy(skymap, np.sort(ipix)) == "merge"
+        assert choose_join_strategy(skymap, ipix) == "levels"
+        # ONCE THE LEVEL TABLE IS BUILT EVEN SMALL CATALOGUES USE IT
+        match_skymap_pixels(skymap, ipix)
+        assert choose_join_strategy(skymap, ipix[:10]) == "levels"
+
+    def test_match_skymap_pixels_strategy_exception(self):
+
+        from skytag.commonutils import prepare_skymap
+        from skytag.commonutils.prepare_skymap import match_skymap_pixels
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        with self.assertRaises(AttributeError):
+            match_skymap_pixels(skymap, np.array([0]), strategy="hash")
+
+    def test_prepare_skymap_in_memory_function(self):
+
+        from skytag.commonutils import prepare_skymap, prob_at_location
+        from skytag.commonutils.prepare_skymap import read_skymap_table
+        import numpy as np
+        import gzip
+        import io
+        for mapName in ["bayestar", "bilby"]:
+            mapPath = pathToOutputDir + "/%s.multiorder.fits" % mapName
+            with open(mapPath, "rb") as f:
+                contents = f.read()
+            expected = prepare_skymap(log=log, mapPath=mapPath, useIndex=False)
+            region = {"ra": 170., "dec": -40., "radius": 5.}
+            expectedRegion = prepare_skymap(log=log, mapPath=mapPath, region=region, useIndex=False)
+
+            for source in [contents, bytearray(contents), memoryview(contents), io.BytesIO(contents), io.BufferedReader(io.BytesIO(contents)), gzip.compress(contents)]:
+                skymap = prepare_skymap(log=log, mapPath=source)
+                for k in expected:
+                    if k == "meta":
+                        self.assertEqual(skymap[k], expected[k])
+                    elif k != "region":
+                        np.testing.assert_array_equal(skymap[k], expected[k])
+            skymap = prepare_skymap(log=log, mapPath=contents, region=region)
+            np.testing.assert_array_equal(skymap['CUMPROB'], expectedRegion['CUMPROB'])
+
+            # THE COLUMNS ARE VIEWS OF THE GIVEN BUFFER, NOT COPIES
+            table = read_skymap_table(contents)
+            assert np.shares_memory(np.asarray(table['PROBDENSITY']), np.frombuffer(contents, dtype=np.uint8))
+
+            self.assertEqual(prob_at_location(log=log, ra=[10.343234, 170.343532], dec=[14.345532, -40.532255], mapPath=io.BytesIO(contents), distance=True), prob_at_location(log=log, ra=[10.343234, 170.343532], dec=[14.345532, -40.532255], mapPath=mapPath, distance=True))
+
+    def test_prepare_skymap_in_memory_exception(self):
+
+        from skytag.commonutils import prepare_skymap
+        with self.assertRaises(AttributeError):
+            prepare_skymap(log=log, mapPath=b"not a skymap")
+        with self.assertRaises(AttributeError):
+            prepare_skymap(log=log, mapPath=12345)
+
+    def test_frame_to_icrs_function(self):
+
+        from skytag.commonutils.prepare_skymap import frame_to_icrs
+        from astropy.coordinates import SkyCoord, BarycentricMeanEcliptic
+        from astropy import units as u
+        import numpy as np
+        rng = np.random.default_rng(44)
+        lon = np.concatenate([rng.uniform(0., 360., 100000), [0., 359.999999, 120., 45.]])
+        lat = np.concatenate([np.degrees(np.arcsin(rng.uniform(-1., 1., 100000))), [90., -90., 89.9999999, 0.]])
+        for frame, astropyFrame in [("galactic", "galactic"), ("ecliptic", BarycentricMeanEcliptic())]:
+            ra, dec = frame_to_icrs(lon, lat, frame)
+            expected = SkyCoord(lon * u.deg, lat * u.deg, frame=astropyFrame).icrs
+            separation = SkyCoord(ra * u.deg, dec * u.deg).separation(expected).to_value(u.arcsec)
+            # WELL BELOW THE ~0.4 MILLIARCSECOND LEVEL-29 PIXELS
+            self.assertLess(separation.max(), 1e-6)
+            self.assertTrue(((ra >= 0.) & (ra < 360.)).all())
+        ra, dec = frame_to_icrs(lon, lat, "ICRS")
+        self.assertIs(ra, lon)
+        with self.assertRaises(AttributeError):
+            frame_to_icrs(lon, lat, "supergalactic")
+
+    # x-class-to-test-named-worker-function
@@ -119,6 +119,118 @@ class test_prob_at_location(unittest.TestCase):
         )
         print(prob, deltas, distance)
 
+    def test_prob_at_location_workers_function(self):
+        from skytag.commonutils import prob_at_location
+        ra = [10.343234, 170.343532, 230.1, 5.2]
+        dec = [14.345532, -40.532255, 20.4, -60.3]
+        serial = prob_at_location(
+            log=log,
+            ra=ra,
+            dec=dec,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            distance=True
+        )
+        parallel = prob_at_location(
+            log=log,
+            ra=ra,
+            dec=dec,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            distance=True,
+            workers=2
+        )
+        self.assertEqual(serial, parallel)
+
+    def test_prob_at_location_region_function(self):
+        from skytag.commonutils import prob_at_location
+        import numpy as np
+        ra = [170.343532, 171.1, 169.5, 172.3]
+        dec = [-40.532255, -41.2, -39.8, -40.1]
+        full = prob_at_location(
+            log=log,
+            ra=ra,
+            dec=dec,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            distance=True,
+            probdensity=True
+        )
+        for region in [True, {"ra": 170.5, "dec": -40.5, "radius": 3.}]:
+            restricted = prob_at_location(
+                log=log,
+                ra=ra,
+                dec=dec,
+                mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+                distance=True,
+                probdensity=True,
+                region=region
+            )
+            self.assertEqual(full, restricted)
+
+    def test_prob_at_location_region_outside_function(self):
+        from skytag.commonutils import prob_at_location
+        import numpy as np
+        for workers in [1, 2]:
+            prob, distance = prob_at_location(
+                log=log,
+                ra=[170.343532, 10.343234],
+                dec=[-40.532255, 14.345532],
+                mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+                distance=True,
+                region={"ra": 170.343532, "dec": -40.532255, "radius": 1.},
+                workers=workers
+            )
+            assert not np.isnan(prob[0])
+            assert not np.isnan(distance[0][0])
+            # THE SECOND LOCATION IS OUTSIDE THE CONE
+            assert np.isnan(prob[1])
+            assert np.isnan(distance[1][0]) and np.isnan(distance[1][1])
+
+    def test_prob_at_location_region_workers_function(self):
+        from skytag.commonutils import prob_at_location
+        import numpy as np
+        ra = list(np.linspace(165., 175., 20))
+        dec = list(np.linspace(-45., -35., 20))
+        serial = prob_at_location(
+            log=log,
+            ra=ra,
+            dec=dec,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            region=True
+        )
+        parallel = prob_at_location(
+            log=log,
+            ra=ra,
+            dec=dec,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            region=True,
+            workers=2
+        )
+        self.assertEqual(serial, parallel)
+
+    def test_prob_at_location_frame_function(self):
+
+        from skytag.commonutils import prob_at_location, coordinate_set, annotate_dataframe
+        from astropy.coordinates import SkyCoord, BarycentricMeanEcliptic
+        from astropy import units as u
+        import numpy as np
+        import pandas as pd
+        rng = np.random.default_rng(44)
+        ra, dec = rng.uniform(0., 360., 5000), np.degrees(np.arcsin(rng.uniform(-1., 1., 5000)))
+        mapPath = pathToOutputDir + "/bayestar.multiorder.fits"
+        expected = prob_at_location(log=log, ra=ra, dec=dec, mapPath=mapPath, distance=True)
+
+        coords = SkyCoord(ra * u.deg, dec * u.deg)
+        for frame, astropyFrame in [("galactic", "galactic"), ("ecliptic", BarycentricMeanEcliptic())]:
+            converted = coords.transform_to(astropyFrame).spherical
+            lon, lat = converted.lon.to_value(u.deg), converted.lat.to_value(u.deg)
+            results = prob_at_location(log=log, ra=lon, dec=lat, mapPath=mapPath, distance=True, frame=frame)
+            self.assertEqual(results[0], expected[0])
+            np.testing.assert_equal(results[1], expected[1])
+            self.assertEqual(prob_at_location(log=log, ra=coordinate_set(log=log, ra=lon, dec=lat, frame=frame), dec=None, mapPath=mapPath), expected[:1])
+            annotated = annotate_dataframe(log=log, df=pd.DataFrame({"lon": lon, "lat": lat}), mapPath=mapPath, ra="lon", dec="lat", frame=frame)
+            self.assertEqual(annotated["prob"].tolist(), expected[0])
+        with self.assertRaises(AttributeError):
+            prob_at_location(log=log, ra=ra, dec=dec, mapPath=mapPath, frame="fk4")
+
     def test_mixed_len_function_exception(self):
 
         from skytag.commonutils import prob_at_location
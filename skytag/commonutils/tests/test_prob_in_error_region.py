@@ -0,0 +1,123 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_prob_in_error_region(unittest.TestCase):
+
+    def test_prob_in_error_region_function(self):
+
+        from skytag.commonutils import prob_in_error_region
+        probs, bestLevels = prob_in_error_region(
+            log=log,
+            ra=[10.343234, 170.343532],
+            dec=[14.345532, -40.532255],
+            radius=[0.5, 2.0],
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        print(probs, bestLevels)
+
+    def test_prob_in_error_region_circles_function(self):
+
+        from skytag.commonutils import prob_in_error_region, prob_at_location, fov_probability, prepare_skymap
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        rng = np.random.default_rng(36)
+        ra = list(rng.uniform(150., 190., 200))
+        dec = list(rng.uniform(-60., -20., 200))
+
+        # A POINT-LIKE SOURCE HAS THE CREDIBLE LEVEL OF ITS POSITION
+        probs, bestLevels = prob_in_error_region(log=log, ra=ra, dec=dec, radius=0., skymap=skymap)
+        assert bestLevels == prob_at_location(log=log, ra=ra, dec=dec, mapPath=False, skymap=skymap)[0]
+        assert probs == [0.] * 200
+
+        # LARGER ERROR CIRCLES HOLD MORE PROBABILITY, AND NO ERROR REGION HAS A WORSE BEST LEVEL THAN ITS CENTRE
+        pointLevels = np.array(bestLevels)
+        previousProbs = probs
+        for radius in [0.05, 0.5, 2., 5.]:
+            probs, bestLevels = prob_in_error_region(log=log, ra=ra, dec=dec, radius=radius, samples=2000, skymap=skymap)
+            assert (np.array(bestLevels) <= pointLevels).all()
+            assert (np.array(probs) >= np.array(previousProbs) - 0.01).all()
+            previousProbs = probs
+        # A 5 DEGREE CIRCLE REACHES FAR BETTER CREDIBLE LEVELS THAN MOST POSITIONS
+        assert np.median(bestLevels) < np.median(pointLevels)
+
+        # ERROR CIRCLES AGREE WITH CIRCULAR FIELDS OF VIEW
+        fov = fov_probability(log=log, ra=ra, dec=dec, footprint={"radius": 5.}, samples=2000, skymap=skymap)
+        np.testing.assert_allclose(probs, fov, atol=0.05)
+
+    def test_prob_in_error_region_ellipses_function(self):
+
+        from skytag.commonutils import prob_in_error_region, prepare_skymap
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        ra, dec = [170.343532, 165.1, 10.343234], [-40.532255, -35.2, 14.345532]
+        circle = prob_in_error_region(log=log, ra=ra, dec=dec, radius=1.5, skymap=skymap)
+        ellipse = prob_in_error_region(log=log, ra=ra, dec=dec, semiMajor=1.5, semiMinor=1.5, pa=[0., 30., 60.], skymap=skymap)
+        np.testing.assert_allclose(circle[0], ellipse[0], atol=0.01)
+
+        # A MAJOR AXIS AT PA=90 RUNS EAST-WEST, LIKE A MINOR AXIS AT PA=0 (UP TO SAMPLING)
+        eastWest = prob_in_error_region(log=log, ra=ra, dec=dec, semiMajor=3., semiMinor=1., pa=90., samples=5000, skymap=skymap)
+        northSouth = prob_in_error_region(log=log, ra=ra, dec=dec, semiMajor=3., semiMinor=1., pa=0., samples=5000, skymap=skymap)
+        swapped = prob_in_error_region(log=log, ra=ra, dec=dec, semiMajor=1., semiMinor=3., pa=0., samples=5000, skymap=skymap)
+        np.testing.assert_allclose(eastWest[0], swapped[0], atol=0.02)
+        assert eastWest[0] != northSouth[0]
+
+    def test_prob_in_error_region_exception(self):
+
+        from skytag.commonutils import prob_in_error_region
+        mapPath = pathToOutputDir + "/bayestar.multiorder.fits"
+        for kwargs in [{}, {"semiMajor": 1.}, {"radius": -1.}, {"radius": 95.}, {"radius": [1., 2., 3.]}]:
+            with self.assertRaises(AttributeError):
+                prob_in_error_region(log=log, ra=[10., 20.], dec=[0., 0.], mapPath=mapPath, **kwargs)
+
+    # x-class-to-test-named-worker-function
@@ -0,0 +1,167 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_result_cache(unittest.TestCase):
+
+    def test_result_cache_function(self):
+
+        from skytag.commonutils import prob_at_location, result_cache
+        cache = result_cache(log=log, cachePath=pathToOutputDir + "/results.sqlite")
+        prob, deltas = prob_at_location(
+            log=log,
+            ra=[10.343234, 170.343532],
+            dec=[14.345532, -40.532255],
+            mjd=[60034.257381, 60063.257381],
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits",
+            cache=cache
+        )
+        self.assertEqual(prob, [100.0, 74.55])
+        self.assertEqual(deltas, [-28.11018, 0.88982])
+
+    def test_result_cache_rerun_function(self):
+
+        from skytag.commonutils import prob_at_location, result_cache
+        from unittest import mock
+        import importlib
+        import numpy as np
+        prepare_module = importlib.import_module("skytag.commonutils.prepare_skymap")
+
+        rng = np.random.default_rng(37)
+        ra, dec = rng.uniform(0., 360., 500), np.degrees(np.arcsin(rng.uniform(-1., 1., 500)))
+        mjd = rng.uniform(60000., 60100., 500).tolist()
+
+        for mapName, distance in [("bayestar", True), ("bilby", True), ("bayestar", False)]:
+            mapPath = pathToOutputDir + "/%s.multiorder.fits" % mapName
+            cache = result_cache(log=log, cachePath=pathToOutputDir + "/rerun_%s_%s.sqlite" % (mapName, distance))
+            expected = prob_at_location(log=log, ra=ra, dec=dec, mjd=mjd, mapPath=mapPath, distance=distance, probdensity=True)
+
+            # THE FIRST RUN COMPUTES HALF THE LOCATIONS, THE SECOND ONLY THE OTHER HALF, THE THIRD NOTHING
+            for subset, computed in [(slice(0, 250), 250), (slice(None), 250), (slice(None), 0)]:
+                with mock.patch.object(prepare_module, "prepare_skymap", wraps=prepare_module.prepare_skymap) as prepare:
+                    results = prob_at_location(log=log, ra=ra[subset], dec=dec[subset], mjd=mjd[subset], mapPath=mapPath, distance=distance, probdensity=True, cache=cache)
+                self.assertEqual(prepare.call_count, 1 if computed else 0)
+                np.testing.assert_equal(results, [r[subset] for r in expected])
+
+    def test_result_cache_region_function(self):
+
+        from skytag.commonutils import prob_at_location, result_cache
+        cache = result_cache(log=log, cachePath=pathToOutputDir + "/region.sqlite")
+        mapPath = pathToOutputDir + "/bayestar.multiorder.fits"
+        kwargs = {"log": log, "ra": [10.343234, 170.343532], "dec": [14.345532, -40.532255], "mapPath": mapPath, "probdensity": True}
+
+        # LOCATIONS OUTSIDE A RESTRICTED REGION ARE NOT CACHED AS nan
+        region = {"ra": 170.343532, "dec": -40.532255, "radius": 1.}
+        results = prob_at_location(region=region, cache=cache, **kwargs)
+        self.assertTrue(results[0][0] != results[0][0])
+        self.assertEqual(results[0][1], 74.55)
+        self.assertEqual(prob_at_location(cache=cache, **kwargs), prob_at_location(**kwargs))
+
+    def test_result_cache_changed_map_function(self):
+
+        from skytag.commonutils import prob_at_location, result_cache
+        import shutil
+        cache = result_cache(log=log, cachePath=pathToOutputDir + "/changed.sqlite")
+        mapPath = pathToOutputDir + "/changing.multiorder.fits"
+        kwargs = {"log": log, "ra": [10.343234, 170.343532], "dec": [14.345532, -40.532255], "mapPath": mapPath}
+
+        shutil.copyfile(pathToOutputDir + "/bayestar.multiorder.fits", mapPath)
+        bayestar = prob_at_location(cache=cache, **kwargs)
+
+        # THE MAP IS REPLACED IN PLACE: THE CACHED RESULTS OF THE OLD MAP ARE NOT SERVED
+        shutil.copyfile(pathToOutputDir + "/bilby.multiorder.fits", mapPath)
+        bilby = prob_at_location(cache=cache, **kwargs)
+        self.assertEqual(bilby, prob_at_location(**kwargs))
+        self.assertNotEqual(bilby, bayestar)
+
+    def test_result_cache_eviction_function(self):
+
+        from skytag.commonutils import prob_at_location, result_cache
+        import sqlite3
+        import numpy as np
+        cache = result_cache(log=log, cachePath=pathToOutputDir + "/eviction.sqlite", maxEntries=100)
+        mapPath = pathToOutputDir + "/bayestar.multiorder.fits"
+        rng = np.random.default_rng(7)
+        for i in range(5):
+            ra, dec = rng.uniform(0., 360., 60), rng.uniform(-90., 90., 60)
+            prob_at_location(log=log, ra=ra, dec=dec, mapPath=mapPath, cache=cache)
+            count = sqlite3.connect(cache.cachePath).execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            self.assertLessEqual(count, 100)
+
+        # THE MOST RECENT LOCATIONS SURVIVE EVICTION
+        found, values = cache.get(cache.map_key(mapPath)[0], ra, dec)
+        self.assertTrue(found.all())
+
+    def test_result_cache_in_memory_function(self):
+
+        from skytag.commonutils import prob_at_location, result_cache
+        import io
+        cache = result_cache(log=log, cachePath=pathToOutputDir + "/in_memory.sqlite")
+        mapPath = pathToOutputDir + "/bayestar.multiorder.fits"
+        with open(mapPath, "rb") as f:
+            contents = f.read()
+        kwargs = {"log": log, "ra": [10.343234, 170.343532], "dec": [14.345532, -40.532255], "mjd": [60034.257381, 60063.257381], "distance": True}
+
+        # THE SAME MAP READ FROM DISK OR HELD IN MEMORY SHARES CACHED RESULTS
+        expected = prob_at_location(mapPath=mapPath, cache=cache, **kwargs)
+        self.assertEqual(cache.map_key(contents), cache.map_key(mapPath))
+        self.assertEqual(prob_at_location(mapPath=io.BytesIO(contents), cache=cache, **kwargs), expected)
+        self.assertEqual(prob_at_location(mapPath=io.BufferedReader(io.BytesIO(contents)), cache=cache, **kwargs), expected)
+
+    def test_result_cache_function_exception(self):
+
+        from skytag.commonutils import prob_at_location, result_cache
+        with self.assertRaises(AttributeError):
+            result_cache(log=log, cachePath=pathToOutputDir + "/bad.sqlite", maxEntries=0)
+        with self.assertRaises(AttributeError):
+            prob_at_location(log=log, ra=10., dec=14., mapPath=False, cache=result_cache(log=log, cachePath=pathToOutputDir + "/bad.sqlite"))
+
+        # x-print-testpage-for-pessto-marshall-web-object
+
+    # x-class-to-test-named-worker-function
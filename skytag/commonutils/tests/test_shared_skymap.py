@@ -0,0 +1,120 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_shared_skymap(unittest.TestCase):
+
+    def test_shared_skymap_function(self):
+
+        from skytag.commonutils import prepare_skymap, shared_skymap
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        ra = np.linspace(0., 359., 200)
+        dec = np.linspace(-89., 89., 200)
+        with shared_skymap(log=log, skymap=skymap) as sharedMap:
+            rows, distMean, distStd = sharedMap.lookup(ra=ra, dec=dec, workers=2, distance=True)
+        assert sharedMap.blocks == {}
+        from skytag.commonutils.prepare_skymap import lonlat_to_index29, match_skymap_pixels
+        assert np.array_equal(rows, match_skymap_pixels(skymap, lonlat_to_index29(ra, dec)))
+        assert len(distMean) == 200
+
+    def test_attach_shared_skymap_function(self):
+
+        from skytag.commonutils import prepare_skymap, shared_skymap
+        from skytag.commonutils.shared_skymap import attach_shared_skymap
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bilby.multiorder.fits"
+        )
+        sharedMap = shared_skymap(log=log, skymap=skymap)
+        arrays, blocks = attach_shared_skymap(sharedMap.descriptor)
+        assert np.array_equal(arrays['CUMPROB'], skymap['CUMPROB'])
+        del arrays
+        for b in blocks:
+            b.close()
+        sharedMap.close()
+        assert sharedMap.blocks == {}
+
+    def test_shared_skymap_release_function(self):
+
+        from skytag.commonutils import prepare_skymap, shared_skymap
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        cumprob = skymap['CUMPROB'].copy()
+        with shared_skymap(log=log, skymap=skymap, release=True) as sharedMap:
+            # THE PRIVATE ARRAYS ARE NOW VIEWS OF THE SHARED BLOCKS
+            assert np.array_equal(skymap['CUMPROB'], cumprob)
+            assert not skymap['CUMPROB'].flags['OWNDATA']
+        assert sharedMap.blocks == {}
+        assert 'CUMPROB' not in skymap
+        assert 'UNIQ' in skymap
+
+    def test_shared_skymap_worker_exception(self):
+
+        from skytag.commonutils import prepare_skymap, shared_skymap
+        import numpy as np
+        skymap = prepare_skymap(
+            log=log,
+            mapPath=pathToOutputDir + "/bayestar.multiorder.fits"
+        )
+        before = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+        with shared_skymap(log=log, skymap=skymap) as sharedMap:
+            # A NON-NUMERIC DISTANCE GRID LIMIT MAKES THE WORKERS RAISE
+            with self.assertRaises(Exception):
+                sharedMap.lookup(ra=np.array([10., 20.]), dec=np.array([10., 15.]), workers=2, distance=True, rmax="not a number")
+        assert sharedMap.blocks == {}
+        if os.path.isdir("/dev/shm"):
+            assert set(os.listdir("/dev/shm")) - before == set()
+
+    # x-class-to-test-named-worker-function
@@ -0,0 +1,111 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+
+class test_sky_moc(unittest.TestCase):
+
+    def test_sky_moc_function(self):
+
+        from skytag.commonutils import sky_moc
+        from skytag.commonutils.sky_moc import read_moc
+        import astropy_healpix as ah
+        import numpy as np
+
+        # OVERLAPPING, TOUCHING AND EMPTY RANGES ARE MERGED INTO SORTED, DISJOINT RANGES
+        cell = 4**27  # ONE LEVEL-2 CELL IN LEVEL-29 INDICES
+        moc = sky_moc(log=log, ranges=[[5 * cell, 7 * cell], [0, 4 * cell], [4 * cell, 5 * cell], [2 * cell, 3 * cell], [9 * cell, 9 * cell]])
+        self.assertEqual(moc.ranges.tolist(), [[0, 7 * cell]])
+
+        # NORMALISED: FOUR LEVEL-2 CELLS MAKE ONE LEVEL-1 CELL
+        self.assertEqual(moc.to_string(), "1/0 2/4-6")
+        self.assertEqual(moc.to_json(), '{"1": [0], "2": [4, 5, 6]}')
+        self.assertEqual(len(moc), 4)
+        self.assertAlmostEqual(moc.area, 7. / 192. * 41252.96125, places=4)
+        self.assertEqual(sky_moc(log=log, ranges=[[0, 12 * 4**29]]).to_string(), "0/0-11")
+
+        # THE NORMALISED CELLS COVER EXACTLY THE RANGES, FOR RANDOM RANGES
+        rng = np.random.default_rng(2)
+        starts = rng.integers(0, 12 * 4**29, 300)
+        moc = sky_moc(log=log, ranges=np.stack([starts, starts + rng.integers(1, 4**26, 300)], axis=1))
+        uniq = moc.uniq()
+        self.assertTrue(np.all(uniq[1:] > uniq[:-1]))
+        levels, ipix = ah.uniq_to_level_ipix(uniq)
+        shift = 2 * (29 - levels.astype(np.int64))
+        self.assertEqual(sky_moc(log=log, ranges=np.stack([ipix << shift, (ipix + 1) << shift], axis=1)).ranges.tolist(), moc.ranges.tolist())
+        # NO FOUR SIBLING CELLS ARE LEFT UNMERGED
+        parents = (uniq // 4)[levels > 0]
+        self.assertLess(np.bincount(np.unique(parents, return_inverse=True)[1]).max(), 4)
+
+        # FITS ROUND TRIP
+        mocPath = moc.write(pathToOutputDir + "/random.moc.fits")
+        self.assertEqual(read_moc(log=log, mocPath=mocPath).ranges.tolist(), moc.ranges.tolist())
+
+    def test_sky_moc_contains_function(self):
+
+        from skytag.commonutils import sky_moc
+        from skytag.commonutils.prepare_skymap import lonlat_to_index29
+        import numpy as np
+        rng = np.random.default_rng(3)
+        ra, dec = rng.uniform(0., 360., 100000), np.degrees(np.arcsin(rng.uniform(-1., 1., 100000)))
+        ipix = lonlat_to_index29(ra, dec)
+        starts = np.sort(rng.integers(0, 12 * 4**29, 50))
+        ranges = np.stack([starts, starts + 4**27], axis=1)
+        moc = sky_moc(log=log, ranges=ranges)
+        expected = ((ipix[:, None] >= ranges[:, 0]) & (ipix[:, None] < ranges[:, 1])).any(axis=1)
+        np.testing.assert_array_equal(moc.contains(ra=ra, dec=dec), expected)
+        self.assertFalse(sky_moc(log=log, ranges=np.zeros((0, 2))).contains(ra=10., dec=20.)[0])
+
+    def test_sky_moc_function_exception(self):
+
+        from skytag.commonutils.sky_moc import read_moc
+        from astropy.io import fits
+        import numpy as np
+        tablePath = pathToOutputDir + "/not_a_moc.fits"
+        fits.BinTableHDU.from_columns([fits.Column(name="PROB", format="D", array=np.ones(3))]).writeto(tablePath, overwrite=True)
+        with self.assertRaises(AttributeError):
+            read_moc(log=log, mocPath=tablePath)
@@ -0,0 +1,129 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_skymap_archive(unittest.TestCase):
+
+    def test_skymap_archive_function(self):
+
+        from skytag.commonutils import skymap_archive, prob_at_location, synthetic_skymap
+        import numpy as np
+        mapDir = pathToOutputDir + "/archive_maps/"
+        os.makedirs(mapDir)
+        for name in ["bayestar", "bilby"]:
+            shutil.copyfile(pathToInputDir + "/%(name)s.multiorder.fits" % locals(), mapDir + "%(name)s.multiorder.fits" % locals())
+        for seed in range(4):
+            synthetic_skymap(log=log, pathToOutput=mapDir + "S%(seed)s.multiorder.fits" % locals(), pixels=20000, blobs=2, seed=seed)
+
+        archive = skymap_archive(
+            log=log,
+            archivePath=pathToOutputDir + "/archive.skytag"
+        )
+        self.assertEqual(archive.build(mapPaths=mapDir), 6)
+        self.assertEqual(sorted(archive.events), ["S0", "S1", "S2", "S3", "bayestar", "bilby"])
+
+        rng = np.random.default_rng(43)
+        ra, dec = rng.uniform(0., 360., 3000), np.degrees(np.arcsin(rng.uniform(-1., 1., 3000)))
+        ra[:2], dec[:2] = [10.343234, 170.343532], [14.345532, -40.532255]
+        for credible in [50., 90., 99.]:
+            expected = [[] for r in ra]
+            for name in archive.events:
+                probs = prob_at_location(log=log, ra=ra, dec=dec, mapPath=mapDir + "%(name)s.multiorder.fits" % locals())[0]
+                for i, p in enumerate(probs):
+                    if p <= credible:
+                        expected[i].append((name, p))
+            # A NEW ARCHIVE OBJECT READS THE INDEX BACK FROM DISK
+            matches = skymap_archive(log=log, archivePath=pathToOutputDir + "/archive.skytag").query(ra=ra, dec=dec, credible=credible)
+            for m, e in zip(matches, expected):
+                self.assertEqual(sorted(m), sorted(e))
+                self.assertEqual([p for n, p in m], sorted(p for n, p in m))
+        self.assertIn(("bayestar", 74.55), archive.query(ra=170.343532, dec=-40.532255)[0])
+
+    def test_skymap_archive_rebuild_function(self):
+
+        from skytag.commonutils import skymap_archive
+        from unittest import mock
+        import importlib
+        prepare_module = importlib.import_module("skytag.commonutils.prepare_skymap")
+        mapDir = pathToOutputDir + "/rebuild_maps/"
+        os.makedirs(mapDir)
+        for name in ["bayestar", "bilby"]:
+            shutil.copyfile(pathToInputDir + "/%(name)s.multiorder.fits" % locals(), mapDir + "%(name)s.multiorder.fits" % locals())
+        archivePath = pathToOutputDir + "/rebuild.skytag"
+        skymap_archive(log=log, archivePath=archivePath).build(mapPaths=mapDir)
+        before = skymap_archive(log=log, archivePath=archivePath).query(ra=170.343532, dec=-40.532255)
+
+        # UNCHANGED MAPS ARE NOT RE-READ, CHANGED MAPS ARE
+        with mock.patch.object(prepare_module, "prepare_skymap", wraps=prepare_module.prepare_skymap) as prepare:
+            self.assertEqual(skymap_archive(log=log, archivePath=archivePath).build(mapPaths=mapDir), 0)
+            shutil.copyfile(pathToInputDir + "/bayestar.multiorder.fits", mapDir + "bilby.multiorder.fits")
+            self.assertEqual(skymap_archive(log=log, archivePath=archivePath).build(mapPaths=mapDir), 1)
+            self.assertEqual(prepare.call_count, 1)
+        after = skymap_archive(log=log, archivePath=archivePath).query(ra=170.343532, dec=-40.532255)
+        self.assertEqual(len(skymap_archive(log=log, archivePath=archivePath)), 2)
+        self.assertNotEqual(before, after)
+        self.assertEqual(after[0], [("bayestar", 74.55), ("bilby", 74.55)])
+
+    def test_skymap_archive_function_exception(self):
+
+        from skytag.commonutils import skymap_archive
+        with self.assertRaises(AttributeError):
+            skymap_archive(log=log, archivePath=pathToOutputDir + "/exception.skytag", coarseLevel=13)
+        archive = skymap_archive(log=log, archivePath=pathToOutputDir + "/exception.skytag", maxCredible=95.)
+        with self.assertRaises(AttributeError):
+            archive.query(ra=10., dec=10.)
+        with self.assertRaises(AttributeError):
+            archive.build(mapPaths=pathToOutputDir + "/no_such_directory/")
+        archive.build(mapPaths=[pathToOutputDir + "/bilby.multiorder.fits"], names=["S230518h"])
+        with self.assertRaises(AttributeError):
+            archive.query(ra=10., dec=10., credible=99.)
+        with self.assertRaises(AttributeError):
+            archive.build(mapPaths=[pathToOutputDir + "/bilby.multiorder.fits"], names=["a", "b"])
+
+        # x-print-testpage-for-pessto-marshall-web-object
+
+    # x-class-to-test-named-worker-function
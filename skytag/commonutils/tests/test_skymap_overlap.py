@@ -0,0 +1,139 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+def flat_densities(skymap, level):
+    """*the probability densities of a prepared skymap upsampled to a flat, nested map*
+    """
+    import numpy as np
+    return np.repeat(skymap['PROBDENSITY'], np.left_shift(1, 2 * (level - skymap['LEVEL'].astype(np.int64))))
+
+
+class test_skymap_overlap(unittest.TestCase):
+
+    def test_skymap_overlap_function(self):
+
+        from skytag.commonutils import skymap_overlap, synthetic_skymap, prepare_skymap
+        import numpy as np
+        for seed in range(3):
+            mapPathA = pathToOutputDir + "/overlap_a%(seed)s.multiorder.fits" % locals()
+            mapPathB = pathToOutputDir + "/overlap_b%(seed)s.multiorder.fits" % locals()
+            synthetic_skymap(log=log, pathToOutput=mapPathA, pixels=20000, maxLevel=7, blobs=2, seed=seed)
+            synthetic_skymap(log=log, pathToOutput=mapPathB, pixels=10000, maxLevel=6, blobs=1, seed=seed)
+            overlap = skymap_overlap(
+                log=log,
+                mapPathA=mapPathA,
+                mapPathB=mapPathB,
+                credible=90.
+            )
+
+            # AGAINST BOTH MAPS UPSAMPLED TO A COMMON FLAT LEVEL-7 GRID
+            skymapA, skymapB = prepare_skymap(log=log, mapPath=mapPathA), prepare_skymap(log=log, mapPath=mapPathB)
+            densityA, densityB = flat_densities(skymapA, 7), flat_densities(skymapB, 7)
+            pixelArea = 4. * np.pi / len(densityA)
+            np.testing.assert_allclose(overlap["overlapIntegral"], np.sum(densityA * densityB) * pixelArea, rtol=1e-12)
+            np.testing.assert_allclose(overlap["skyOverlap"], 4. * np.pi * overlap["overlapIntegral"], rtol=1e-12)
+            insideA = np.repeat(skymapA['CUMPROB'] <= 0.9, np.left_shift(1, 2 * (7 - skymapA['LEVEL'].astype(np.int64))))
+            insideB = np.repeat(skymapB['CUMPROB'] <= 0.9, np.left_shift(1, 2 * (7 - skymapB['LEVEL'].astype(np.int64))))
+            squareDegrees = pixelArea * (180. / np.pi)**2
+            np.testing.assert_allclose(overlap["areaA"], insideA.sum() * squareDegrees, rtol=1e-12)
+            np.testing.assert_allclose(overlap["areaB"], insideB.sum() * squareDegrees, rtol=1e-12)
+            np.testing.assert_allclose(overlap["intersectionArea"], (insideA & insideB).sum() * squareDegrees, rtol=1e-12)
+            np.testing.assert_allclose(overlap["probAInB"], (densityA * pixelArea)[insideB].sum() * 100., rtol=1e-12, atol=1e-12)
+            np.testing.assert_allclose(overlap["probBInA"], (densityB * pixelArea)[insideA].sum() * 100., rtol=1e-12, atol=1e-12)
+
+        # A MAP OVERLAPS ITS OWN CREDIBLE REGION COMPLETELY
+        mapPath = pathToOutputDir + "/bayestar.multiorder.fits"
+        overlap = skymap_overlap(log=log, mapPathA=mapPath, mapPathB=mapPath, credible=50.)
+        self.assertEqual(overlap["intersectionArea"], overlap["areaA"])
+        self.assertEqual(overlap["probAInB"], overlap["probBInA"])
+        self.assertTrue(49. < overlap["probAInB"] <= 50.)
+
+    def test_skymap_overlap_flat_function(self):
+
+        from skytag.commonutils import skymap_overlap, synthetic_skymap, prepare_skymap
+        from astropy.table import Table
+        import astropy_healpix as ah
+        import numpy as np
+        mapPathA = pathToOutputDir + "/overlap_flat_a.multiorder.fits"
+        mapPathB = pathToOutputDir + "/overlap_flat_b.multiorder.fits"
+        synthetic_skymap(log=log, pathToOutput=mapPathA, pixels=20000, maxLevel=7, seed=11)
+        synthetic_skymap(log=log, pathToOutput=mapPathB, pixels=20000, maxLevel=6, seed=11)
+        expected = skymap_overlap(log=log, mapPathA=mapPathA, mapPathB=mapPathB)
+
+        # MAP B AS A FLAT LEVEL-6 MAP OF PER-PIXEL PROBABILITIES, IN BOTH PIXEL ORDERINGS
+        skymapB = prepare_skymap(log=log, mapPath=mapPathB)
+        nside = 64
+        prob = flat_densities(skymapB, 6) * ah.nside_to_pixel_area(nside).to_value("sr")
+        for ordering in ["NESTED", "RING"]:
+            flatProb = prob[ah.HEALPix(nside=nside).ring_to_nested(np.arange(len(prob)))] if ordering == "RING" else prob
+            flatPath = pathToOutputDir + "/overlap_flat_%(ordering)s.fits" % locals()
+            Table({"PROB": flatProb}, meta={"ORDERING": ordering, "NSIDE": nside, "INDXSCHM": "IMPLICIT", "MJD-OBS": 60000.}).write(flatPath, overwrite=True)
+            overlap = skymap_overlap(log=log, mapPathA=mapPathA, mapPathB=flatPath)
+            for k, v in expected.items():
+                np.testing.assert_allclose(overlap[k], v, rtol=1e-9, atol=1e-9, err_msg=k)
+            flat = prepare_skymap(log=log, mapPath=flatPath)
+            self.assertEqual(len(flat['UNIQ']), 12 * nside**2)
+            np.testing.assert_allclose(flat['PROB'].sum(), 1., rtol=1e-9)
+
+    def test_skymap_overlap_function_exception(self):
+
+        from skytag.commonutils import skymap_overlap, prepare_skymap
+        from astropy.table import Table
+        mapPath = pathToOutputDir + "/bayestar.multiorder.fits"
+        with self.assertRaises(AttributeError):
+            skymap_overlap(log=log, mapPathA=mapPath, mapPathB=mapPath, credible=0.)
+        with self.assertRaises(AttributeError):
+            skymap_overlap(log=log, skymapA=prepare_skymap(log=log, mapPath=mapPath, region={"ra": 10., "dec": 10., "radius": 1.}), mapPathB=mapPath)
+        badPath = pathToOutputDir + "/overlap_not_healpix.fits"
+        Table({"PROB": [0.5, 0.5, 0.]}).write(badPath, overwrite=True)
+        with self.assertRaises(AttributeError):
+            skymap_overlap(log=log, mapPathA=mapPath, mapPathB=badPath)
+
+        # x-print-testpage-for-pessto-marshall-web-object
+
+    # x-class-to-test-named-worker-function
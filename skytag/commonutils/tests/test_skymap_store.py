@@ -0,0 +1,127 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import importlib.util
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+
+@unittest.skipUnless(importlib.util.find_spec("h5py"), "h5py is not installed")
+class test_skymap_store(unittest.TestCase):
+
+    def test_skymap_store_function(self):
+
+        from skytag.commonutils import skymap_store, prepare_skymap, prob_at_location, synthetic_skymap
+        import numpy as np
+        synthPath = pathToOutputDir + "/store_synth.multiorder.fits"
+        synthetic_skymap(log=log, pathToOutput=synthPath, pixels=100000, maxLevel=10, blobs=2, seed=3, distance=True)
+        mapPaths = [pathToInputDir + "/bayestar.multiorder.fits", pathToInputDir + "/bilby.multiorder.fits", synthPath]
+        storePath = pathToOutputDir + "/skymaps.h5"
+        if os.path.exists(storePath):
+            os.remove(storePath)
+        store = skymap_store(log=log, storePath=storePath)
+        self.assertEqual(store.pack(mapPaths=mapPaths), 3)
+        # UNCHANGED MAPS ARE NOT RE-PACKED
+        self.assertEqual(store.pack(mapPaths=mapPaths), 0)
+        self.assertEqual(store.events, ["bayestar", "bilby", "store_synth"])
+        self.assertEqual(len(store), 3)
+
+        rng = np.random.default_rng(5)
+        ra, dec = rng.uniform(0., 360., 200), np.degrees(np.arcsin(rng.uniform(-1., 1., 200)))
+        mjd = [60070.] * 200
+        for event, mapPath in zip(store.events, mapPaths):
+            skymap = store.skymap(event)
+            expected = prob_at_location(log=log, ra=ra, dec=dec, mjd=mjd, mapPath=mapPath, distance=True, probdensity=True)
+            results = prob_at_location(log=log, ra=ra, dec=dec, mjd=mjd, mapPath=False, skymap=skymap, distance=True, probdensity=True)
+            np.testing.assert_equal(results, expected)
+
+            # THE STORED ARRAYS ARE THOSE OF THE PREPARED MAP, AND EXPORT BACK TO AN EQUIVALENT FITS MAP
+            prepared = prepare_skymap(log=log, mapPath=mapPath, useIndex=False)
+            exported = prepare_skymap(log=log, mapPath=store.export(event, pathToOutputDir + "/exported.multiorder.fits"), useIndex=False)
+            for k, v in prepared.items():
+                if isinstance(v, np.ndarray):
+                    np.testing.assert_array_equal(np.asarray(skymap[k]), v)
+                    np.testing.assert_array_equal(exported[k], v)
+            self.assertEqual(exported['meta']["MJD-OBS"], prepared['meta']["MJD-OBS"])
+        store.close()
+
+    def test_skymap_store_lazy_function(self):
+
+        from skytag.commonutils import skymap_store, prob_at_location, synthetic_skymap
+        from skytag.commonutils.skymap_store import STORE_CHUNK_ROWS
+        import numpy as np
+        synthPath = pathToOutputDir + "/store_lazy.multiorder.fits"
+        synthetic_skymap(log=log, pathToOutput=synthPath, pixels=200000, maxLevel=11, blobs=1, seed=4)
+        store = skymap_store(log=log, storePath=pathToOutputDir + "/lazy.h5")
+        store.pack(mapPaths=[synthPath])
+
+        # ONE LOOKUP ONLY READS THE CHUNK HOLDING ITS PIXEL, OF THE ARRAYS IT READS
+        skymap = store.skymap("store_lazy")
+        self.assertIsInstance(skymap['INDEX29'], np.ndarray)
+        self.assertGreater(len(skymap['INDEX29']), 4 * STORE_CHUNK_ROWS)
+        results = prob_at_location(log=log, ra=10., dec=20., mapPath=False, skymap=skymap, lazy=True)
+        results.prob
+        self.assertEqual(len(skymap['CUMPROB'].chunks), 1)
+        self.assertEqual(len(skymap['PROBDENSITY'].chunks), 0)
+
+        # GATHERS MATCH NUMPY INDEXING, INCLUDING NEGATIVE ROWS AND SLICES
+        cumprob = np.asarray(skymap['CUMPROB'])
+        rows = np.array([[5, -1], [len(cumprob) - 7, 3 * STORE_CHUNK_ROWS + 2]])
+        np.testing.assert_array_equal(skymap['CUMPROB'][rows], cumprob[rows])
+        np.testing.assert_array_equal(skymap['CUMPROB'][10:20], cumprob[10:20])
+        self.assertEqual(skymap['CUMPROB'][7], cumprob[7])
+        store.close()
+
+    def test_skymap_store_function_exception(self):
+
+        from skytag.commonutils import skymap_store
+        store = skymap_store(log=log, storePath=pathToOutputDir + "/missing.h5")
+        self.assertEqual(store.events, [])
+        with self.assertRaises(AttributeError):
+            store.skymap("S230518h")
+        with self.assertRaises(AttributeError):
+            store.pack(mapPaths=pathToOutputDir + "/no-such-directory")
+        with self.assertRaises(AttributeError):
+            store.pack(mapPaths=[pathToInputDir + "/bayestar.multiorder.fits"], names=["a", "b"])
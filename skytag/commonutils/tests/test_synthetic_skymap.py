@@ -0,0 +1,148 @@
+from __future__ import print_function
+from builtins import str
+import os
+import unittest
+import shutil
+import unittest
+import yaml
+from skytag.utKit import utKit
+from fundamentals import tools
+from os.path import expanduser
+home = expanduser("~")
+
+
+packageDirectory = utKit("").get_project_root()
+settingsFile = packageDirectory + "/test_settings.yaml"
+# settingsFile = home + \
+#     "/git_repos/_misc_/settings/skytag/test_settings.yaml"
+
+su = tools(
+    arguments={"settingsFile": settingsFile},
+    docString=__doc__,
+    logLevel="DEBUG",
+    options_first=False,
+    projectName=None,
+    defaultSettingsFile=False
+)
+arguments, settings, log, dbConn = su.setup()
+
+# SETUP PATHS TO COMMON DIRECTORIES FOR TEST DATA
+moduleDirectory = os.path.dirname(__file__)
+pathToInputDir = moduleDirectory + "/input/"
+pathToOutputDir = moduleDirectory + "/output/"
+
+try:
+    shutil.rmtree(pathToOutputDir)
+except:
+    pass
+# COPY INPUT TO OUTPUT DIR
+shutil.copytree(pathToInputDir, pathToOutputDir)
+
+# Recursively create missing directories
+if not os.path.exists(pathToOutputDir):
+    os.makedirs(pathToOutputDir)
+
+
+
+
+# xt-setup-unit-testing-files-and-folders
+# xt-utkit-refresh-database
+
+class test_synthetic_skymap(unittest.TestCase):
+
+    def test_synthetic_skymap_function(self):
+
+        from skytag.commonutils import synthetic_skymap, prob_at_location
+        from astropy.table import Table
+        from astropy.io import fits
+        import astropy_healpix as ah
+        import numpy as np
+        mapPath = synthetic_skymap(
+            log=log,
+            pathToOutput=pathToOutputDir + "/synthetic.multiorder.fits",
+            pixels=30000,
+            maxLevel=11,
+            blobs=4,
+            mjdObs=60100.5,
+            seed=40
+        )
+        fits.open(mapPath).verify("exception")
+        table = Table.read(mapPath)
+        level, ipix = ah.uniq_to_level_ipix(table['UNIQ'])
+
+        # THE PIXELS TILE THE WHOLE SKY WITHOUT OVERLAPS
+        self.assertAlmostEqual((4.**-level.astype(np.float64)).sum(), 12.)
+        self.assertEqual(len(np.unique(table['UNIQ'])), len(table))
+        self.assertLessEqual(abs(len(table) - 30000), 30)
+        self.assertEqual(level.max(), 11)
+        self.assertEqual(table.meta["MOCORDER"], 11)
+        self.assertEqual(table.meta["MJD-OBS"], 60100.5)
+        self.assertAlmostEqual((table['PROBDENSITY'] * ah.nside_to_pixel_area(ah.level_to_nside(level)).value).sum(), 1.)
+        # THE MOST PROBABLE PIXELS ARE THE FINEST
+        assert np.median(table['PROBDENSITY'][level == 11]) > np.median(table['PROBDENSITY'][level == level.min()])
+
+        prob, deltas, distance = prob_at_location(log=log, ra=[10.343234, 170.343532], dec=[14.345532, -40.532255], mjd=[60101., 60102.], mapPath=mapPath, distance=True)
+        self.assertEqual(deltas, [0.5, 1.5])
+        assert all(40. <= d[0] <= 400. for d in distance)
+
+        # THE SAME SEED GIVES THE SAME MAP
+        again = synthetic_skymap(log=log, pathToOutput=pathToOutputDir + "/synthetic_again.multiorder.fits", pixels=30000, maxLevel=11, blobs=4, mjdObs=60100.5, seed=40)
+        with open(mapPath, "rb") as f, open(again, "rb") as g:
+            self.assertEqual(f.read(), g.read())
+
+    def test_synthetic_skymap_levels_function(self):
+
+        from skytag.commonutils import synthetic_skymap, prepare_skymap
+        import numpy as np
+        mapPath = synthetic_skymap(
+            log=log,
+            pathToOutput=pathToOutputDir + "/synthetic_levels.multiorder.fits",
+            pixels=50000,
+            levels={5: 0.1, 8: 0.5, 11: 0.4},
+            distance=False,
+            seed=40
+        )
+        skymap = prepare_skymap(log=log, mapPath=mapPath)
+        levels, counts = np.unique(skymap['LEVEL'], return_counts=True)
+        counts = dict(zip(levels.tolist(), counts.tolist()))
+        self.assertEqual(counts[11], 20000)
+        self.assertLessEqual(abs(counts[8] - 25000), 3)
+        self.assertLessEqual(sum(counts.get(l, 0) for l in [6, 7, 9, 10]), 12)
+        self.assertAlmostEqual((4.**-skymap['LEVEL'].astype(np.float64)).sum(), 12.)
+        assert "DISTMU" not in skymap
+        assert "DISTMEAN" not in skymap['meta']
+
+    def test_synthetic_catalogue_function(self):
+
+        from skytag.commonutils import synthetic_skymap, synthetic_catalogue, prob_at_location
+        import numpy as np
+        mapPath = synthetic_skymap(log=log, pathToOutput=pathToOutputDir + "/synthetic_catalogue.multiorder.fits", pixels=20000, seed=41)
+
+        # SOURCES DRAWN FROM THE MAP FALL IN ITS CREDIBLE REGIONS IN PROPORTION
+        ra, dec = synthetic_catalogue(log=log, count=20000, mapPath=mapPath, fromMap=1., seed=41)
+        probs = np.array(prob_at_location(log=log, ra=ra, dec=dec, mapPath=mapPath)[0])
+        self.assertAlmostEqual((probs <= 90.).mean(), 0.9, delta=0.02)
+        self.assertAlmostEqual((probs <= 50.).mean(), 0.5, delta=0.02)
+
+        # UNIFORM SOURCES ARE SPREAD EVENLY OVER THE SKY
+        ra, dec = synthetic_catalogue(log=log, count=20000, fromMap=0., seed=41)
+        self.assertEqual(len(ra), 20000)
+        self.assertAlmostEqual((dec > 0.).mean(), 0.5, delta=0.02)
+        self.assertAlmostEqual((np.abs(dec) < 30.).mean(), 0.5, delta=0.02)
+        assert ((ra >= 0.) & (ra < 360.)).all()
+
+        ra, dec = synthetic_catalogue(log=log, count=1001, mapPath=mapPath, fromMap=0.5, seed=41)
+        self.assertEqual(len(ra), 1001)
+
+    def test_synthetic_skymap_function_exception(self):
+
+        from skytag.commonutils import synthetic_skymap, synthetic_catalogue
+        for kwargs in [{"pixels": 5}, {"maxLevel": 30}, {"pixels": 1000, "maxLevel": 2}, {"blobs": 0}, {"pixels": 100000, "levels": {2: 0.1, 6: 0.9}}]:
+            with self.assertRaises(AttributeError):
+                synthetic_skymap(log=log, pathToOutput=pathToOutputDir + "/bad.multiorder.fits", **kwargs)
+        with self.assertRaises(AttributeError):
+            synthetic_catalogue(log=log, count=10, fromMap=2.)
+
+        # x-print-testpage-for-pessto-marshall-web-object
+
+    # x-class-to-test-named-worker-function
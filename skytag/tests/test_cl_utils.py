@@ -51,4 +51,13 @@ class test_cl_utils(unittest.TestCase):
         cl_utils.main(args)
         return
 
+    def test_moc(self):
+        # TEST CL-OPTIONS
+        mapPath = moduleDirectory + "/../commonutils/tests/input/bayestar.multiorder.fits"
+        args = docopt(doc, ["--levels", "50,90", "moc", mapPath, pathToOutputDir])
+        cl_utils.main(args)
+        for level in ["50", "90"]:
+            self.assertTrue(os.path.exists(pathToOutputDir + "/bayestar.%(level)s.moc.fits" % locals()))
+        return
+
     # x-class-to-test-named-worker-function